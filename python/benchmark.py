@@ -0,0 +1,473 @@
+"""
+Benchmarks for the move resolution and damage pipeline.
+Times each stage on its own, and whole runs over the bundled combo csv files and synthetic corpora
+of combos generated from the frame data. Results are saved as JSON and compared against a baseline
+so slowdowns are caught, e.g.
+
+    python benchmark.py --sizes 1000 10000 --output results.json --baseline baseline.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+from typing import Any, Callable, Iterator, NamedTuple
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+import comboEngine
+import comboValidator
+import constants as const
+import frameData
+import parseCombo
+from comboLexer import ComboToken
+from constants import logger
+
+# flake8: noqa: E501
+
+COMBO_CSV_DIR: str = os.path.join(frameData.DATA_DIR, "combo_csvs")
+BENCHMARK_RESULTS_VERSION: int = 1
+# Synthetic corpus sizes timed by default, 1000000 can be added with --sizes
+SYNTHETIC_CORPUS_SIZES: tuple[int, ...] = (1000, 10000, 100000)
+SYNTHETIC_COMBO_MOVES: tuple[int, int] = (3, 10)
+# A benchmark regresses when it is this much slower than the baseline
+REGRESSION_TOLERANCE: float = 0.2
+
+
+class BenchmarkResult(NamedTuple):
+    """Timing of a benchmark, best_seconds is the fastest of the repeats
+    items is the number of moves, rows or combos handled by one run"""
+
+    name: str
+    best_seconds: float
+    mean_seconds: float
+    repeat: int
+    items: int
+
+    @property
+    def items_per_second(self) -> float:
+        return self.items / self.best_seconds if self.best_seconds else 0.0
+
+
+class Regression(NamedTuple):
+    """A benchmark that was slower than its baseline"""
+
+    name: str
+    baseline_seconds: float
+    best_seconds: float
+
+    @property
+    def slowdown(self) -> float:
+        return self.best_seconds / self.baseline_seconds
+
+
+def time_benchmark(
+    name: str, run: Callable[[], Any], repeat: int = 5, items: int = 1
+) -> BenchmarkResult:
+    """Time a function, keeping the fastest and mean time of repeat runs"""
+    timings: list[float] = []
+    for _ in range(repeat):
+        start_time: float = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start_time)
+    result: BenchmarkResult = BenchmarkResult(
+        name, min(timings), sum(timings) / len(timings), repeat, items
+    )
+    logger.info(
+        "%s: %.3fms best of %s, %.0f items/s",
+        name,
+        result.best_seconds * 1000,
+        repeat,
+        result.items_per_second,
+    )
+    return result
+
+
+def get_character_move_names(full_framedata_df: DataFrame) -> dict[str, list[str]]:
+    """Get the first move name of every frame data row by character"""
+    move_names: dict[str, list[str]] = {}
+    for character, names in zip(
+        full_framedata_df[const.CHARACTER_NAME], full_framedata_df[const.MOVE_NAME]
+    ):
+        if isinstance(names, str):
+            move_names.setdefault(character, []).append(names.split("\n")[0])
+    return move_names
+
+
+def get_synthetic_moves(
+    full_framedata_df: DataFrame, move_name_alias_df: DataFrame
+) -> list[tuple[str, list[str]]]:
+    """Get the moves synthetic combos are made of for every character
+    Only move names that are a single move of combo notation and resolve are used, so every
+    synthetic combo is scored in full"""
+    resolver: parseCombo.MoveResolver = parseCombo.get_move_resolver(
+        full_framedata_df, move_name_alias_df
+    )
+    character_moves: list[tuple[str, list[str]]] = []
+    for character, move_names in get_character_move_names(full_framedata_df).items():
+        character_name: str = character.title()
+        found_moves: list[str] = []
+        for move_name in move_names:
+            tokens: list[ComboToken] = list(parseCombo.iter_combo_tokens([move_name]))
+            if (
+                len(tokens) == 1
+                and tokens[0].kind == const.TOKEN_MOVE
+                and not parseCombo.is_stateful_move(move_name, character)
+                and parseCombo.resolve_combo(resolver, character_name, tokens)[0]
+            ):
+                found_moves.append(move_name)
+        if found_moves:
+            character_moves.append((character_name, found_moves))
+    return character_moves
+
+
+def generate_combos(
+    character_moves: list[tuple[str, list[str]]], combo_count: int, seed: int = 0
+) -> Iterator[parseCombo.ComboInput]:
+    """Generate random combos from the moves of get_synthetic_moves, the same seed gives the same combos"""
+    random_moves: random.Random = random.Random(seed)
+    for combo_number in range(combo_count):
+        character_name, move_names = random_moves.choice(character_moves)
+        yield parseCombo.ComboInput(
+            f"synthetic_{combo_number}",
+            character_name,
+            random_moves.choices(
+                move_names, k=random_moves.randint(*SYNTHETIC_COMBO_MOVES)
+            ),
+        )
+
+
+def get_strategy_samples(
+    full_framedata_df: DataFrame,
+    move_name_alias_df: DataFrame,
+    combos: list[parseCombo.ComboInput],
+) -> dict[str, list[tuple[str, str]]]:
+    """Get the (move name, character) of the moves each search strategy resolves in a list of combos"""
+    resolver: parseCombo.MoveResolver = parseCombo.MoveResolver(
+        full_framedata_df, move_name_alias_df, cache_size=0
+    )
+    samples: dict[str, list[tuple[str, str]]] = {
+        search_state: [] for search_state in (*const.SEARCH_STATES, const.NOT_FOUND)
+    }
+    for combo in combos:
+        context: parseCombo.ComboContext = parseCombo.ComboContext()
+        for token in parseCombo.iter_combo_tokens(combo.moves):
+            if token.kind != const.TOKEN_MOVE:
+                continue
+            search_state: str = resolver.resolve(token.text, combo.character, context)[
+                1
+            ]
+            samples[search_state].append((token.text, combo.character))
+    return samples
+
+
+def run_benchmarks(
+    data_dir: str = frameData.DATA_DIR,
+    combo_csv_dir: str = COMBO_CSV_DIR,
+    sizes: tuple[int, ...] = SYNTHETIC_CORPUS_SIZES,
+    repeat: int = 5,
+) -> list[BenchmarkResult]:
+    """Time every stage of the pipeline, then whole runs over the combo csv files and synthetic corpora"""
+    results: list[BenchmarkResult] = []
+
+    # Loading
+    full_framedata_df, move_name_alias_df = frameData.load_tables(data_dir)
+    frame_data_rows: int = len(full_framedata_df)
+    results.append(
+        time_benchmark(
+            "csv_load",
+            lambda: (
+                frameData.load_frame_data(data_dir),
+                frameData.load_move_name_aliases(data_dir),
+            ),
+            repeat,
+            frame_data_rows,
+        )
+    )
+    results.append(
+        time_benchmark(
+            "store_load",
+            lambda: frameData.load_tables(data_dir),
+            repeat,
+            frame_data_rows,
+        )
+    )
+
+    # Move resolution, each strategy on the moves it resolves in the bundled combos
+    combo_csvs: list[str] = sorted(parseCombo.get_csv_list(combo_csv_dir))
+    bundled_combos: list[parseCombo.ComboInput] = list(
+        parseCombo.iter_combo_csvs(combo_csvs)
+    )
+    # Splitting the moves of the combo csvs into one move per row, as process_combo_csv does
+    combo_input_dfs: list[DataFrame] = [pd.read_csv(csv) for csv in combo_csvs]
+    results.append(
+        time_benchmark(
+            "split_columns",
+            lambda: [
+                parseCombo.split_columns(combo_input_df, const.MOVE_NAME, " ")
+                for combo_input_df in combo_input_dfs
+            ],
+            repeat,
+            sum(len(combo_input_df) for combo_input_df in combo_input_dfs),
+        )
+    )
+    resolver: parseCombo.MoveResolver = parseCombo.MoveResolver(
+        full_framedata_df, move_name_alias_df, cache_size=0
+    )
+    for search_state, samples in get_strategy_samples(
+        full_framedata_df, move_name_alias_df, bundled_combos
+    ).items():
+        if not samples or search_state == const.NOT_FOUND:
+            continue
+        strategy: Callable[[str, str, parseCombo.ComboContext], list[int]] = getattr(
+            resolver, f"_search_{search_state}"
+        )
+
+        def run_strategy(
+            strategy: Callable[
+                [str, str, parseCombo.ComboContext], list[int]
+            ] = strategy,
+            samples: list[tuple[str, str]] = samples,
+        ) -> None:
+            for move_name, character_name in samples:
+                strategy(move_name, character_name, parseCombo.ComboContext())
+
+        results.append(
+            time_benchmark(
+                f"strategy_{search_state}", run_strategy, repeat, len(samples)
+            )
+        )
+
+    # Hits and damage of the bundled combos
+    combo_frame_data: list[DataFrame] = [
+        parseCombo.get_frame_data_for_positions(
+            full_framedata_df,
+            *parseCombo.resolve_combo(
+                parseCombo.get_move_resolver(full_framedata_df, move_name_alias_df),
+                combo.character,
+                combo.moves,
+            ),
+        )
+        for combo in bundled_combos
+    ]
+    combo_hits: list[DataFrame] = [
+        parseCombo.parse_hits(frame_data) for frame_data in combo_frame_data
+    ]
+    hit_count: int = sum(len(hits) for hits in combo_hits)
+    # get_combo_damage parses the hits itself, so it is given the frame data of the combos
+    damage_tables: list[DataFrame] = [
+        comboEngine.get_combo_damage(frame_data) for frame_data in combo_frame_data
+    ]
+    if hit_count == 0 or sum(len(table) for table in damage_tables) != hit_count:
+        raise RuntimeError("The bundled combos have no hits to benchmark")
+    results.append(
+        time_benchmark(
+            "parse_hits",
+            lambda: [
+                parseCombo.parse_hits(frame_data) for frame_data in combo_frame_data
+            ],
+            repeat,
+            hit_count,
+        )
+    )
+    results.append(
+        time_benchmark(
+            "get_combo_damage",
+            lambda: [
+                comboEngine.get_combo_damage(frame_data)
+                for frame_data in combo_frame_data
+            ],
+            repeat,
+            hit_count,
+        )
+    )
+
+    # Whole runs
+    def score_bundled_combos() -> None:
+        for _ in comboEngine.score_combo_stream(
+            parseCombo.iter_combo_csvs(combo_csvs),
+            full_framedata_df,
+            move_name_alias_df,
+        ):
+            pass
+
+    results.append(
+        time_benchmark(
+            "end_to_end_combo_csvs", score_bundled_combos, repeat, len(bundled_combos)
+        )
+    )
+    character_moves: list[tuple[str, list[str]]] = get_synthetic_moves(
+        full_framedata_df, move_name_alias_df
+    )
+    for size in sizes:
+
+        def score_synthetic_combos(size: int = size) -> None:
+            for _ in comboEngine.score_combo_stream(
+                generate_combos(character_moves, size),
+                full_framedata_df,
+                move_name_alias_df,
+            ):
+                pass
+
+        # the largest corpora take long enough that one run is representative
+        results.append(
+            time_benchmark(
+                f"end_to_end_synthetic_{size}",
+                score_synthetic_combos,
+                repeat if size <= 10000 else 1,
+                size,
+            )
+        )
+
+    # Link validation of the largest synthetic corpus, resolved beforehand
+    if sizes:
+        combo_resolver: parseCombo.MoveResolver = parseCombo.get_move_resolver(
+            full_framedata_df, move_name_alias_df
+        )
+        link_table: comboValidator.LinkTable = comboValidator.get_link_table(
+            full_framedata_df
+        )
+        row_positions: list[int] = []
+        row_move_numbers: list[int] = []
+        row_offsets: list[int] = [0]
+        for combo in generate_combos(character_moves, max(sizes)):
+            combo_positions, _, move_numbers = parseCombo.resolve_combo_moves(
+                combo_resolver, combo.character, combo.moves
+            )
+            row_positions += combo_positions
+            row_move_numbers += move_numbers
+            row_offsets.append(len(row_positions))
+        rows: np.ndarray = np.array(row_positions, dtype=np.int64)
+        move_numbers_array: np.ndarray = np.array(row_move_numbers, dtype=np.int64)
+        offsets: np.ndarray = np.array(row_offsets, dtype=np.int64)
+        results.append(
+            time_benchmark(
+                f"validate_links_synthetic_{max(sizes)}",
+                lambda: comboValidator.validate_rows(
+                    link_table, rows, move_numbers_array, offsets
+                ),
+                repeat,
+                max(sizes),
+            )
+        )
+    return results
+
+
+def results_to_json(results: list[BenchmarkResult]) -> dict[str, Any]:
+    """Convert benchmark results to JSON with the details of the machine they were run on"""
+    return {
+        "version": BENCHMARK_RESULTS_VERSION,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": {
+            result.name: {
+                "best_seconds": result.best_seconds,
+                "mean_seconds": result.mean_seconds,
+                "repeat": result.repeat,
+                "items": result.items,
+                "items_per_second": result.items_per_second,
+            }
+            for result in results
+        },
+    }
+
+
+def save_results(results: list[BenchmarkResult], path: str) -> None:
+    """Save benchmark results to a JSON file"""
+    with open(path, "w", encoding="utf-8") as results_file:
+        json.dump(results_to_json(results), results_file, indent=2)
+    logger.info("Saved benchmark results to %s", path)
+
+
+def compare_results(
+    results: list[BenchmarkResult],
+    baseline: dict[str, Any],
+    tolerance: float = REGRESSION_TOLERANCE,
+) -> list[Regression]:
+    """Find the benchmarks that are more than tolerance slower than the baseline
+    Benchmarks missing from the baseline are skipped"""
+    regressions: list[Regression] = []
+    baseline_results: dict[str, Any] = baseline.get("results", {})
+    for result in results:
+        baseline_result: dict[str, Any] | None = baseline_results.get(result.name)
+        if baseline_result is None:
+            continue
+        baseline_seconds: float = baseline_result["best_seconds"]
+        if result.best_seconds > baseline_seconds * (1 + tolerance):
+            regressions.append(
+                Regression(result.name, baseline_seconds, result.best_seconds)
+            )
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Run the benchmarks, returns 1 if any regressed against the baseline"""
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--data-dir", default=frameData.DATA_DIR, help="frame data directory"
+    )
+    parser.add_argument(
+        "--combo-dir", default=COMBO_CSV_DIR, help="combo csv directory"
+    )
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="*",
+        default=list(SYNTHETIC_CORPUS_SIZES),
+        help="number of combos in each synthetic corpus",
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="runs of each benchmark")
+    parser.add_argument("--output", help="save the results to this JSON file")
+    parser.add_argument("--baseline", help="compare the results with this JSON file")
+    parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="save the results as the baseline instead of comparing with it",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=REGRESSION_TOLERANCE,
+        help="fraction slower than the baseline that counts as a regression",
+    )
+    args: argparse.Namespace = parser.parse_args(argv)
+
+    results: list[BenchmarkResult] = run_benchmarks(
+        args.data_dir, args.combo_dir, tuple(args.sizes), args.repeat
+    )
+    for result in results:
+        print(
+            f"{result.name:<32} {result.best_seconds * 1000:>12.3f}ms {result.items_per_second:>14.0f} items/s"
+        )
+    if args.output:
+        save_results(results, args.output)
+    if not args.baseline:
+        return 0
+    if args.update_baseline or not os.path.exists(args.baseline):
+        save_results(results, args.baseline)
+        return 0
+
+    with open(args.baseline, encoding="utf-8") as baseline_file:
+        baseline: dict[str, Any] = json.load(baseline_file)
+    regressions: list[Regression] = compare_results(results, baseline, args.tolerance)
+    for regression in regressions:
+        logger.warning(
+            "%s regressed: %.3fms against %.3fms (%.2fx)",
+            regression.name,
+            regression.best_seconds * 1000,
+            regression.baseline_seconds * 1000,
+            regression.slowdown,
+        )
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,419 @@
+"""
+Combo damage engine.
+Resolves combos against the frame data and calculates their damage. Importing this module does
+no I/O, the frame data tables are loaded the first time they are needed.
+"""
+
+from __future__ import annotations
+
+import math
+import time
+from typing import Any, Iterable, Iterator, NamedTuple
+import numpy as np
+from pandas import DataFrame
+
+import parseCombo
+import frameData
+import instrumentation
+import constants as const
+from constants import logger
+
+# flake8: noqa: E501
+# pylance: reportUnknownMemberType=false
+
+_frame_data_store: frameData.FrameDataStore | None = None
+
+
+def get_frame_data_store(
+    data_dir: str = frameData.DATA_DIR,
+) -> frameData.FrameDataStore:
+    """Get the frame data store, loading the frame data the first time it is needed"""
+    global _frame_data_store
+    if _frame_data_store is None:
+        _frame_data_store = frameData.FrameDataStore(data_dir)
+    return _frame_data_store
+
+
+def get_tables(data_dir: str = frameData.DATA_DIR) -> tuple[DataFrame, DataFrame]:
+    """Get the frame data and move name aliases of the current frame data snapshot"""
+    return get_frame_data_store(data_dir).tables()
+
+
+def __getattr__(name: str) -> Any:
+    """Load the frame data tables when they are first accessed as module attributes"""
+    if name == "full_framedata_df":
+        return get_tables()[0]
+    if name == "move_name_alias_df":
+        return get_tables()[1]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def get_damage_scaling_for_hit(hit_num: int, damage: int) -> float:  # type: ignore
+    """Get the damage scaling for a hit."""
+
+    damage: int = int(damage)
+
+    # check if the damage is 0 -0 or none
+    if damage in [0, -1]:
+        # return the damage scaling for the hit before
+        return max(
+            const.DAMAGE_SCALING_MIN, const.DAMAGE_SCALING_FACTOR ** (hit_num - 4)
+        )
+
+    if hit_num <= 3:
+        return 1
+    # check if the damage is greater than 1000
+    if damage >= 1000:
+        scaling: float = max(
+            const.DAMAGE_SCALING_MIN_ABOVE_1K,
+            const.DAMAGE_SCALING_FACTOR ** (hit_num - 3),
+        )
+    else:
+        scaling = max(
+            const.DAMAGE_SCALING_MIN, const.DAMAGE_SCALING_FACTOR ** (hit_num - 3)
+        )
+
+    # round the damage scaling to 3 decimal places
+    # scaling: float = round(scaling, 3)
+    return scaling
+
+
+def add_scaled_hits(hits: Iterable[int], hit_number: int = 0) -> tuple[int, int]:
+    """Get the scaled damage of a sequence of hits following a hit number, and the hit number after
+    them. The scalar version of get_hit_numbers and get_damage_scaling, for hits added one move at a time
+    """
+    damage: int = 0
+    for hit in hits:
+        # hits with no damage restart the hit number
+        if hit == 0:
+            hit_number = 0
+            continue
+        hit_number += 1
+        damage += math.floor(hit * get_damage_scaling_for_hit(hit_number, hit))
+    return damage, hit_number
+
+
+def segmented_cumsum(values: np.ndarray, segment_start: np.ndarray) -> np.ndarray:
+    """Cumulative sum of an array that restarts at every True value of segment_start"""
+    if len(values) == 0:
+        return values.copy()
+    total: np.ndarray = np.cumsum(values)
+    # index of the first value of the segment each value belongs to
+    first_index: np.ndarray = np.maximum.accumulate(
+        np.where(segment_start, np.arange(len(values)), 0)
+    )
+    return total - total[first_index] + values[first_index]
+
+
+def get_hit_numbers(
+    damage: np.ndarray, combo_start: np.ndarray | None = None
+) -> np.ndarray:
+    """Get the hit number used for scaling each hit
+    Hit number goes up for each non-zero damage hit, hits with no damage are hit number 0
+    and the count restarts after them and at the start of each combo"""
+    damaging_hit: np.ndarray = damage != 0
+    hit_count: np.ndarray = np.cumsum(damaging_hit)
+    # hit count the count restarts from, at the most recent hit with no damage
+    # or just before the start of the combo
+    restart_count: np.ndarray = np.where(damaging_hit, 0, hit_count)
+    if combo_start is not None:
+        restart_count = np.where(
+            combo_start & damaging_hit, hit_count - 1, restart_count
+        )
+    return hit_count - np.maximum.accumulate(restart_count)
+
+
+def get_damage_scaling(hit_numbers: np.ndarray, damage: np.ndarray) -> np.ndarray:
+    """Get the damage scaling for every hit, see get_damage_scaling_for_hit"""
+    no_damage: np.ndarray = (damage == 0) | (damage == -1)
+
+    # hits with no damage use the scaling of the hit before
+    exponent: np.ndarray = np.where(no_damage, hit_numbers - 4, hit_numbers - 3)
+    scaling_min: np.ndarray = np.where(
+        ~no_damage & (damage >= 1000),
+        const.DAMAGE_SCALING_MIN_ABOVE_1K,
+        const.DAMAGE_SCALING_MIN,
+    )
+    scaling: np.ndarray = np.maximum(
+        scaling_min, const.DAMAGE_SCALING_FACTOR ** exponent.astype(np.float64)
+    )
+
+    # the first 3 hits are not scaled
+    return np.where(~no_damage & (hit_numbers <= 3), 1.0, scaling)
+
+
+def get_move_damage_totals(
+    scaled_damage: np.ndarray,
+    move_names: np.ndarray,
+    combo_start: np.ndarray | None = None,
+) -> np.ndarray:
+    """Get the running total of the scaled damage for each move in a combo
+    The total restarts whenever the move changes from one hit to the next"""
+    move_start: np.ndarray = np.ones(len(move_names), dtype=bool)
+    move_start[1:] = move_names[1:] != move_names[:-1]
+    if combo_start is not None:
+        move_start |= combo_start
+    return segmented_cumsum(scaled_damage, move_start)
+
+
+@instrumentation.instrumented("get_combo_damage")
+def get_combo_damage(combo_frame_data_df: DataFrame) -> DataFrame:
+    """Calculate the damage of a combo"""
+    df_newhits: DataFrame = parseCombo.parse_hits(combo_frame_data_df)
+
+    move_names: np.ndarray = df_newhits[const.MOVE_NAME].to_numpy()
+    damage: np.ndarray = df_newhits[const.DAMAGE].to_numpy().astype(np.int64)
+
+    # scale each hit by its hit number and round the damage down
+    hit_numbers: np.ndarray = get_hit_numbers(damage)
+    damage_scaling: np.ndarray = get_damage_scaling(hit_numbers, damage)
+    scaled_damage: np.ndarray = np.floor(damage * damage_scaling).astype(np.int64)
+    undizzy: np.ndarray = df_newhits[const.UNDIZZY].to_numpy().astype(np.int64)
+
+    table_undizzy_damage: DataFrame = DataFrame(
+        {
+            const.MOVE_NAME: move_names,
+            const.DAMAGE: damage,
+            # the hit number shown is the position of the hit in the combo
+            const.HIT_NUMBER: np.arange(1, len(damage) + 1),
+            const.DAMAGE_SCALING: damage_scaling,
+            const.SCALED_DAMAGE: scaled_damage,
+            const.UNDIZZY: undizzy,
+            const.TOTAL_DAMAGE_FOR_MOVE: get_move_damage_totals(
+                scaled_damage, move_names
+            ),
+            # total damage for the combo at each hit, the sum of all previous hits
+            const.TOTAL_DAMAGE_FOR_COMBO: np.cumsum(scaled_damage),
+            # total undizzy for the combo at each hit
+            const.TOTAL_UNDIZZY: np.cumsum(undizzy),
+        }
+    )
+    # keep the other columns of the hits table
+    for column_name in df_newhits.columns.difference(table_undizzy_damage.columns):
+        table_undizzy_damage[column_name] = df_newhits[column_name].to_numpy()
+
+    return table_undizzy_damage
+
+
+def total_damage_for_moves(damage_undizzy_table: DataFrame) -> DataFrame:
+    """Calculate the total damage for each move in the combo."""
+    damage_undizzy_table[const.TOTAL_DAMAGE_FOR_MOVE] = get_move_damage_totals(
+        damage_undizzy_table[const.SCALED_DAMAGE].to_numpy(),
+        damage_undizzy_table[const.MOVE_NAME].to_numpy(),
+    )
+    return damage_undizzy_table
+
+
+@instrumentation.instrumented("evaluate_combos")
+def evaluate_combos(
+    combos: Iterable[parseCombo.ComboInput],
+    full_framedata_df: DataFrame | None = None,
+    move_name_alias_df: DataFrame | None = None,
+) -> DataFrame:
+    """Resolve and calculate the damage of a batch of combos in one pass
+    The hits of every combo are put in one array, with offsets marking where each combo starts.
+    Uses the default frame data tables when none are given.
+    Returns a summary table with a row per combo, the throughput is kept in the
+    CombosPerSecond attribute of the table"""
+    start_time: float = time.perf_counter()
+    if full_framedata_df is None or move_name_alias_df is None:
+        full_framedata_df, move_name_alias_df = get_tables()
+
+    resolver: parseCombo.MoveResolver = parseCombo.get_move_resolver(
+        full_framedata_df, move_name_alias_df
+    )
+    hit_damage_table: parseCombo.HitDamageTable = parseCombo.get_hit_damage_table(
+        full_framedata_df
+    )
+    row_undizzy: np.ndarray = parseCombo.get_row_undizzy(full_framedata_df)
+
+    combo_names: list[str] = []
+    characters: list[str] = []
+    expected_damage: list[float] = []
+    unresolved_moves: list[str] = []
+    # frame data rows of every combo and the index of the first row of each combo
+    row_positions: list[int] = []
+    row_offsets: list[int] = [0]
+    for combo in combos:
+        context: parseCombo.ComboContext = parseCombo.ComboContext()
+        combo_positions, _ = parseCombo.resolve_combo(
+            resolver, combo.character, combo.moves, context
+        )
+        row_positions += combo_positions
+        row_offsets.append(len(row_positions))
+        combo_names.append(combo.name)
+        characters.append(combo.character)
+        expected_damage.append(combo.expected_damage)
+        unresolved_moves.append(
+            parseCombo.format_unresolved_moves(context.unresolved_moves)
+        )
+
+    rows: np.ndarray = np.array(row_positions, dtype=np.int64)
+    damage, row_hit_counts = parseCombo.gather_hits(hit_damage_table, rows)
+
+    # index of the first hit of each combo
+    hit_offsets: np.ndarray = np.concatenate(([0], np.cumsum(row_hit_counts)))[
+        row_offsets
+    ]
+    combo_start: np.ndarray = np.zeros(len(damage), dtype=bool)
+    combo_start[hit_offsets[:-1][hit_offsets[:-1] < len(damage)]] = True
+
+    hit_numbers: np.ndarray = get_hit_numbers(damage, combo_start)
+    scaled_damage: np.ndarray = np.floor(
+        damage * get_damage_scaling(hit_numbers, damage)
+    ).astype(np.int64)
+
+    # total damage of each combo
+    running_damage: np.ndarray = np.concatenate(([0], np.cumsum(scaled_damage)))
+    calculated_damage: np.ndarray = (
+        running_damage[hit_offsets[1:]] - running_damage[hit_offsets[:-1]]
+    )
+    # total undizzy of each combo, every hit of a move adds the undizzy of its move type
+    running_undizzy: np.ndarray = np.concatenate(
+        ([0], np.cumsum(np.repeat(row_undizzy[rows], row_hit_counts)))
+    )
+    combo_undizzy: np.ndarray = (
+        running_undizzy[hit_offsets[1:]] - running_undizzy[hit_offsets[:-1]]
+    )
+
+    expected: np.ndarray = np.array(expected_damage, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        percentage_difference: np.ndarray = np.round(
+            (calculated_damage - expected) / expected * 100
+        )
+    summary_df: DataFrame = DataFrame(
+        {
+            "Character": characters,
+            "Combo": combo_names,
+            "ExpectedDamage": np.round(expected),
+            "CalculatedDamage": calculated_damage,
+            "Difference": calculated_damage - np.round(expected),
+            "PercentageDifference": [
+                f"{int(percentage)}%" if np.isfinite(percentage) else ""
+                for percentage in percentage_difference
+            ],
+            "Undizzy": combo_undizzy,
+            "UndizzyCapped": combo_undizzy >= const.UNDIZZY_MAX,
+            "UnresolvedMoves": unresolved_moves,
+        }
+    )
+
+    elapsed: float = time.perf_counter() - start_time
+    combos_per_second: float = len(summary_df) / elapsed if elapsed else float("inf")
+    summary_df.attrs["CombosPerSecond"] = combos_per_second
+    logger.debug(
+        "Evaluated %s combos in %.3fs (%.0f combos/s)",
+        len(summary_df),
+        elapsed,
+        combos_per_second,
+    )
+    return summary_df
+
+
+class ComboResult(NamedTuple):
+    """The summary of a scored combo, and its damage table if it was kept"""
+
+    summary: dict[str, Any]
+    damage_table: DataFrame | None = None
+
+
+def get_combo_damage_table(
+    combo: parseCombo.ComboInput,
+    full_framedata_df: DataFrame,
+    move_name_alias_df: DataFrame,
+) -> DataFrame:
+    """Get the damage table of a combo, see get_combo_damage"""
+    resolver: parseCombo.MoveResolver = parseCombo.get_move_resolver(
+        full_framedata_df, move_name_alias_df
+    )
+    combo_positions, combo_search_states = parseCombo.resolve_combo(
+        resolver, combo.character, combo.moves
+    )
+    return get_combo_damage(
+        parseCombo.get_frame_data_for_positions(
+            full_framedata_df, combo_positions, combo_search_states
+        )
+    )
+
+
+def score_combo_batch(
+    batch: list[parseCombo.ComboInput],
+    full_framedata_df: DataFrame,
+    move_name_alias_df: DataFrame,
+) -> list[tuple[parseCombo.ComboInput, dict[str, Any]]]:
+    """Score a batch of combos with evaluate_combos, with the summary of each combo
+    If the batch can not be scored its combos are scored one at a time, and the combos that still
+    fail are logged and left out"""
+    try:
+        batch_summary_df: DataFrame = evaluate_combos(
+            batch, full_framedata_df, move_name_alias_df
+        )
+        return list(zip(batch, batch_summary_df.to_dict("records")))
+    except Exception:  # pylint: disable=broad-except
+        logger.debug("Could not score the batch, scoring its combos one at a time")
+
+    scored: list[tuple[parseCombo.ComboInput, dict[str, Any]]] = []
+    for combo in batch:
+        try:
+            summary_df: DataFrame = evaluate_combos(
+                [combo], full_framedata_df, move_name_alias_df
+            )
+        except Exception:  # pylint: disable=broad-except
+            logger.exception("Could not calculate the damage of %s", combo.name)
+            continue
+        scored.append((combo, summary_df.to_dict("records")[0]))
+    return scored
+
+
+def score_combo_stream(
+    combos: Iterable[parseCombo.ComboInput],
+    full_framedata_df: DataFrame | None = None,
+    move_name_alias_df: DataFrame | None = None,
+    batch_size: int = const.COMBO_STREAM_BATCH_SIZE,
+    max_damage_tables: int = 0,
+) -> Iterator[ComboResult]:
+    """Score combos as they are read, yielding the result of each combo in order
+    Combos are scored in batches of batch_size with evaluate_combos, so only one batch is held in
+    memory at a time. Combos that can not be scored are logged and skipped, see score_combo_batch.
+    The damage tables of the first max_damage_tables combos are also calculated, nothing is kept
+    after a result has been yielded"""
+    if full_framedata_df is None or move_name_alias_df is None:
+        full_framedata_df, move_name_alias_df = get_tables()
+    damage_tables_left: int = max_damage_tables
+    start_time: float = time.perf_counter()
+    combo_count: int = 0
+
+    batch: list[parseCombo.ComboInput] = []
+    combo_iter: Iterator[parseCombo.ComboInput] = iter(combos)
+    while True:
+        batch.clear()
+        for combo in combo_iter:
+            batch.append(combo)
+            if len(batch) >= batch_size:
+                break
+        if not batch:
+            elapsed: float = time.perf_counter() - start_time
+            logger.info(
+                "Scored %s combos in %.3fs (%.0f combos/s)",
+                combo_count,
+                elapsed,
+                combo_count / elapsed if elapsed else 0,
+            )
+            return
+        combo_count += len(batch)
+
+        for combo, summary in score_combo_batch(
+            batch, full_framedata_df, move_name_alias_df
+        ):
+            damage_table: DataFrame | None = None
+            if damage_tables_left > 0:
+                damage_tables_left -= 1
+                try:
+                    damage_table = get_combo_damage_table(
+                        combo, full_framedata_df, move_name_alias_df
+                    )
+                except Exception:  # pylint: disable=broad-except
+                    logger.exception(
+                        "Could not calculate the damage table of %s", combo.name
+                    )
+            yield ComboResult(summary, damage_table)
@@ -0,0 +1,106 @@
+"""
+Tokenizer for Skullgirls combo notation, e.g. "2LK 2MK 5HPx2 kara j236HK~LK ADC jHP".
+A combo string is tokenized in one pass into typed tokens. Tokens are interned, every occurrence
+of the same move is the same token object, so tokens can be used directly as cache keys.
+"""
+
+import functools
+import re
+import sys
+from typing import NamedTuple
+
+import constants as const
+
+# flake8: noqa: E501
+
+
+class ComboToken(NamedTuple):
+    """A token of combo notation
+    text is the move as written, which is what the move search resolves.
+    For moves, move is the name without the jump prefix, follow-up or repeat count"""
+
+    text: str
+    kind: str
+    move: str = ""
+    airborne: bool = False
+    follow_up: str = ""
+    repeat: int = 1
+
+
+# e.g. j.236HK~LK x2, jump prefix, move, follow-up and repeat count
+MOVE_TOKEN_REGEX: re.Pattern[str] = re.compile(
+    r"(?P<jump>j\.?(?=[\dLMH]))?(?P<move>[^~]+?)(?:~(?P<follow_up>.+?))?(?:\s?[Xx]\s?(?P<repeat>\d+))?$",
+    re.IGNORECASE,
+)
+# A repeat count written on its own after the move, e.g. the "x2" of "5MK x2"
+REPEAT_WORD_REGEX: re.Pattern[str] = re.compile(r"[Xx]\d+$")
+
+# Ignored moves written as more than one word, e.g. "air dash cancel", by their first word
+# Longer phrases are first so the longest phrase is matched
+IGNORED_PHRASES: dict[str, list[list[str]]] = {}
+for ignored_move in sorted(const.IGNORED_MOVES, key=len, reverse=True):
+    if " " in ignored_move:
+        ignored_words: list[str] = ignored_move.split()
+        IGNORED_PHRASES.setdefault(ignored_words[0], []).append(ignored_words)
+
+
+@functools.lru_cache(maxsize=const.TOKEN_CACHE_SIZE)
+def classify(text: str) -> ComboToken:
+    """Get the token for a single move or keyword of combo notation"""
+    text = sys.intern(text)
+    lowered: str = text.lower()
+    if lowered == "kara":
+        return ComboToken(text, const.TOKEN_KARA)
+    if lowered in const.IGNORED_MOVES:
+        return ComboToken(text, const.TOKEN_IGNORED)
+
+    match: re.Match[str] | None = MOVE_TOKEN_REGEX.match(text)
+    if not match:
+        return ComboToken(text, const.TOKEN_MOVE, text)
+    return ComboToken(
+        text,
+        const.TOKEN_MOVE,
+        sys.intern(match.group("move")),
+        airborne=match.group("jump") is not None,
+        follow_up=match.group("follow_up") or "",
+        repeat=int(match.group("repeat") or 1),
+    )
+
+
+def ignored_phrase_length(words: list[str], start: int) -> int:
+    """Get the number of words of the ignored phrase starting at a word, 0 if there is none"""
+    for phrase in IGNORED_PHRASES.get(words[start].lower(), []):
+        if [word.lower() for word in words[start : start + len(phrase)]] == phrase:
+            return len(phrase)
+    return 0
+
+
+def tokenize(notation: str) -> list[ComboToken]:
+    """Tokenize a combo string
+    Moves are separated by whitespace. Ignored moves of more than one word are one token, and a
+    repeat count or follow-up written as a separate word is joined to the move before it
+    """
+    words: list[str] = notation.split()
+    tokens: list[ComboToken] = []
+    index: int = 0
+    while index < len(words):
+        word: str = words[index]
+        phrase_length: int = (
+            ignored_phrase_length(words, index)
+            if word.lower() in IGNORED_PHRASES
+            else 0
+        )
+        if phrase_length > 1:
+            tokens.append(classify(" ".join(words[index : index + phrase_length])))
+            index += phrase_length
+            continue
+
+        previous_is_move: bool = bool(tokens) and tokens[-1].kind == const.TOKEN_MOVE
+        if previous_is_move and REPEAT_WORD_REGEX.match(word):
+            tokens[-1] = classify(f"{tokens[-1].text} {word}")
+        elif previous_is_move and word.startswith("~"):
+            tokens[-1] = classify(tokens[-1].text + word)
+        else:
+            tokens.append(classify(word))
+        index += 1
+    return tokens
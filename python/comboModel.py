@@ -0,0 +1,219 @@
+"""
+Incremental combo model for editing combos.
+Keeps the state of the combo after every frame data row of every move, so appending, inserting,
+removing or replacing a move only recalculates the combo from the edited move on.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Iterable, NamedTuple
+
+from pandas import DataFrame
+
+import comboEngine
+import constants as const
+import parseCombo
+from comboLexer import ComboToken
+
+# flake8: noqa: E501
+
+
+class ComboState(NamedTuple):
+    """The state of a combo after a frame data row
+    hit_number is the hit number used for damage scaling, hit_count is the number of hits so far
+    """
+
+    hit_number: int = 0
+    hit_count: int = 0
+    damage: int = 0
+    undizzy: int = 0
+
+
+def get_tokens(moves: Any) -> list[ComboToken]:
+    """Get the tokens of a combo string, a token or a sequence of them"""
+    if isinstance(moves, (str, ComboToken)):
+        moves = [moves]
+    return list(parseCombo.iter_combo_tokens(moves))
+
+
+class IncrementalCombo:
+    """A combo that is recalculated from the point it was edited
+    The moves are comboLexer tokens. Each frame data row the moves resolve to has the state of the
+    combo after it. Each move has the row it starts at, the row it kara cancelled if it is a kara
+    and Annie's divekick count before it, which is everything needed to undo the moves after an
+    edit and carry on calculating the combo from there."""
+
+    def __init__(
+        self,
+        character_name: str,
+        moves: Iterable[Any] = (),
+        full_framedata_df: DataFrame | None = None,
+        move_name_alias_df: DataFrame | None = None,
+    ) -> None:
+        if full_framedata_df is None or move_name_alias_df is None:
+            full_framedata_df, move_name_alias_df = comboEngine.get_tables()
+        self.character_name: str = character_name
+        self.full_framedata_df: DataFrame = full_framedata_df
+        self.resolver: parseCombo.MoveResolver = parseCombo.get_move_resolver(
+            full_framedata_df, move_name_alias_df
+        )
+        # divekick count of the moves being resolved, the resolver is shared with other combos
+        self.context: parseCombo.ComboContext = parseCombo.ComboContext()
+        self.row_hits: list[tuple[int, ...]] = parseCombo.get_row_hits(
+            full_framedata_df
+        )
+        self.row_undizzy: list[int] = parseCombo.get_row_undizzy(
+            full_framedata_df
+        ).tolist()
+
+        self.tokens: list[ComboToken] = []
+        # frame data rows of the combo with the search state that found them and the state after them
+        self.rows: list[int] = []
+        self.search_states: list[str] = []
+        self.states: list[ComboState] = [ComboState()]
+        # length of rows before each move, the row removed by each kara with its search state
+        # and state, and the divekick count before and after each move
+        self.move_row_starts: list[int] = []
+        self.move_removed_rows: list[tuple[int, str, ComboState] | None] = []
+        self.move_divekick_counts: list[int] = [0]
+        # state of the combo after each move
+        self.move_states: list[ComboState] = []
+        # rows, search state and divekick count after stateful moves by the divekick count before them
+        self.stateful_moves: dict[tuple[str, int], tuple[list[int], str, int]] = {}
+
+        self.insert(0, moves)
+
+    def __len__(self) -> int:
+        return len(self.tokens)
+
+    @property
+    def damage(self) -> int:
+        """Total damage of the combo"""
+        return self.states[-1].damage
+
+    @property
+    def undizzy(self) -> int:
+        """Total undizzy of the combo"""
+        return self.states[-1].undizzy
+
+    @property
+    def hit_count(self) -> int:
+        """Number of hits in the combo"""
+        return self.states[-1].hit_count
+
+    @property
+    def divekick_count(self) -> int:
+        """Annie's divekick count at the end of the combo"""
+        return self.move_divekick_counts[-1]
+
+    def state_after(self, move_index: int) -> ComboState:
+        """State of the combo after a move"""
+        return self.move_states[move_index]
+
+    def append(self, moves: Any) -> None:
+        """Add moves to the end of the combo"""
+        self.insert(len(self.tokens), moves)
+
+    def insert(self, move_index: int, moves: Any) -> None:
+        """Insert moves before a move, moves are a combo string, a token or a sequence of them"""
+        self.tokens[move_index:move_index] = get_tokens(moves)
+        self._recalculate(move_index)
+
+    def remove(self, move_index: int) -> None:
+        """Remove a move from the combo"""
+        del self.tokens[move_index]
+        self._recalculate(move_index)
+
+    def replace(self, move_index: int, moves: Any) -> None:
+        """Replace a move with other moves, see insert"""
+        self.tokens[move_index : move_index + 1] = get_tokens(moves)
+        self._recalculate(move_index)
+
+    def _recalculate(self, move_index: int) -> None:
+        """Recalculate the combo from a move on, the moves before it are unchanged"""
+        move_index = max(0, min(move_index, len(self.move_row_starts)))
+        # undo the moves from the last one back to the edited move
+        for undo_index in range(len(self.move_row_starts) - 1, move_index - 1, -1):
+            row_start: int = self.move_row_starts[undo_index]
+            del self.rows[row_start:]
+            del self.search_states[row_start:]
+            del self.states[row_start + 1 :]
+            removed_row: tuple[int, str, ComboState] | None = self.move_removed_rows[
+                undo_index
+            ]
+            if removed_row is not None:
+                self.rows.append(removed_row[0])
+                self.search_states.append(removed_row[1])
+                self.states.append(removed_row[2])
+        del self.move_row_starts[move_index:]
+        del self.move_removed_rows[move_index:]
+        del self.move_divekick_counts[move_index + 1 :]
+        del self.move_states[move_index:]
+
+        context: parseCombo.ComboContext = self.context
+        context.annie_divekick_count = self.move_divekick_counts[-1]
+        context.unresolved_moves = []
+        for token in self.tokens[move_index:]:
+            self.move_row_starts.append(len(self.rows))
+            removed_row = None
+            if token.kind == const.TOKEN_KARA:
+                # the move before was kara cancelled, see parseCombo.resolve_combo
+                if self.rows:
+                    removed_row = (
+                        self.rows.pop(),
+                        self.search_states.pop(),
+                        self.states.pop(),
+                    )
+            elif token.kind == const.TOKEN_MOVE:
+                row_positions, search_state = self._resolve(token)
+                for row in row_positions:
+                    self._add_row(row, search_state)
+            self.move_removed_rows.append(removed_row)
+            self.move_divekick_counts.append(context.annie_divekick_count)
+            self.move_states.append(self.states[-1])
+
+    def _resolve(self, token: ComboToken) -> tuple[list[int], str]:
+        """Resolve a move, stateful moves are only resolved once for each divekick count before them"""
+        resolver: parseCombo.MoveResolver = self.resolver
+        context: parseCombo.ComboContext = self.context
+        if not parseCombo.is_stateful_move(
+            token.text, resolver.combo_character(self.character_name, context)
+        ):
+            return resolver.resolve(token.text, self.character_name, context)
+
+        key: tuple[str, int] = (token.text, context.annie_divekick_count)
+        resolved: tuple[list[int], str, int] | None = self.stateful_moves.get(key)
+        if resolved is None:
+            row_positions, search_state = resolver.resolve(
+                token.text, self.character_name, context
+            )
+            resolved = (row_positions, search_state, context.annie_divekick_count)
+            self.stateful_moves[key] = resolved
+        context.annie_divekick_count = resolved[2]
+        return resolved[0], resolved[1]
+
+    def _add_row(self, row: int, search_state: str) -> None:
+        """Add a frame data row to the end of the combo"""
+        state: ComboState = self.states[-1]
+        hits: tuple[int, ...] = self.row_hits[row]
+        damage, hit_number = comboEngine.add_scaled_hits(hits, state.hit_number)
+        self.rows.append(row)
+        self.search_states.append(search_state)
+        self.states.append(
+            ComboState(
+                hit_number,
+                state.hit_count + len(hits),
+                state.damage + damage,
+                state.undizzy + self.row_undizzy[row] * len(hits),
+            )
+        )
+
+    def frame_data(self) -> DataFrame:
+        """Get the frame data of the combo, as parseCombo.get_frame_data_for_combo"""
+        return parseCombo.get_frame_data_for_positions(
+            self.full_framedata_df, self.rows, self.search_states
+        )
+
+    def damage_table(self) -> DataFrame:
+        """Get the damage of every hit of the combo, as comboEngine.get_combo_damage"""
+        return comboEngine.get_combo_damage(self.frame_data())
@@ -0,0 +1,278 @@
+"""
+Link validation of combos from the frame data.
+Every pair of consecutive moves in a combo is either a chain, which the Properties of the first
+move allow, or a link, which needs the first move to leave the opponent in hitstun until the
+second move is active. The frame advantage of every row is worked out once per frame data table,
+so a batch of combos is validated in one array pass over the pairs of consecutive rows:
+
+    summary_df = comboValidator.validate_combos(parseCombo.iter_combo_csvs(combo_csvs))
+
+Only links that can be worked out from the frame data are checked. A pair is checked when both
+moves are ground normals and the combo has not yet used a move that changes the state of the
+opponent (knockdowns, bounces, staggers, launchers, specials and supers), after which the
+hitstun of the opponent is no longer the hitstun in the frame data. Pairs that cannot be
+checked are assumed to combo, so a combo is only invalid when a link is known to be too tight.
+"""
+
+from __future__ import annotations
+
+import re
+import time
+from typing import Iterable, NamedTuple
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+import comboEngine
+import constants as const
+import parseCombo
+
+# flake8: noqa: E501
+
+# Strength of the normals, a normal chains into normals of the same or a higher strength
+NORMAL_STRENGTHS: dict[str, int] = {"Light": 1, "Medium": 2, "Heavy": 3}
+# Airborne normals, e.g. J.LP or Headless JHK
+AIRBORNE_MOVE_REGEX: re.Pattern[str] = re.compile(r"^(?:HEADLESS\s+)?J", re.IGNORECASE)
+# Hits leaving the opponent in a state other than standing hitstun, e.g. "Soft KD" or "Wall Bounce"
+HIT_STATE_REGEX: re.Pattern[str] = re.compile(
+    r"KD|knockdown|bounce|splat|stagger|crumple|stun|grab|launch|see notes",
+    re.IGNORECASE,
+)
+# Properties changing the state of the opponent
+HIT_STATE_PROPERTIES: tuple[str, ...] = ("launcher", "hit grab", "sweep", "snapback")
+# Cells with a single frame count, multi hit rows only use the advantage in the frame data
+SINGLE_FRAME_COUNT_REGEX: re.Pattern[str] = re.compile(r"^\s*\d+\s*$")
+
+
+class LinkTable(NamedTuple):
+    """Everything the validator needs to know about every frame data row
+
+    advantage is the frame advantage on hit, startup the first active frame and both are NaN
+    when the frame data does not have them. base_move is an integer code of the move name without
+    its repeat count, so 5LP and 5LP X2 are the same move. breaks_links is True for rows after
+    which links can no longer be checked"""
+
+    checked: np.ndarray
+    breaks_links: np.ndarray
+    strength: np.ndarray
+    base_move: np.ndarray
+    chains_into_self: np.ndarray
+    chains_backwards: np.ndarray
+    advantage: np.ndarray
+    startup: np.ndarray
+
+
+class LinkValidation(NamedTuple):
+    """Validity of every combo of a batch
+    failing_move is the index of the first move of each combo that cannot link from the move
+    before it, counting every move of the combo, previous_move the index of the move it links
+    from and gap_frames is how many frames too late it is active. All are -1 for valid combos
+    """
+
+    valid: np.ndarray
+    failing_move: np.ndarray
+    previous_move: np.ndarray
+    gap_frames: np.ndarray
+
+
+def has_property(properties: pd.Series, name: str) -> np.ndarray:
+    """Rows whose Properties have a property, ignoring case and qualifiers in brackets"""
+    return (
+        properties.fillna("")
+        .str.contains(rf"(?:^|[,\n])\s*{re.escape(name)}\s*(?:\(|,|\n|$)", case=False)
+        .to_numpy(dtype=bool)
+    )
+
+
+def frame_values(frame_data: DataFrame, column: str) -> np.ndarray:
+    """The parsed values of a frame column as floats, NaN where the frame data has none"""
+    return frame_data[f"{column}{const.VALUE_SUFFIX}"].to_numpy(
+        dtype=np.float64, na_value=np.nan
+    )
+
+
+def build_link_table(frame_data: DataFrame) -> LinkTable:
+    """Work out the link table of a frame data table"""
+    move_types: list[str] = parseCombo.get_row_move_types(frame_data)
+    move_names: pd.Series = frame_data[const.MOVE_NAME].fillna("").astype(str)
+    properties: pd.Series = frame_data[const.PROPERTIES]
+    on_hit: pd.Series = frame_data[const.ON_HIT].fillna("").astype(str)
+
+    strength: np.ndarray = np.array(
+        [NORMAL_STRENGTHS.get(move_type, 0) for move_type in move_types], dtype=np.int8
+    )
+    airborne: np.ndarray = move_names.str.match(AIRBORNE_MOVE_REGEX).to_numpy(
+        dtype=bool
+    )
+    hit_state: np.ndarray = np.logical_or.reduce(
+        [on_hit.str.contains(HIT_STATE_REGEX).to_numpy(dtype=bool)]
+        + [has_property(properties, name) for name in HIT_STATE_PROPERTIES]
+    )
+
+    # Hitstun left after the attacker recovers, the active frames after the hit count against it.
+    # Hitstop freezes both characters for the same time so it does not change the advantage.
+    # The advantage in the frame data is used when it is better, it covers multi hit rows.
+    single_hit: np.ndarray = (
+        frame_data[const.ACTIVE].astype(str).str.match(SINGLE_FRAME_COUNT_REGEX)
+        & frame_data[const.HITSTUN].astype(str).str.match(SINGLE_FRAME_COUNT_REGEX)
+    ).to_numpy(dtype=bool)
+    frame_advantage: np.ndarray = np.where(
+        single_hit,
+        frame_values(frame_data, const.HITSTUN)
+        - (frame_values(frame_data, const.ACTIVE) - 1)
+        - frame_values(frame_data, const.RECOVERY),
+        np.nan,
+    )
+    listed_advantage: np.ndarray = np.fmax(
+        frame_values(frame_data, const.ON_HIT),
+        frame_data[f"{const.ON_HIT}{const.MAX_SUFFIX}"].to_numpy(
+            dtype=np.float64, na_value=np.nan
+        ),
+    )
+
+    return LinkTable(
+        checked=(strength > 0) & ~airborne & ~hit_state,
+        breaks_links=(strength == 0) | hit_state,
+        strength=strength,
+        base_move=pd.factorize(
+            frame_data[const.CHARACTER_NAME].astype(str)
+            + " "
+            + move_names.str.upper().str.replace(
+                parseCombo.REPEAT_MOVE_REGEX, "", regex=True
+            )
+        )[0],
+        chains_into_self=has_property(properties, "chains into self"),
+        chains_backwards=has_property(properties, "chains backwards"),
+        advantage=np.fmax(frame_advantage, listed_advantage),
+        startup=frame_values(frame_data, const.STARTUP),
+    )
+
+
+def get_link_table(frame_data: DataFrame) -> LinkTable:
+    """Get the link table of a frame data table, building it on first use"""
+    return parseCombo.get_derived_table(frame_data, "link_table", build_link_table)
+
+
+def validate_rows(
+    link_table: LinkTable,
+    rows: np.ndarray,
+    move_numbers: np.ndarray,
+    row_offsets: np.ndarray,
+) -> LinkValidation:
+    """Validate a batch of combos given as the frame data rows of every combo in one array
+    move_numbers is the move each row belongs to, rows of the same move are never a link.
+    row_offsets is the index of the first row of each combo, followed by the number of rows
+    """
+    combo_count: int = len(row_offsets) - 1
+    valid: np.ndarray = np.ones(combo_count, dtype=bool)
+    failing_move: np.ndarray = np.full(combo_count, -1, dtype=np.int64)
+    previous_move: np.ndarray = np.full(combo_count, -1, dtype=np.int64)
+    gap_frames: np.ndarray = np.full(combo_count, -1, dtype=np.int64)
+    if len(rows) < 2:
+        return LinkValidation(valid, failing_move, previous_move, gap_frames)
+
+    # combo of every row, and the number of rows breaking links up to each row
+    row_combos: np.ndarray = np.repeat(np.arange(combo_count), np.diff(row_offsets))
+    breaks: np.ndarray = np.cumsum(link_table.breaks_links[rows])
+    breaks_before_combo: np.ndarray = np.concatenate(([0], breaks))[row_offsets[:-1]][
+        row_combos
+    ]
+
+    first: np.ndarray = rows[:-1]
+    second: np.ndarray = rows[1:]
+    checked: np.ndarray = (
+        (row_combos[:-1] == row_combos[1:])
+        & (move_numbers[:-1] != move_numbers[1:])
+        & link_table.checked[first]
+        & link_table.checked[second]
+        & (breaks[:-1] == breaks_before_combo[:-1])
+    )
+    same_move: np.ndarray = link_table.base_move[first] == link_table.base_move[second]
+    chains: np.ndarray = np.where(
+        same_move,
+        link_table.chains_into_self[first],
+        (link_table.strength[second] >= link_table.strength[first])
+        | link_table.chains_backwards[first],
+    )
+    # frames between the opponent leaving hitstun and the second move being active
+    gaps: np.ndarray = (link_table.startup[second] - 1) - link_table.advantage[first]
+    failing: np.ndarray = np.flatnonzero(checked & ~chains & (gaps > 0))
+
+    # first failing link of every invalid combo
+    failing_combos, first_failing = np.unique(row_combos[failing], return_index=True)
+    failing = failing[first_failing]
+    valid[failing_combos] = False
+    failing_move[failing_combos] = move_numbers[failing + 1]
+    # ignored and kara moves can sit between the rows of a link
+    previous_move[failing_combos] = move_numbers[failing]
+    gap_frames[failing_combos] = gaps[failing].astype(np.int64)
+    return LinkValidation(valid, failing_move, previous_move, gap_frames)
+
+
+def validate_combos(
+    combos: Iterable[parseCombo.ComboInput],
+    full_framedata_df: DataFrame | None = None,
+    move_name_alias_df: DataFrame | None = None,
+) -> DataFrame:
+    """Resolve and validate the links of a batch of combos
+    Uses the default frame data tables when none are given.
+    Returns a table with a row per combo, the throughput is kept in the CombosPerSecond
+    attribute of the table"""
+    start_time: float = time.perf_counter()
+    if full_framedata_df is None or move_name_alias_df is None:
+        full_framedata_df, move_name_alias_df = comboEngine.get_tables()
+
+    resolver: parseCombo.MoveResolver = parseCombo.get_move_resolver(
+        full_framedata_df, move_name_alias_df
+    )
+    link_table: LinkTable = get_link_table(full_framedata_df)
+
+    combo_names: list[str] = []
+    characters: list[str] = []
+    combo_moves: list[list[str]] = []
+    # frame data rows of every combo, the move of each row and the index of the first row of each combo
+    row_positions: list[int] = []
+    row_move_numbers: list[int] = []
+    row_offsets: list[int] = [0]
+    for combo in combos:
+        combo_positions, _, move_numbers = parseCombo.resolve_combo_moves(
+            resolver, combo.character, combo.moves
+        )
+        row_positions += combo_positions
+        row_move_numbers += move_numbers
+        row_offsets.append(len(row_positions))
+        combo_names.append(combo.name)
+        characters.append(combo.character)
+        combo_moves.append(
+            [token.text for token in parseCombo.iter_combo_tokens(combo.moves)]
+        )
+
+    validation: LinkValidation = validate_rows(
+        link_table,
+        np.array(row_positions, dtype=np.int64),
+        np.array(row_move_numbers, dtype=np.int64),
+        np.array(row_offsets, dtype=np.int64),
+    )
+    summary_df: DataFrame = DataFrame(
+        {
+            "Character": characters,
+            "Combo": combo_names,
+            "Valid": validation.valid,
+            "FailingMove": validation.failing_move,
+            "FailingLink": [
+                (
+                    f"{moves[previous_move]} > {moves[move_number]}"
+                    if previous_move >= 0
+                    else ""
+                )
+                for moves, previous_move, move_number in zip(
+                    combo_moves, validation.previous_move, validation.failing_move
+                )
+            ],
+            "GapFrames": validation.gap_frames,
+        }
+    )
+    seconds: float = time.perf_counter() - start_time
+    summary_df.attrs["CombosPerSecond"] = len(summary_df) / seconds if seconds else 0.0
+    return summary_df
@@ -1,6 +1,10 @@
 """Skug combo constants."""
 from typing import Literal
+import atexit
 import logging
+import logging.handlers
+import os
+import queue
 
 # flake8: noqa: E501
 
@@ -9,6 +13,45 @@ CHARACTER_NAME: Literal["Character"] = "Character"
 MOVE_NAME: Literal["MoveName"] = "MoveName"
 ALT_NAMES: Literal["AltNames"] = "AltNames"
 DAMAGE: Literal["Damage"] = "Damage"
+GUARD: Literal["Guard"] = "Guard"
+PROPERTIES: Literal["Properties"] = "Properties"
+METER: Literal["Meter"] = "Meter"
+STARTUP: Literal["Startup"] = "Startup"
+ACTIVE: Literal["Active"] = "Active"
+RECOVERY: Literal["Recovery"] = "Recovery"
+HITSTUN: Literal["Hitstun"] = "Hitstun"
+BLOCKSTUN: Literal["Blockstun"] = "Blockstun"
+HITSTOP: Literal["Hitstop"] = "Hitstop"
+ON_HIT: Literal["OnHit"] = "OnHit"
+ON_BLOCK: Literal["OnBlock"] = "OnBlock"
+ON_PUSHBLOCK: Literal["OnPushblock"] = "OnPushblock"
+# Column name of the newline separated abbreviations of a character in the characters csv
+CHARACTER_START: Literal["CharacterStart"] = "CharacterStart"
+
+# Column names for damage parsed when the frame data is loaded
+HIT_DAMAGE: Literal["HitDamage"] = "HitDamage"
+CHIP_DAMAGE: Literal["ChipDamage"] = "ChipDamage"
+SPECIAL_DAMAGE: Literal["SpecialDamage"] = "SpecialDamage"
+# Column name for the move type found when the frame data is loaded, a key of UNDIZZY_DICT
+MOVE_TYPE: Literal["MoveType"] = "MoveType"
+# Frame data columns parsed into frame counts when the frame data is loaded
+FRAME_COLUMNS: tuple[str, ...] = (
+    STARTUP,
+    ACTIVE,
+    RECOVERY,
+    HITSTUN,
+    BLOCKSTUN,
+    HITSTOP,
+    ON_HIT,
+    ON_BLOCK,
+    ON_PUSHBLOCK,
+)
+# Suffixes of the columns parsed from a frame column or the meter, e.g. OnBlockValue
+# Value is the main number, Alt the number in brackets, e.g. the +10 of "+4 [+10]",
+# and Max the end of a range, e.g. the +12 of "+11 to +12"
+VALUE_SUFFIX: Literal["Value"] = "Value"
+ALT_SUFFIX: Literal["Alt"] = "Alt"
+MAX_SUFFIX: Literal["Max"] = "Max"
 
 EXPECTED_DAMAGE: Literal["ExpectedDamage"] = "ExpectedDamage"
 
@@ -17,9 +60,13 @@ HIT_NUMBER: Literal["HitNumber"] = "HitNumber"
 DAMAGE_SCALING: Literal["DamageScaling"] = "DamageScaling"
 SCALED_DAMAGE: Literal["ScaledDamage"] = "ScaledDamage"
 UNDIZZY: Literal["Undizzy"] = "Undizzy"
+TOTAL_UNDIZZY: Literal["TotalUndizzy"] = "TotalUndizzy"
 TOTAL_DAMAGE_FOR_MOVE: Literal["TotalDamageForMove"] = "TotalDamageForMove"
 TOTAL_DAMAGE_FOR_COMBO: Literal["TotalDamageForCombo"] = "TotalDamageForCombo"
 
+# Column names for combo frame data
+SEARCH_STATE: Literal["SearchState"] = "SearchState"
+
 # Floats for combo damage calculations
 DAMAGE_SCALING_MIN: float = 0.2
 DAMAGE_SCALING_MIN_ABOVE_1K: float = 0.275
@@ -36,7 +83,8 @@ UNDIZZY_DICT: dict[str, int] = {
     "Special": 30,
     "Throws+Supers": 0,
 }
-
+# Undizzy at which the undizzy bar is full, combos reaching it can be burst
+UNDIZZY_MAX: int = 240
 
 
 # Move names to automatically ignore
@@ -56,62 +104,156 @@ IGNORED_MOVES: list[str] = [
     "restand",
 ]
 
-SEARCH_STATES: dict[str, bool] = {
-    "character_specific": False,
-    "repeat": False,
-    "start": False,
-    "follow_up": False,
-    "alias": False,
-    "generic": False,
-    "no_strength": False,
-    "not_found": False,
-}
+# Kinds of combo notation tokens, see comboLexer
+TOKEN_MOVE: Literal["move"] = "move"
+TOKEN_KARA: Literal["kara"] = "kara"
+TOKEN_IGNORED: Literal["ignored"] = "ignored"
+# Number of distinct tokens kept by the tokenizer
+TOKEN_CACHE_SIZE: int = 65536
 
+# Move search strategies, in the order they are tried
+SEARCH_STATES: tuple[str, ...] = (
+    "character_specific",
+    "repeat",
+    "start",
+    "follow_up",
+    "alias",
+    "generic",
+    "no_strength",
+)
+# Search state recorded for moves that none of the search strategies found
+NOT_FOUND: Literal["not_found"] = "not_found"
+
+# Canonical character of Annie, whose divekicks depend on the moves before them
+ANNIE: str = "ANNIE"
 ANNIE_DIVEKICK: str = "RE ENTRY"
 
+# Number of resolved moves kept by the move resolution cache
+MOVE_RESOLUTION_CACHE_SIZE: int = 4096
+# Number of move resolvers kept, one for each frame data snapshot in use
+MOVE_RESOLVER_CACHE_SIZE: int = 4
+# Seconds between checks for changes to the frame data csv files by FrameDataStore.watch
+FRAME_DATA_WATCH_INTERVAL: float = 5.0
+# Number of suggestions given for a move that is not found
+MOVE_SUGGESTION_COUNT: int = 3
+# Edit distance beyond which names are not suggested
+MOVE_SUGGESTION_MAX_DISTANCE: int = 3
+
+# Number of combos scored together when streaming combos, bounds the memory used by each batch
+COMBO_STREAM_BATCH_SIZE: int = 1024
+
 LOG_LEVEL_CONSOLE: int = logging.INFO
 LOG_LEVEL_FILE: int = logging.DEBUG
-def logger_setup() -> logging.Logger:
-    """Set up the logger."""
+LOG_FILE_VERBOSE: str = "skug_combo.log"
+LOG_FILE_INFO: str = "skug_combo_info.log"
+# Log files are written next to the package rather than to the working directory
+LOG_DIR: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "logs")
+LOG_FILE_FORMAT: str = (
+    "[%(relativeCreated)dms] %(filename)s:%(lineno)d:%(funcName)s | %(levelname)s | %(message)s"
+)
 
-    # Log formats
-    file_format: logging.Formatter = logging.Formatter(
-        "[%(relativeCreated)dms] %(filename)s:%(lineno)d:%(funcName)s | %(levelname)s | %(message)s"
+# Seconds a fresh interpreter may take to import the combo engine, see damageCalc --check-import-time
+IMPORT_TIME_BUDGET_SECONDS: float = 1.5
+
+
+def update_logger_level(logger: logging.Logger) -> None:
+    """Set the level of the logger to the lowest level of its handlers
+    Messages no handler would write are then dropped before their arguments are formatted
+    """
+    logger.setLevel(
+        min((handler.level for handler in logger.handlers), default=logging.WARNING)
     )
 
+
+def logger_setup(console_level: int = LOG_LEVEL_CONSOLE) -> logging.Logger:
+    """Set up the logger.
+    Only logs to the console, the log files are added by add_log_file_handlers so importing
+    this module does not create or truncate them."""
+
     console_format: logging.Formatter = logging.Formatter("%(levelname)s | %(message)s")
 
     # Console handler
     console_handler = logging.StreamHandler()
     console_handler.setFormatter(console_format)
-    console_handler.setLevel(LOG_LEVEL_CONSOLE)
+    console_handler.setLevel(console_level)
+
+    # Logger
+
+    logger: logging.Logger = logging.getLogger(__name__)
+    logger.addHandler(console_handler)
+    update_logger_level(logger)
+
+    return logger
+
+
+# Writes the log files in a background thread when add_log_file_handlers is queued
+_log_listener: logging.handlers.QueueListener | None = None
+
+
+def add_log_file_handlers(
+    log_dir: str = LOG_DIR, level: int = LOG_LEVEL_FILE, queued: bool = False
+) -> None:
+    """Add the verbose and info log files to the logger, truncating them
+    The verbose log file gets messages of the given level and up. When queued the messages are
+    put on a queue and written to the files by a background thread, so the code logging them
+    does not wait on the disk.
+    Does nothing if the log files have already been added"""
+    global _log_listener
+    if _log_listener is not None or any(
+        isinstance(handler, logging.FileHandler) for handler in logger.handlers
+    ):
+        return
+
+    os.makedirs(log_dir, exist_ok=True)
+    file_format: logging.Formatter = logging.Formatter(LOG_FILE_FORMAT)
 
     # Verbose log handler
     verbose_log_handler: logging.FileHandler = logging.FileHandler(
-        "skug_combo.log", mode="w"
+        os.path.join(log_dir, LOG_FILE_VERBOSE), mode="w"
     )
 
     verbose_log_handler.setFormatter(file_format)
-    verbose_log_handler.setLevel(LOG_LEVEL_FILE)
+    verbose_log_handler.setLevel(level)
 
     # Info log handler
     info_log_handler: logging.FileHandler = logging.FileHandler(
-        "skug_combo_info.log", mode="w"
+        os.path.join(log_dir, LOG_FILE_INFO), mode="w"
     )
 
     info_log_handler.setFormatter(file_format)
-    info_log_handler.setLevel(logging.INFO)
+    info_log_handler.setLevel(max(level, logging.INFO))
 
-    # Logger
+    if queued:
+        queue_handler: logging.handlers.QueueHandler = logging.handlers.QueueHandler(
+            queue.SimpleQueue()
+        )
+        queue_handler.setLevel(level)
+        _log_listener = logging.handlers.QueueListener(
+            queue_handler.queue,
+            verbose_log_handler,
+            info_log_handler,
+            respect_handler_level=True,
+        )
+        _log_listener.start()
+        atexit.register(stop_log_listener)
+        logger.addHandler(queue_handler)
+    else:
+        logger.addHandler(verbose_log_handler)
+        logger.addHandler(info_log_handler)
+    update_logger_level(logger)
 
-    logger: logging.Logger = logging.getLogger(__name__)
-    logger.setLevel(logging.DEBUG)
 
-    logger.addHandler(console_handler)
-    logger.addHandler(verbose_log_handler)
-    logger.addHandler(info_log_handler)
-
-    return logger
+def stop_log_listener() -> None:
+    """Write the queued messages to the log files and stop the background thread"""
+    global _log_listener
+    if _log_listener is None:
+        return
+    for handler in logger.handlers[:]:
+        if isinstance(handler, logging.handlers.QueueHandler):
+            logger.removeHandler(handler)
+    update_logger_level(logger)
+    _log_listener.stop()
+    _log_listener = None
 
 
 logger: logging.Logger = logger_setup()
@@ -1,178 +1,51 @@
 # %%
 """
-Calculate the damage of a combo.
+Calculate the damage of the combos in the combo csv files.
+The damage calculation itself is in comboEngine, this module is the batch run over data/combo_csvs.
+Run it with `python damageCalc.py`, importing it does no I/O.
 """
+
 from __future__ import annotations
 
+import argparse
+import concurrent.futures
+import csv as csv_module
+import logging
 import os
-import math
-from typing import Any
+import subprocess
+import sys
+import typing
+from typing import TYPE_CHECKING, Any, Iterable
 import random
 import pandas as pd
-import numpy as np
-import matplotlib as mpl
-import matplotlib.pyplot as plt
-import cProfile
-import pstats
-from pandas import DataFrame, Series
-from pandas.io.formats import style, style_render
+from pandas import DataFrame
 
 import parseCombo
+import frameData
+import comboEngine
+import instrumentation
+from comboEngine import get_combo_damage, get_tables
 import constants as const
 from constants import logger
 
+if TYPE_CHECKING:
+    from pandas.io.formats import style
+
 # TODO Change combo df output structure to use one row per move, possibly with lists for things like damage, scaling, total damage, etc.
-# TODO Undizzy calc
 # TODO Basic stage calc
 # TODO Counter hits
 
 # flake8: noqa: E501
 # pylance: reportUnknownMemberType=false
 
-# attempt to get the data directory it is in the parent directory
-try:
-    data_dir: str = os.path.join(os.path.dirname(__file__), "..", "data")
-except NameError:
-    data_dir: str = os.path.join(os.getcwd(), "..", "data")
-
-move_name_alias_df: DataFrame = pd.read_csv(f"{data_dir}\\moveNameAliases.csv")
-full_framedata_df: DataFrame = pd.read_csv(f"{data_dir}\\fullFrameData.csv")
-
-
-# %%
-def remove_whitespace_from_column_names(df: DataFrame) -> DataFrame:
-    """Remove whitespace from column names in a dataframe."""
-    df.columns = df.columns.str.replace(" ", "")
-    return df
-
+data_dir: str = frameData.DATA_DIR
 
-def get_damage_scaling_for_hit(hit_num: int, damage: int) -> float:  # type: ignore
-    """Get the damage scaling for a hit."""
 
-    damage: int = int(damage)
-
-    # check if the damage is 0 -0 or none
-    if damage in [0, -1]:
-        # return the damage scaling for the hit before
-        return max(
-            const.DAMAGE_SCALING_MIN, const.DAMAGE_SCALING_FACTOR ** (hit_num - 4)
-        )
-
-    if hit_num <= 3:
-        return 1
-    # check if the damage is greater than 1000
-    if damage >= 1000:
-        scaling: float = max(
-            const.DAMAGE_SCALING_MIN_ABOVE_1K,
-            const.DAMAGE_SCALING_FACTOR ** (hit_num - 3),
-        )
-    else:
-        scaling = max(
-            const.DAMAGE_SCALING_MIN, const.DAMAGE_SCALING_FACTOR ** (hit_num - 3)
-        )
-
-    # round the damage scaling to 3 decimal places
-    # scaling: float = round(scaling, 3)
-    return scaling
-
-
-def get_combo_damage(combo_frame_data_df: DataFrame) -> DataFrame:
-    """Calculate the damage of a combo"""
-    # add columns for the damage scaling and scaled damage
-    table_undizzy_damage: DataFrame = DataFrame(
-        columns=[
-            const.MOVE_NAME,
-            const.DAMAGE,
-            const.HIT_NUMBER,
-            const.DAMAGE_SCALING,
-            const.SCALED_DAMAGE,
-            const.UNDIZZY,
-            const.TOTAL_DAMAGE_FOR_MOVE,
-            const.TOTAL_DAMAGE_FOR_COMBO,
-        ],
-        index=None,
-    )
-
-    df_newhits: DataFrame = parseCombo.parse_hits(combo_frame_data_df)
-
-    # add the newHits table to the damageAndUndizzyTable
-    table_undizzy_damage = pd.concat(
-        [table_undizzy_damage, df_newhits], ignore_index=True
-    )
-    # Add a column for the hit number
-    # Hit number goes up for each non-zero damage hit
-
-    # Create a new column that will contain the number of hits
-    table_undizzy_damage[const.HIT_NUMBER] = 0
-    # Loop through all rows in the table
-    row: Series[Any]
-    for row in table_undizzy_damage.itertuples():
-        move: Series[Any] = row
-        # Check if the damage is 0
-        if int(move.Damage) == 0:
-            # If it is 0, set the hit number to 0
-            table_undizzy_damage.at[move[0], const.HIT_NUMBER] = 0
-        else:
-            # If it is not 0, increment the hit number by 1
-            # Account for the fact that the index starts at 0 and avoid index out of range errors
-            if move[0] == 0:
-                table_undizzy_damage.at[move[0], const.HIT_NUMBER] = 1
-            else:
-                table_undizzy_damage.at[move[0], const.HIT_NUMBER] = (
-                    table_undizzy_damage.at[move[0] - 1, const.HIT_NUMBER] + 1
-                )
-
-    # add the damage scaling for each hit, based on the hit number column and the damage column
-    table_undizzy_damage[const.DAMAGE_SCALING] = table_undizzy_damage.apply(
-        lambda row: get_damage_scaling_for_hit(
-            row[const.HIT_NUMBER], row[const.DAMAGE]
-        ),
-        axis=1,
-    )
-
-    # calculate the real damage for each hit rounded down
-    table_undizzy_damage[const.SCALED_DAMAGE] = table_undizzy_damage.apply(
-        lambda row: math.floor(
-            float(row[const.DAMAGE]) * float(row[const.DAMAGE_SCALING])
-        ),
-        axis=1,
-    )
-    # calculate the total damage for the combo for each hit by summing all previous hits
-    table_undizzy_damage[const.TOTAL_DAMAGE_FOR_COMBO] = table_undizzy_damage[
-        const.SCALED_DAMAGE
-    ].cumsum()
-    # set the hit number to the index of the row
-    table_undizzy_damage[const.HIT_NUMBER] = table_undizzy_damage.index + 1
-    total_damage_for_moves(table_undizzy_damage)
-    # Print just the name, damage, scaled damage columns
-
-    return table_undizzy_damage
-
-
-def total_damage_for_moves(damage_undizzy_table: DataFrame) -> DataFrame:
-    """Calculate the total damage for each move in the combo."""
-    # add a new column to the df to store the total damage for each move
-    damage_undizzy_table[const.TOTAL_DAMAGE_FOR_MOVE] = 0
-    move_damage: int = 0
-    # loop through each row in the df
-    for hit in range(len(damage_undizzy_table)):
-        # add the damage to the total damage for the move
-        move_damage += damage_undizzy_table.at[hit, const.SCALED_DAMAGE]
-
-        # if it's not the last row
-        if hit < len(damage_undizzy_table) - 1:
-            damage_undizzy_table.at[hit, const.TOTAL_DAMAGE_FOR_MOVE] = move_damage
-
-            # if the next hit is a different move
-            if (
-                damage_undizzy_table.at[hit, const.MOVE_NAME]
-                != damage_undizzy_table.at[hit + 1, const.MOVE_NAME]
-            ):
-                move_damage = 0
-        else:
-            damage_undizzy_table.at[hit, const.TOTAL_DAMAGE_FOR_MOVE] = move_damage
-
-    return damage_undizzy_table
+def __getattr__(name: str) -> Any:
+    """Load the frame data tables when they are first accessed as module attributes"""
+    if name in ("full_framedata_df", "move_name_alias_df"):
+        return getattr(comboEngine, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def set_up_pandas_options() -> None:
@@ -187,18 +60,12 @@ def set_up_pandas_options() -> None:
 
 
 # %%
-set_up_pandas_options()
-
-for df in [move_name_alias_df, full_framedata_df]:
-    remove_whitespace_from_column_names(df)
-csv_list: list[str] = parseCombo.get_csv_list(f"{data_dir}/combo_csvs")
-
-combo_process_summary: list[Any] = []
-
-combo_list: list[DataFrame] = []
-
-for csv in csv_list:
-    csv_filename: str = csv.split("\\")[-1].split(".")[0]
+def process_combo_csv(
+    csv: str, full_framedata_df: DataFrame, move_name_alias_df: DataFrame
+) -> tuple[dict[str, Any], DataFrame]:
+    """Calculate the damage of the combo in a combo csv
+    Returns the summary of the combo and its damage table"""
+    csv_filename: str = os.path.splitext(os.path.basename(csv))[0]
 
     combo_input_df: DataFrame = pd.read_csv(csv)
     """DataFrame Containing the combo input"""
@@ -216,24 +83,29 @@ for csv in csv_list:
     )
     combo_framedata_df[const.CHARACTER_NAME] = character_name
 
+    context: parseCombo.ComboContext = parseCombo.ComboContext()
     combo_framedata_df = parseCombo.get_frame_data_for_combo(
-        combo_framedata_df, full_framedata_df, move_name_alias_df
+        combo_framedata_df, full_framedata_df, move_name_alias_df, context
     )
+    unresolved_moves: str = parseCombo.format_unresolved_moves(context.unresolved_moves)
     combo_framedata_df: DataFrame = get_combo_damage(combo_framedata_df)
 
     # remove the columns that contain only missing data
     combo_framedata_df.dropna(axis=1, how="all", inplace=True)
 
     damage: int = combo_framedata_df[const.SCALED_DAMAGE].sum()
+    undizzy: int = combo_framedata_df[const.UNDIZZY].sum()
     # plot as a log scale
-    logger.debug(combo_framedata_df.columns)
-    logger.debug(f"Combo dataframe:\n{combo_framedata_df.to_string()}\n")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(combo_framedata_df.columns)
+        logger.debug("Combo dataframe:\n%s\n", combo_framedata_df.to_string())
 
-    logger.debug(f"Calculated damage: {damage}")
-    logger.debug(f"Expected damage: {expected_damage}")
-    logger.debug("Difference: " + str(damage - expected_damage))
+    logger.debug("Calculated damage: %s", damage)
+    logger.debug("Expected damage: %s", expected_damage)
+    logger.debug("Difference: %s", damage - expected_damage)
     logger.debug(
-        f"Percentage difference: {round((damage - expected_damage) / expected_damage * 100, 2)}%"
+        "Percentage difference: %s%%",
+        round((damage - expected_damage) / expected_damage * 100, 2),
     )
 
     summary: dict[str, Any] = {
@@ -243,23 +115,155 @@ for csv in csv_list:
         "CalculatedDamage": round(damage),
         "Difference": damage - round(expected_damage),
         "PercentageDifference": f"{round((damage - expected_damage) / expected_damage * 100)}%",
+        "Undizzy": undizzy,
+        "UndizzyCapped": undizzy >= const.UNDIZZY_MAX,
+        "UnresolvedMoves": unresolved_moves,
     }
-    # Add the combo to the output
-    combo_process_summary.append(summary)
-    combo_list.append(combo_framedata_df)
-
-# Create a dataframe from the output
-output_df: DataFrame = DataFrame(combo_process_summary)
-
-# display(output_df)
+    return summary, combo_framedata_df
+
+
+def try_process_combo_csv(
+    csv: str, full_framedata_df: DataFrame, move_name_alias_df: DataFrame
+) -> tuple[dict[str, Any], DataFrame | None]:
+    """Calculate the damage of the combo in a combo csv, without raising
+    If the combo can't be calculated the summary has the error and there is no damage table
+    """
+    try:
+        return process_combo_csv(csv, full_framedata_df, move_name_alias_df)
+    except Exception as error:  # pylint: disable=broad-except
+        logger.exception("Could not calculate the damage of %s", csv)
+        summary: dict[str, Any] = {
+            "Combo": os.path.splitext(os.path.basename(csv))[0],
+            "Error": f"{type(error).__name__}: {error}",
+        }
+        return summary, None
+
+
+def summarise_combo_results(
+    results: Iterable[tuple[dict[str, Any], DataFrame | None]],
+) -> tuple[DataFrame, list[DataFrame]]:
+    """Collect the results of processing combo csvs into the summary table and the damage tables"""
+    combo_process_summary: list[Any] = []
+
+    combo_list: list[DataFrame] = []
+
+    for summary, combo_framedata_df in results:
+        # Add the combo to the output
+        combo_process_summary.append(summary)
+        if combo_framedata_df is not None:
+            combo_list.append(combo_framedata_df)
+
+    # Create a dataframe from the output
+    output_df: DataFrame = DataFrame(combo_process_summary)
+
+    # display(output_df)
+
+    for combo, pct_diff in zip(  # type: ignore
+        output_df["Combo"], output_df["PercentageDifference"]  # type: ignore
+    ):
+        if isinstance(pct_diff, str) and pct_diff != "0%":
+            logger.info("%s has a %s difference", combo, pct_diff)
+
+    return output_df, combo_list
+
+
+def process_combo_csvs(
+    combo_csv_dir: str, full_framedata_df: DataFrame, move_name_alias_df: DataFrame
+) -> tuple[DataFrame, list[DataFrame]]:
+    """Calculate the damage of every combo csv in a directory
+    Returns the summary table and the damage table of each combo"""
+    csv_list: list[str] = parseCombo.get_csv_list(combo_csv_dir)
+
+    return summarise_combo_results(
+        try_process_combo_csv(csv, full_framedata_df, move_name_alias_df)
+        for csv in csv_list
+    )
 
-for combo, pct_diff in zip(  # type: ignore
-    output_df["Combo"], output_df["PercentageDifference"]  # type: ignore
-):
-    if pct_diff != "0%":
-        logger.info(f"{combo} has a {pct_diff} difference")
 
-logger.info("Done")
+def stream_combo_csvs(
+    csv_list: Iterable[str],
+    output_path: str | None = None,
+    max_damage_tables: int = 0,
+    data_dir: str = data_dir,
+) -> list[DataFrame]:
+    """Score the combos in combo csv files as they are read, for corpora too big to hold in memory
+    Each summary is written to output_path as soon as it is scored, and only the damage tables of
+    the first max_damage_tables combos are kept. Returns the kept damage tables"""
+    full_framedata_df, move_name_alias_df = get_tables(data_dir)
+    combo_list: list[DataFrame] = []
+
+    output_file: typing.TextIO | None = (
+        open(output_path, "w", newline="", encoding="utf-8") if output_path else None
+    )
+    writer: csv_module.DictWriter[str] | None = None
+    try:
+        for summary, damage_table in comboEngine.score_combo_stream(
+            parseCombo.iter_combo_csvs(csv_list),
+            full_framedata_df,
+            move_name_alias_df,
+            max_damage_tables=max_damage_tables,
+        ):
+            if output_file is not None:
+                if writer is None:
+                    writer = csv_module.DictWriter(
+                        output_file, fieldnames=list(summary)
+                    )
+                    writer.writeheader()
+                writer.writerow(summary)
+            if summary["PercentageDifference"] not in ("0%", ""):
+                logger.info(
+                    "%s has a %s difference",
+                    summary["Combo"],
+                    summary["PercentageDifference"],
+                )
+            if damage_table is not None:
+                combo_list.append(damage_table)
+    finally:
+        if output_file is not None:
+            output_file.close()
+
+    return combo_list
+
+
+def _init_combo_worker(data_dir: str) -> None:
+    """Load the frame data once in each worker process, from the store compiled before the pool
+    started"""
+    get_tables(data_dir)
+
+
+def _process_combo_csv_in_worker(
+    csv: str,
+) -> tuple[dict[str, Any], DataFrame | None]:
+    """Calculate the damage of a combo csv with the frame data loaded by _init_combo_worker"""
+    full_framedata_df, move_name_alias_df = get_tables()
+    return try_process_combo_csv(csv, full_framedata_df, move_name_alias_df)
+
+
+def process_combo_csvs_parallel(
+    combo_csv_dir: str,
+    data_dir: str = data_dir,
+    max_workers: int | None = None,
+    chunksize: int = 0,
+) -> tuple[DataFrame, list[DataFrame]]:
+    """Calculate the damage of every combo csv in a directory across a pool of processes
+    Each worker loads the frame data once when it starts, only the csv paths and the results
+    are sent between processes. The results are in the same order as process_combo_csvs and
+    a combo that fails is reported in the summary without stopping the run"""
+    csv_list: list[str] = parseCombo.get_csv_list(combo_csv_dir)
+    max_workers = max_workers or os.cpu_count() or 1
+    # compile the frame data store once here, so the workers only load it
+    frameData.ensure_frame_data_store(data_dir)
+    # enough chunks to balance the load without sending every csv on its own
+    chunksize = chunksize or max(1, len(csv_list) // (max_workers * 4))
+
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=max_workers,
+        initializer=_init_combo_worker,
+        initargs=(data_dir,),
+    ) as executor:
+        return summarise_combo_results(
+            executor.map(_process_combo_csv_in_worker, csv_list, chunksize=chunksize)
+        )
 
 
 # %%
@@ -312,8 +316,124 @@ def combo_prettify(
     return styler
 
 
-for combo in combo_list:
-    displaycombo: DataFrame = combo.copy()
-    column_name: str = const.MOVE_NAME
-    str_to_colour: dict[str, str] = unique_strings_to_colours(displaycombo, column_name)
-    #display(combo_prettify(combo.style, str_to_colour, column_name))
+def measure_import_time(module_name: str = "comboEngine") -> float:
+    """Measure how long a fresh interpreter takes to import a module, in seconds"""
+    code: str = (
+        "import time; start = time.perf_counter(); "
+        f"import {module_name}; print(time.perf_counter() - start)"
+    )
+    result: subprocess.CompletedProcess[str] = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def write_instrumentation(prefix: str) -> None:
+    """Stop the instrumentation, log its summary and write the profile, folded stacks and resolved moves"""
+    instrumentation.disable()
+    logger.info("Stages:\n%s", instrumentation.stage_summary().to_string())
+    logger.info("Move resolution cache: %s", instrumentation.cache_info())
+    instrumentation.write_profile(f"{prefix}.prof")
+    instrumentation.write_folded_stacks(f"{prefix}.folded")
+    instrumentation.move_summary().to_csv(f"{prefix}_moves.csv", index=False)
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Run the damage calculation over the combo csv files"""
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--data-dir", default=data_dir, help="frame data directory")
+    parser.add_argument(
+        "--check-import-time",
+        action="store_true",
+        help="measure the import time of the engine against its budget and exit",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="number of processes to calculate the combos with, 0 for one per cpu",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="score the combos as they are read instead of loading every combo csv, only with --workers 1",
+    )
+    parser.add_argument(
+        "--output", help="csv file to write the combo summaries to when streaming"
+    )
+    parser.add_argument(
+        "--max-damage-tables",
+        type=int,
+        default=0,
+        help="number of combo damage tables to keep when streaming",
+    )
+    parser.add_argument(
+        "--log-dir",
+        default=const.LOG_DIR,
+        help="directory to write the log files to, logs next to the package by default",
+    )
+    parser.add_argument(
+        "--no-log-files", action="store_true", help="only log to the console"
+    )
+    parser.add_argument(
+        "--queue-logs",
+        action="store_true",
+        help="write the log files from a background thread",
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="PREFIX",
+        help="record the time of each stage and write PREFIX.prof, PREFIX.folded and PREFIX_moves.csv, only with --workers 1",
+    )
+    args: argparse.Namespace = parser.parse_args(argv)
+    # the stages are recorded in the process running them, worker processes are not profiled
+    if args.profile and args.workers != 1:
+        parser.error("--profile only profiles this process, use it with --workers 1")
+    if args.stream and args.workers != 1:
+        parser.error(
+            "--stream scores the combos in this process, use it with --workers 1"
+        )
+
+    if not args.no_log_files:
+        const.add_log_file_handlers(args.log_dir, queued=args.queue_logs)
+
+    if args.check_import_time:
+        import_time: float = measure_import_time()
+        logger.info(
+            "comboEngine imported in %.3fs, budget %.3fs",
+            import_time,
+            const.IMPORT_TIME_BUDGET_SECONDS,
+        )
+        return 0 if import_time <= const.IMPORT_TIME_BUDGET_SECONDS else 1
+
+    set_up_pandas_options()
+    combo_csv_dir: str = os.path.join(args.data_dir, "combo_csvs")
+    if args.profile:
+        instrumentation.enable(profile=True)
+    if args.stream:
+        stream_combo_csvs(
+            parseCombo.get_csv_list(combo_csv_dir),
+            args.output,
+            args.max_damage_tables,
+            args.data_dir,
+        )
+    elif args.workers == 1:
+        full_framedata_df, move_name_alias_df = get_tables(args.data_dir)
+        process_combo_csvs(combo_csv_dir, full_framedata_df, move_name_alias_df)
+    else:
+        process_combo_csvs_parallel(
+            combo_csv_dir, args.data_dir, max_workers=args.workers or None
+        )
+    logger.info("Done")
+    if args.profile:
+        write_instrumentation(args.profile)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,774 @@
+"""Functions for loading the frame data and move name aliases from the csv files"""
+
+import contextlib
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from typing import Any, Iterator, NamedTuple
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+import constants as const
+from constants import logger
+import parseCombo
+
+# flake8: noqa: E501
+
+# The data directory is in the parent directory of this file
+DATA_DIR: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data")
+
+FRAME_DATA_CSV: str = "fullFrameData.csv"
+MOVE_NAME_ALIASES_CSV: str = "moveNameAliases.csv"
+CHARACTERS_CSV: str = "characters.csv"
+# Files the frame data store is compiled from
+SOURCE_FILES: tuple[str, ...] = (FRAME_DATA_CSV, MOVE_NAME_ALIASES_CSV, CHARACTERS_CSV)
+
+# Compiled frame data store, rebuilt when the csv files or the store version change
+# Bump the version whenever the layout of the store or the parsing of the csv files changes
+FRAME_DATA_STORE_DIR: str = "compiled"
+FRAME_DATA_STORE_VERSION: int = 6
+FRAME_DATA_STORE_MANIFEST: str = "manifest.json"
+# Lock file next to the store, held by the process compiling it
+FRAME_DATA_STORE_LOCK_SUFFIX: str = ".lock"
+# Seconds to wait for another process to compile the store before its lock is taken as stale
+FRAME_DATA_STORE_LOCK_TIMEOUT: float = 120.0
+FRAME_DATA_STORE_LOCK_POLL_INTERVAL: float = 0.05
+# Errors loading a store that is damaged or was swapped out while it was read
+FRAME_DATA_STORE_ERRORS: tuple[type[Exception], ...] = (
+    OSError,
+    ValueError,
+    KeyError,
+    IndexError,
+)
+# Columns of the frame data holding tuples of parsed damage
+DAMAGE_VALUE_COLUMNS: list[str] = [
+    const.HIT_DAMAGE,
+    const.CHIP_DAMAGE,
+    const.SPECIAL_DAMAGE,
+]
+# Columns parsed into numbers by add_frame_value_columns, with the dtype of their parsed columns
+FRAME_VALUE_DTYPES: dict[str, str] = {
+    **dict.fromkeys(const.FRAME_COLUMNS, "Int64"),
+    const.METER: "Float64",
+}
+
+
+def remove_whitespace_from_column_names(df: DataFrame) -> DataFrame:
+    """Remove whitespace from column names in a dataframe."""
+    df.columns = df.columns.str.replace(" ", "")
+    return df
+
+
+def add_damage_columns(frame_data: DataFrame) -> DataFrame:
+    """Parse the Damage column into the damage of each hit, the chip damage and the special damage
+    The values are stored as tuples in the HitDamage, ChipDamage and SpecialDamage columns
+    """
+    damage_values: list[parseCombo.DamageValues] = [
+        parseCombo.parse_damage_values(damage) for damage in frame_data[const.DAMAGE]
+    ]
+    frame_data[const.HIT_DAMAGE] = [values.hits for values in damage_values]
+    frame_data[const.CHIP_DAMAGE] = [values.chip for values in damage_values]
+    frame_data[const.SPECIAL_DAMAGE] = [values.special for values in damage_values]
+    return frame_data
+
+
+def add_move_type_column(frame_data: DataFrame) -> DataFrame:
+    """Classify every move as a Light, Medium, Heavy, Special or Throws+Supers in the MoveType column"""
+    frame_data[const.MOVE_TYPE] = parseCombo.get_row_move_types(frame_data)
+    return frame_data
+
+
+def get_frame_value_columns(frame_data: DataFrame) -> dict[str, str]:
+    """Get the columns added by add_frame_value_columns with their dtypes"""
+    return {
+        f"{column}{suffix}": dtype
+        for column, dtype in FRAME_VALUE_DTYPES.items()
+        if column in frame_data.columns
+        for suffix in (const.VALUE_SUFFIX, const.ALT_SUFFIX, const.MAX_SUFFIX)
+    }
+
+
+def add_frame_value_columns(frame_data: DataFrame) -> DataFrame:
+    """Parse the frame columns and meter into nullable numbers, once for the whole table
+    Each column gets Value, Alt and Max columns, e.g. OnBlock "+4 [+10]" is OnBlockValue 4 and
+    OnBlockAlt 10, see parseCombo.parse_frame_values. Missing numbers are NA"""
+    for column, dtype in FRAME_VALUE_DTYPES.items():
+        if column not in frame_data.columns:
+            continue
+        parsed_values: DataFrame = parseCombo.parse_frame_values(
+            frame_data[column], dtype
+        )
+        for suffix in parsed_values.columns:
+            frame_data[f"{column}{suffix}"] = parsed_values[suffix].array
+    return frame_data
+
+
+def load_frame_data(data_dir: str = DATA_DIR) -> DataFrame:
+    """Load the frame data with whitespace free column names, parsed damage, move types and
+    frame values"""
+    logger.debug("Loading frame data from %s", data_dir)
+    frame_data: DataFrame = pd.read_csv(os.path.join(data_dir, FRAME_DATA_CSV))
+    remove_whitespace_from_column_names(frame_data)
+    add_damage_columns(frame_data)
+    add_move_type_column(frame_data)
+    add_frame_value_columns(frame_data)
+    parseCombo.set_derived_table(
+        frame_data, "character_starts", load_character_starts(data_dir)
+    )
+    return frame_data
+
+
+def load_character_starts(data_dir: str = DATA_DIR) -> dict[str, list[str]]:
+    """Load the Character Start abbreviations of every character, by upper case character name"""
+    characters_df: DataFrame = remove_whitespace_from_column_names(
+        pd.read_csv(os.path.join(data_dir, CHARACTERS_CSV))
+    )
+    return {
+        str(character).upper(): (
+            [start.strip() for start in starts.split("\n") if start.strip()]
+            if isinstance(starts, str)
+            else []
+        )
+        for character, starts in zip(
+            characters_df[const.CHARACTER_NAME], characters_df[const.CHARACTER_START]
+        )
+    }
+
+
+def load_move_name_aliases(data_dir: str = DATA_DIR) -> DataFrame:
+    """Load the move name aliases with whitespace free column names"""
+    logger.debug("Loading move name aliases from %s", data_dir)
+    move_name_alias_df: DataFrame = pd.read_csv(
+        os.path.join(data_dir, MOVE_NAME_ALIASES_CSV)
+    )
+    return remove_whitespace_from_column_names(move_name_alias_df)
+
+
+def hash_source_files(data_dir: str = DATA_DIR) -> dict[str, str]:
+    """Get the sha256 hash of the frame data, move name alias and character csv files"""
+    source_hashes: dict[str, str] = {}
+    for file_name in SOURCE_FILES:
+        with open(os.path.join(data_dir, file_name), "rb") as source_file:
+            source_hashes[file_name] = hashlib.sha256(source_file.read()).hexdigest()
+    return source_hashes
+
+
+class StringTable:
+    """Deduplicated table of strings, stored as one null separated UTF-8 blob"""
+
+    def __init__(self) -> None:
+        self.ids: dict[str, int] = {}
+
+    def add(self, value: Any) -> int:
+        """Get the id of a string, adding it to the table if needed, missing values are -1"""
+        if not isinstance(value, str):
+            return -1
+        return self.ids.setdefault(value, len(self.ids))
+
+    def add_all(self, values: Any) -> np.ndarray:
+        """Get the ids of a sequence of strings"""
+        return np.array([self.add(value) for value in values], dtype=np.int32)
+
+    def to_bytes(self) -> np.ndarray:
+        """Encode the table as an array of UTF-8 bytes"""
+        return np.frombuffer("\0".join(self.ids).encode("utf-8"), dtype=np.uint8)
+
+
+def decode_string_table(blob: np.ndarray) -> np.ndarray:
+    """Decode a string table blob into an object array, with NaN at index -1 for missing values"""
+    strings: list[Any] = blob.tobytes().decode("utf-8").split("\0") if len(blob) else []
+    return np.array([*strings, np.nan], dtype=object)
+
+
+def pack_tuples(values: list[tuple[int, ...]]) -> tuple[np.ndarray, np.ndarray]:
+    """Pack a list of int tuples into offsets and values arrays"""
+    offsets: np.ndarray = np.zeros(len(values) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(value) for value in values])
+    packed_values: np.ndarray = np.array(
+        [item for value in values for item in value], dtype=np.int64
+    )
+    return offsets, packed_values
+
+
+def unpack_tuples(offsets: np.ndarray, values: np.ndarray) -> list[tuple[int, ...]]:
+    """Unpack offsets and values arrays into a list of int tuples"""
+    value_list: list[int] = values.tolist()
+    bounds: list[int] = offsets.tolist()
+    return [tuple(value_list[start:end]) for start, end in zip(bounds[:-1], bounds[1:])]
+
+
+def pack_name_index(
+    name_index: dict[tuple[str, str], list[int]], strings: StringTable
+) -> dict[str, np.ndarray]:
+    """Pack a move name index into arrays of key string ids and row position offsets"""
+    keys: np.ndarray = np.array(
+        [[strings.add(character), strings.add(name)] for character, name in name_index],
+        dtype=np.int32,
+    ).reshape(-1, 2)
+    offsets, positions = pack_tuples([tuple(rows) for rows in name_index.values()])
+    return {"keys": keys, "offsets": offsets, "positions": positions}
+
+
+def unpack_name_index(
+    arrays: dict[str, np.ndarray], string_values: np.ndarray
+) -> dict[tuple[str, str], list[int]]:
+    """Unpack the arrays of a packed move name index"""
+    keys: list[list[Any]] = string_values[arrays["keys"]].tolist()
+    rows: list[tuple[int, ...]] = unpack_tuples(arrays["offsets"], arrays["positions"])
+    return {
+        (character, name): list(positions)
+        for (character, name), positions in zip(keys, rows)
+    }
+
+
+@contextlib.contextmanager
+def frame_data_store_lock(store_dir: str) -> Iterator[None]:
+    """Hold the lock of a frame data store, so only one process compiles it at a time
+    The lock is a file created exclusively next to the store. A lock older than
+    FRAME_DATA_STORE_LOCK_TIMEOUT was left by a process that stopped while compiling, and is taken
+    over"""
+    lock_path: str = os.path.abspath(store_dir) + FRAME_DATA_STORE_LOCK_SUFFIX
+    os.makedirs(os.path.dirname(lock_path), exist_ok=True)
+    while True:
+        try:
+            lock_file: int = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            try:
+                lock_age: float = time.time() - os.stat(lock_path).st_mtime
+            except FileNotFoundError:
+                continue
+            if lock_age > FRAME_DATA_STORE_LOCK_TIMEOUT:
+                logger.warning("Taking over stale frame data store lock %s", lock_path)
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(lock_path)
+                continue
+            time.sleep(FRAME_DATA_STORE_LOCK_POLL_INTERVAL)
+    try:
+        os.write(lock_file, str(os.getpid()).encode())
+        yield
+    finally:
+        os.close(lock_file)
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(lock_path)
+
+
+def is_store_current(store_dir: str, data_dir: str = DATA_DIR) -> bool:
+    """Whether a frame data store exists and was compiled by this version from the current csv files"""
+    manifest: dict[str, Any] | None = read_store_manifest(store_dir)
+    return (
+        manifest is not None
+        and manifest.get("version") == FRAME_DATA_STORE_VERSION
+        and manifest.get("sources") == hash_source_files(data_dir)
+    )
+
+
+def compile_frame_data(
+    data_dir: str = DATA_DIR, store_dir: str | None = None, force: bool = True
+) -> str:
+    """Compile the frame data and move name aliases into a binary store
+    The store holds the normalised tables, the parsed damage, the move name index and the alias map
+    as NumPy arrays plus a string table, with a manifest recording the hashes of the csv files.
+    The store lock is held while compiling. Unless force is True, a store that another process
+    compiled while this one waited for the lock is kept as it is
+    """
+    store_dir = store_dir or os.path.join(data_dir, FRAME_DATA_STORE_DIR)
+    with frame_data_store_lock(store_dir):
+        if not force and is_store_current(store_dir, data_dir):
+            logger.info(
+                "Frame data store in %s was compiled by another process", store_dir
+            )
+            return store_dir
+        write_frame_data_store(data_dir, store_dir)
+    return store_dir
+
+
+def write_frame_data_store(data_dir: str, store_dir: str) -> None:
+    """Compile the store and swap it in for the previous one, see compile_frame_data
+    Only call it while holding the store lock"""
+    logger.info("Compiling frame data store in %s", store_dir)
+
+    source_hashes: dict[str, str] = hash_source_files(data_dir)
+    frame_data: DataFrame = load_frame_data(data_dir)
+    move_name_alias_df: DataFrame = load_move_name_aliases(data_dir)
+    move_index: parseCombo.MoveNameIndex = parseCombo.MoveNameIndex(frame_data)
+    alias_map: dict[str, str] = parseCombo.build_move_alias_map(move_name_alias_df)
+
+    strings: StringTable = StringTable()
+    frame_value_columns: dict[str, str] = get_frame_value_columns(frame_data)
+    frame_data_columns: list[str] = [
+        column
+        for column in frame_data.columns
+        if column not in DAMAGE_VALUE_COLUMNS and column not in frame_value_columns
+    ]
+    arrays: dict[str, np.ndarray] = {
+        "frame_data": np.column_stack(
+            [strings.add_all(frame_data[column]) for column in frame_data_columns]
+        ),
+        "aliases": np.column_stack(
+            [
+                strings.add_all(move_name_alias_df[column])
+                for column in move_name_alias_df
+            ]
+        ),
+        "characters": strings.add_all(move_index.characters),
+        "alias_map": np.array(
+            [
+                [strings.add(alias), strings.add(key)]
+                for alias, key in alias_map.items()
+            ],
+            dtype=np.int32,
+        ).reshape(-1, 2),
+    }
+    for column in DAMAGE_VALUE_COLUMNS:
+        arrays[f"{column}_offsets"], arrays[f"{column}_values"] = pack_tuples(
+            frame_data[column].tolist()
+        )
+    frame_value_dtypes: dict[str, list[str]] = {}
+    for column, dtype in frame_value_columns.items():
+        frame_value_dtypes.setdefault(dtype, []).append(column)
+    for dtype, columns in frame_value_dtypes.items():
+        arrays[f"frame_values_{dtype}"] = np.stack(
+            [
+                frame_data[column].to_numpy(dtype=np.dtype(dtype.lower()), na_value=0)
+                for column in columns
+            ]
+        )
+        arrays[f"frame_values_{dtype}_mask"] = np.stack(
+            [frame_data[column].isna().to_numpy() for column in columns]
+        )
+    for index_name, name_index in (
+        ("move_names", move_index.move_names),
+        ("alt_names", move_index.alt_names),
+    ):
+        for array_name, array in pack_name_index(name_index, strings).items():
+            arrays[f"{index_name}_{array_name}"] = array
+    arrays["strings"] = strings.to_bytes()
+
+    manifest: dict[str, Any] = {
+        "version": FRAME_DATA_STORE_VERSION,
+        "sources": source_hashes,
+        "columns": frame_data.columns.tolist(),
+        "frame_data_columns": frame_data_columns,
+        "frame_value_columns": frame_value_dtypes,
+        "alias_columns": move_name_alias_df.columns.tolist(),
+        "character_starts": parseCombo.get_character_starts(frame_data),
+    }
+
+    # Write the store next to its final location and swap it in, so readers never see a partial
+    # store. Between the two renames there is no store, readers finding none wait for the lock
+    parent_dir: str = os.path.dirname(os.path.abspath(store_dir))
+    os.makedirs(parent_dir, exist_ok=True)
+    temp_dir: str = tempfile.mkdtemp(dir=parent_dir, prefix=".frame_data_store_")
+    previous_dir: str = f"{temp_dir}_previous"
+    try:
+        os.chmod(temp_dir, 0o755)
+        for array_name, array in arrays.items():
+            np.save(os.path.join(temp_dir, f"{array_name}.npy"), array)
+        with open(
+            os.path.join(temp_dir, FRAME_DATA_STORE_MANIFEST), "w", encoding="utf-8"
+        ) as manifest_file:
+            json.dump(manifest, manifest_file, indent=2)
+        if os.path.exists(store_dir):
+            os.replace(store_dir, previous_dir)
+        os.replace(temp_dir, store_dir)
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        shutil.rmtree(previous_dir, ignore_errors=True)
+
+
+def read_store_manifest(store_dir: str) -> dict[str, Any] | None:
+    """Read the manifest of a frame data store, or None if there is no store"""
+    try:
+        with open(
+            os.path.join(store_dir, FRAME_DATA_STORE_MANIFEST), encoding="utf-8"
+        ) as manifest_file:
+            return json.load(manifest_file)
+    except (OSError, ValueError):
+        return None
+
+
+def load_frame_data_store(store_dir: str) -> tuple[DataFrame, DataFrame]:
+    """Load the frame data and move name aliases from a compiled store
+    The arrays are memory mapped, so the frame value columns and the hit damage values of
+    processes loading the same store share their pages. The string columns, damage tuples and
+    name indexes are decoded into new objects by every process, only their loading is faster.
+    The move name index, alias map and hit damage table are registered as derived tables
+    of the loaded frame data so they are not rebuilt"""
+    manifest: dict[str, Any] | None = read_store_manifest(store_dir)
+    if manifest is None:
+        raise FileNotFoundError(f"No frame data store in {store_dir}")
+
+    def load_array(array_name: str) -> np.ndarray:
+        return np.load(os.path.join(store_dir, f"{array_name}.npy"), mmap_mode="r")
+
+    string_values: np.ndarray = decode_string_table(load_array("strings"))
+
+    frame_data_ids: np.ndarray = load_array("frame_data")
+    frame_data_columns: dict[str, Any] = {
+        column: string_values[frame_data_ids[:, column_index]]
+        for column_index, column in enumerate(manifest["frame_data_columns"])
+    }
+    for column in DAMAGE_VALUE_COLUMNS:
+        frame_data_columns[column] = unpack_tuples(
+            load_array(f"{column}_offsets"), load_array(f"{column}_values")
+        )
+    # the frame values of each dtype are rows of one array, with a matching array of missing values
+    for dtype, columns in manifest["frame_value_columns"].items():
+        masked_array_type: type[pd.arrays.IntegerArray | pd.arrays.FloatingArray] = (
+            pd.arrays.IntegerArray
+            if pd.api.types.is_integer_dtype(dtype)
+            else pd.arrays.FloatingArray
+        )
+        values: np.ndarray = load_array(f"frame_values_{dtype}")
+        missing: np.ndarray = load_array(f"frame_values_{dtype}_mask")
+        for row, column in enumerate(columns):
+            frame_data_columns[column] = masked_array_type(values[row], missing[row])
+    frame_data: DataFrame = DataFrame(
+        {column: frame_data_columns[column] for column in manifest["columns"]}
+    )
+
+    alias_ids: np.ndarray = load_array("aliases")
+    move_name_alias_df: DataFrame = DataFrame(
+        {
+            column: string_values[alias_ids[:, column_index]]
+            for column_index, column in enumerate(manifest["alias_columns"])
+        }
+    )
+
+    name_indexes: list[dict[tuple[str, str], list[int]]] = [
+        unpack_name_index(
+            {
+                array_name: load_array(f"{index_name}_{array_name}")
+                for array_name in ("keys", "offsets", "positions")
+            },
+            string_values,
+        )
+        for index_name in ("move_names", "alt_names")
+    ]
+    parseCombo.set_derived_table(
+        frame_data, "character_starts", manifest["character_starts"]
+    )
+    parseCombo.set_derived_table(
+        frame_data,
+        "move_name_index",
+        parseCombo.MoveNameIndex.from_names(
+            string_values[load_array("characters")].tolist(),
+            *name_indexes,
+            manifest["character_starts"],
+        ),
+    )
+    parseCombo.set_derived_table(
+        move_name_alias_df,
+        "move_alias_map",
+        dict(string_values[load_array("alias_map")].tolist()),
+    )
+
+    hit_offsets: np.ndarray = load_array(f"{const.HIT_DAMAGE}_offsets")
+    parseCombo.set_derived_table(
+        frame_data,
+        "hit_damage_table",
+        parseCombo.HitDamageTable(
+            starts=hit_offsets[:-1],
+            counts=np.diff(hit_offsets),
+            values=load_array(f"{const.HIT_DAMAGE}_values"),
+        ),
+    )
+    return frame_data, move_name_alias_df
+
+
+def ensure_frame_data_store(
+    data_dir: str = DATA_DIR, store_dir: str | None = None
+) -> str:
+    """Compile the frame data store if it is missing or out of date, returns the store directory"""
+    store_dir = store_dir or os.path.join(data_dir, FRAME_DATA_STORE_DIR)
+    if not is_store_current(store_dir, data_dir):
+        logger.info("Frame data store is missing or out of date")
+        compile_frame_data(data_dir, store_dir, force=False)
+    return store_dir
+
+
+def load_tables(
+    data_dir: str = DATA_DIR, store_dir: str | None = None
+) -> tuple[DataFrame, DataFrame]:
+    """Load the frame data and move name aliases, from the compiled store when it is up to date
+    The store is compiled again when the csv files have changed since it was built. When several
+    processes load an out of date store at once, one compiles it and the others wait and load it
+    """
+    store_dir = ensure_frame_data_store(data_dir, store_dir)
+    try:
+        return load_frame_data_store(store_dir)
+    except FRAME_DATA_STORE_ERRORS as error:
+        # another process may have swapped in a new store while this one read it
+        logger.info("Could not load frame data store, loading it again: %s", error)
+    compile_frame_data(data_dir, store_dir, force=False)
+    try:
+        return load_frame_data_store(store_dir)
+    except FRAME_DATA_STORE_ERRORS as error:
+        logger.warning("Could not load frame data store, compiling it again: %s", error)
+        compile_frame_data(data_dir, store_dir)
+        return load_frame_data_store(store_dir)
+
+
+def stat_source_files(data_dir: str = DATA_DIR) -> dict[str, tuple[int, int]]:
+    """Get the modification time and size of the frame data, move name alias and character csv
+    files. Much cheaper than hashing them, used to check whether the files need hashing again
+    """
+    source_stats: dict[str, tuple[int, int]] = {}
+    for file_name in SOURCE_FILES:
+        file_stat: os.stat_result = os.stat(os.path.join(data_dir, file_name))
+        source_stats[file_name] = (file_stat.st_mtime_ns, file_stat.st_size)
+    return source_stats
+
+
+def get_character_row_positions(frame_data: DataFrame) -> dict[str, list[int]]:
+    """Get the row positions of every character in a frame data table, characters are upper case"""
+    character_positions: dict[str, list[int]] = {}
+    for position, character in enumerate(frame_data[const.CHARACTER_NAME].str.upper()):
+        character_positions.setdefault(character, []).append(position)
+    return character_positions
+
+
+def update_frame_data(
+    previous_frame_data: DataFrame, data_dir: str = DATA_DIR
+) -> tuple[DataFrame, list[str]]:
+    """Load the frame data again, reusing the parsed columns and move name index entries of the
+    characters whose rows have not changed since the previous frame data was loaded
+    Returns the new frame data and the characters that were parsed and indexed again"""
+    logger.debug("Updating frame data from %s", data_dir)
+    frame_data: DataFrame = pd.read_csv(os.path.join(data_dir, FRAME_DATA_CSV))
+    remove_whitespace_from_column_names(frame_data)
+    character_starts: dict[str, list[str]] = load_character_starts(data_dir)
+    parseCombo.set_derived_table(frame_data, "character_starts", character_starts)
+    source_columns: list[str] = frame_data.columns.tolist()
+    character_positions: dict[str, list[int]] = get_character_row_positions(frame_data)
+    if not set(source_columns) <= set(previous_frame_data.columns):
+        add_damage_columns(frame_data)
+        add_move_type_column(frame_data)
+        return add_frame_value_columns(frame_data), list(character_positions)
+
+    # Rows of characters whose rows hash the same, by their position in the previous frame data
+    previous_row_hashes: list[int] = pd.util.hash_pandas_object(
+        previous_frame_data[source_columns], index=False
+    ).tolist()
+    row_hashes: list[int] = pd.util.hash_pandas_object(frame_data, index=False).tolist()
+    previous_character_positions: dict[str, list[int]] = get_character_row_positions(
+        previous_frame_data
+    )
+    reused_positions: dict[int, int] = {}
+    changed_characters: list[str] = []
+    for character, positions in character_positions.items():
+        previous_positions: list[int] = previous_character_positions.get(character, [])
+        if [previous_row_hashes[position] for position in previous_positions] == [
+            row_hashes[position] for position in positions
+        ]:
+            reused_positions.update(zip(previous_positions, positions))
+        else:
+            changed_characters.append(character)
+
+    reused_rows: set[int] = set(reused_positions.values())
+    changed_positions: list[int] = [
+        position for position in range(len(frame_data)) if position not in reused_rows
+    ]
+    changed_rows: DataFrame = frame_data.iloc[changed_positions]
+    damage_values: list[parseCombo.DamageValues] = [
+        parseCombo.parse_damage_values(damage) for damage in changed_rows[const.DAMAGE]
+    ]
+    parsed_columns: dict[str, list[Any]] = {
+        const.HIT_DAMAGE: [values.hits for values in damage_values],
+        const.CHIP_DAMAGE: [values.chip for values in damage_values],
+        const.SPECIAL_DAMAGE: [values.special for values in damage_values],
+        const.MOVE_TYPE: parseCombo.get_row_move_types(changed_rows),
+    }
+    for column, changed_values in parsed_columns.items():
+        column_values: list[Any] = [None] * len(frame_data)
+        previous_values: list[Any] = previous_frame_data[column].tolist()
+        for previous_position, position in reused_positions.items():
+            column_values[position] = previous_values[previous_position]
+        for position, value in zip(changed_positions, changed_values):
+            column_values[position] = value
+        frame_data[column] = column_values
+    # the frame values are parsed a whole column at a time, which is cheaper than reusing them
+    add_frame_value_columns(frame_data)
+
+    # Move name index entries of unchanged characters are moved to their new positions
+    previous_index: parseCombo.MoveNameIndex = parseCombo.get_move_name_index(
+        previous_frame_data
+    )
+    changed_character_set: set[str] = set(changed_characters)
+    name_indexes: list[dict[tuple[str, str], list[int]]] = []
+    for column, previous_names in (
+        (const.MOVE_NAME, previous_index.move_names),
+        (const.ALT_NAMES, previous_index.alt_names),
+    ):
+        names: dict[tuple[str, str], list[int]] = {
+            key: [reused_positions[position] for position in positions]
+            for key, positions in previous_names.items()
+            if key[0] in character_positions and key[0] not in changed_character_set
+        }
+        for key, positions in parseCombo.index_names_by_character(
+            changed_rows, column
+        ).items():
+            names[key] = [changed_positions[position] for position in positions]
+        name_indexes.append(names)
+    parseCombo.set_derived_table(
+        frame_data,
+        "move_name_index",
+        parseCombo.MoveNameIndex.from_names(
+            list(character_positions), *name_indexes, character_starts
+        ),
+    )
+    return frame_data, changed_characters
+
+
+class FrameDataSnapshot(NamedTuple):
+    """The frame data and move name aliases loaded from one version of the csv files
+    Snapshots are never changed, reloading the csv files creates a new snapshot"""
+
+    full_framedata_df: DataFrame
+    move_name_alias_df: DataFrame
+    source_hashes: dict[str, str]
+    version: int
+
+
+def warm_snapshot(
+    snapshot: FrameDataSnapshot, previous: FrameDataSnapshot | None = None
+) -> None:
+    """Build the derived tables and move resolver of a snapshot before it is used
+    Moves cached by the move resolver of the previous snapshot are resolved again, so the first
+    combos evaluated with the new snapshot do not have to search for them. Moves that were not
+    found are left until a combo uses them, so reloading does not warn about them again
+    """
+    frame_data: DataFrame = snapshot.full_framedata_df
+    parseCombo.get_hit_damage_table(frame_data)
+    parseCombo.get_row_hits(frame_data)
+    parseCombo.get_row_undizzy(frame_data)
+    resolver: parseCombo.MoveResolver = parseCombo.get_move_resolver(
+        frame_data, snapshot.move_name_alias_df
+    )
+    if previous is None:
+        return
+    for (character_name, move_name), (_, search_state) in parseCombo.get_move_resolver(
+        previous.full_framedata_df, previous.move_name_alias_df
+    ).cache.items():
+        if search_state != const.NOT_FOUND:
+            resolver.resolve(move_name, character_name)
+
+
+class FrameDataStore:
+    """Holds the current snapshot of the frame data and move name aliases, and swaps in a new
+    snapshot when the csv files change
+
+    The new snapshot is built completely before it replaces the current one, so callers holding
+    a snapshot keep using it unchanged while the next one is loaded. Changes are found by the
+    modification time and size of the csv files, which are only hashed when those change.
+    """
+
+    def __init__(self, data_dir: str = DATA_DIR, store_dir: str | None = None) -> None:
+        self.data_dir: str = data_dir
+        self.store_dir: str | None = store_dir
+        self._reload_lock: threading.Lock = threading.Lock()
+        self._stop_watching: threading.Event = threading.Event()
+        self._watcher: threading.Thread | None = None
+
+        self._source_stats: dict[str, tuple[int, int]] = stat_source_files(data_dir)
+        source_hashes: dict[str, str] = hash_source_files(data_dir)
+        full_framedata_df, move_name_alias_df = load_tables(data_dir, store_dir)
+        self._snapshot: FrameDataSnapshot = FrameDataSnapshot(
+            full_framedata_df, move_name_alias_df, source_hashes, 1
+        )
+        warm_snapshot(self._snapshot)
+
+    @property
+    def snapshot(self) -> FrameDataSnapshot:
+        """The current snapshot, hold on to it to use the same tables for a whole evaluation"""
+        return self._snapshot
+
+    def tables(self) -> tuple[DataFrame, DataFrame]:
+        """The frame data and move name aliases of the current snapshot"""
+        snapshot: FrameDataSnapshot = self._snapshot
+        return snapshot.full_framedata_df, snapshot.move_name_alias_df
+
+    def reload_if_changed(self) -> bool:
+        """Load a new snapshot if the csv files have changed, True if the snapshot was replaced"""
+        with self._reload_lock:
+            source_stats: dict[str, tuple[int, int]] = stat_source_files(self.data_dir)
+            if source_stats == self._source_stats:
+                return False
+            source_hashes: dict[str, str] = hash_source_files(self.data_dir)
+            previous: FrameDataSnapshot = self._snapshot
+            if source_hashes == previous.source_hashes:
+                self._source_stats = source_stats
+                return False
+
+            full_framedata_df: DataFrame = previous.full_framedata_df
+            # the character abbreviations are part of the move name index of the frame data
+            if any(
+                source_hashes[file_name] != previous.source_hashes.get(file_name)
+                for file_name in (FRAME_DATA_CSV, CHARACTERS_CSV)
+            ):
+                full_framedata_df, changed_characters = update_frame_data(
+                    previous.full_framedata_df, self.data_dir
+                )
+                logger.info(
+                    "Frame data changed for %s characters: %s",
+                    len(changed_characters),
+                    ", ".join(changed_characters),
+                )
+            move_name_alias_df: DataFrame = previous.move_name_alias_df
+            if (
+                source_hashes[MOVE_NAME_ALIASES_CSV]
+                != previous.source_hashes[MOVE_NAME_ALIASES_CSV]
+            ):
+                logger.info("Move name aliases changed")
+                move_name_alias_df = load_move_name_aliases(self.data_dir)
+
+            snapshot: FrameDataSnapshot = FrameDataSnapshot(
+                full_framedata_df,
+                move_name_alias_df,
+                source_hashes,
+                previous.version + 1,
+            )
+            warm_snapshot(snapshot, previous)
+            self._snapshot = snapshot
+            self._source_stats = source_stats
+            logger.info("Frame data snapshot %s loaded", snapshot.version)
+            return True
+
+    def watch(
+        self, interval: float = const.FRAME_DATA_WATCH_INTERVAL
+    ) -> threading.Thread:
+        """Check for changes to the csv files every interval seconds in a background thread"""
+        if self._watcher is not None and self._watcher.is_alive():
+            return self._watcher
+        self._stop_watching.clear()
+
+        def watch_source_files() -> None:
+            while not self._stop_watching.wait(interval):
+                try:
+                    self.reload_if_changed()
+                except (OSError, ValueError, KeyError) as error:
+                    # a csv file part way through being written, try again next time
+                    logger.warning("Could not reload frame data: %s", error)
+
+        self._watcher = threading.Thread(
+            target=watch_source_files, name="FrameDataStore.watch", daemon=True
+        )
+        self._watcher.start()
+        return self._watcher
+
+    def stop_watching(self) -> None:
+        """Stop the background thread started by watch"""
+        self._stop_watching.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
+
+
+if __name__ == "__main__":
+    compile_frame_data()
@@ -0,0 +1,223 @@
+"""
+Indexed queries over the frame data, e.g. every move with startup of 7 or less that is plus on
+block, or every armored move of a character:
+
+    frame_index = frameQuery.get_frame_data_index(full_framedata_df)
+    frame_index.select(ranges={const.STARTUP: (None, 7), const.ON_BLOCK: (1, None)})
+    frame_index.select(character="Beowulf", properties=["Armor"])
+
+The index is built once per frame data table. Rows are partitioned by character, the numeric
+frame columns parsed by frameData.add_frame_value_columns are kept sorted for binary search
+range queries, and the tokens of the Properties, Guard and MoveType columns have an inverted
+index. Each part of a query is a boolean mask over the rows, combined with &.
+"""
+
+from __future__ import annotations
+
+import re
+import weakref
+from typing import Any, Iterable, NamedTuple
+
+import numpy as np
+from pandas import DataFrame
+
+import constants as const
+import frameData
+import parseCombo
+
+# flake8: noqa: E501
+
+# Columns with an inverted index of their tokens
+TOKEN_COLUMNS: tuple[str, ...] = (const.PROPERTIES, const.GUARD, const.MOVE_TYPE)
+# Properties and guards are comma or newline separated, e.g. "Chains Into Self, Launcher"
+TOKEN_SEPARATOR_REGEX: re.Pattern[str] = re.compile(r"[,\n]")
+# Qualifiers in brackets, e.g. the "(1 hit)" of "Armor (1 hit)"
+TOKEN_QUALIFIER_REGEX: re.Pattern[str] = re.compile(r"\([^)]*\)")
+# Cells with no tokens
+EMPTY_TOKENS: frozenset[str] = frozenset({"", "-", "--"})
+
+
+def normalise_token(token: str) -> str:
+    """Case fold a token and drop the punctuation and spacing differences between cells"""
+    return " ".join(token.casefold().replace("*", "").split()).strip(".")
+
+
+def get_tokens(cell: Any) -> set[str]:
+    """Get the tokens of a Properties, Guard or MoveType cell
+    Each comma or newline separated entry is a token with and without its bracketed qualifiers,
+    so "Armor (1 hit)" is found by both "Armor (1 hit)" and "Armor" """
+    tokens: set[str] = set()
+    if not isinstance(cell, str):
+        return tokens
+    for entry in TOKEN_SEPARATOR_REGEX.split(cell):
+        for token in (entry, TOKEN_QUALIFIER_REGEX.sub(" ", entry)):
+            token = normalise_token(token)
+            if token not in EMPTY_TOKENS:
+                tokens.add(token)
+    return tokens
+
+
+class SortedColumn(NamedTuple):
+    """Row positions of a numeric column sorted by value, rows with missing values are left out"""
+
+    positions: np.ndarray
+    values: np.ndarray
+
+
+class FrameDataIndex:
+    """Character partitions, sorted numeric columns and inverted token indexes of a frame data table
+    Queries return sorted row positions of the table. The index is not changed after it is built
+    so it can be shared between threads. The table is only weakly referenced, so the index kept as
+    a derived table does not keep the table alive"""
+
+    def __init__(self, frame_data: DataFrame) -> None:
+        self._frame_data: weakref.ref[DataFrame] = weakref.ref(frame_data)
+        self.row_count: int = len(frame_data)
+        self.move_index: parseCombo.MoveNameIndex = parseCombo.get_move_name_index(
+            frame_data
+        )
+
+        # Row positions of each character, characters are upper case
+        self.partitions: dict[str, np.ndarray] = {
+            character: np.array(positions, dtype=np.int64)
+            for character, positions in frameData.get_character_row_positions(
+                frame_data
+            ).items()
+        }
+
+        # Numeric columns sorted by value
+        self.sorted_columns: dict[str, SortedColumn] = {}
+        for column in frame_data.columns:
+            if not (
+                column.endswith(
+                    (const.VALUE_SUFFIX, const.ALT_SUFFIX, const.MAX_SUFFIX)
+                )
+                and frame_data[column].dtype.kind in "iuf"
+            ):
+                continue
+            values: np.ndarray = frame_data[column].to_numpy(
+                dtype=np.float64, na_value=np.nan
+            )
+            positions: np.ndarray = np.flatnonzero(~np.isnan(values))
+            positions = positions[np.argsort(values[positions], kind="stable")]
+            self.sorted_columns[column] = SortedColumn(positions, values[positions])
+
+        # Rows having each token, by column
+        self.token_masks: dict[str, dict[str, np.ndarray]] = {}
+        for column in TOKEN_COLUMNS:
+            if column not in frame_data.columns:
+                continue
+            token_positions: dict[str, list[int]] = {}
+            for position, cell in enumerate(frame_data[column]):
+                for token in get_tokens(cell):
+                    token_positions.setdefault(token, []).append(position)
+            self.token_masks[column] = {
+                token: self._positions_to_mask(positions)
+                for token, positions in token_positions.items()
+            }
+
+        # Rows of the characters a character name resolves to, filled in as names are looked up
+        # Keyed by the resolved characters so every spelling of a character shares one mask
+        self._character_masks: dict[tuple[str, ...], np.ndarray] = {}
+
+    def _positions_to_mask(self, positions: Iterable[int] | np.ndarray) -> np.ndarray:
+        mask: np.ndarray = np.zeros(self.row_count, dtype=bool)
+        mask[np.asarray(positions, dtype=np.int64)] = True
+        return mask
+
+    def tokens(self, column: str) -> list[str]:
+        """The tokens of an indexed column, e.g. every property"""
+        return sorted(self.token_masks.get(column, {}))
+
+    def character_mask(self, character_name: str) -> np.ndarray:
+        """Rows of the characters matching a character name"""
+        characters: tuple[str, ...] = tuple(
+            self.move_index.characters_matching(character_name)
+        )
+        mask: np.ndarray | None = self._character_masks.get(characters)
+        if mask is None:
+            mask = np.zeros(self.row_count, dtype=bool)
+            for character in characters:
+                mask[self.partitions.get(character, [])] = True
+            mask = self._character_masks.setdefault(characters, mask)
+        return mask
+
+    def token_mask(self, column: str, token: str) -> np.ndarray:
+        """Rows whose column has a token, ignoring case and spacing"""
+        mask: np.ndarray | None = self.token_masks.get(column, {}).get(
+            normalise_token(token)
+        )
+        return mask if mask is not None else np.zeros(self.row_count, dtype=bool)
+
+    def range_mask(
+        self,
+        column: str,
+        minimum: float | None = None,
+        maximum: float | None = None,
+    ) -> np.ndarray:
+        """Rows whose numeric column is between minimum and maximum inclusive, rows missing the
+        value are left out. Frame columns such as Startup query their Value column"""
+        sorted_column: SortedColumn | None = self.sorted_columns.get(
+            column, self.sorted_columns.get(f"{column}{const.VALUE_SUFFIX}")
+        )
+        if sorted_column is None:
+            raise KeyError(f"Column [{column}] has no sorted index")
+        start: int = (
+            0
+            if minimum is None
+            else int(np.searchsorted(sorted_column.values, minimum, side="left"))
+        )
+        end: int = (
+            len(sorted_column.values)
+            if maximum is None
+            else int(np.searchsorted(sorted_column.values, maximum, side="right"))
+        )
+        return self._positions_to_mask(sorted_column.positions[start:end])
+
+    def select(
+        self,
+        character: str | None = None,
+        properties: Iterable[str] = (),
+        guard: Iterable[str] = (),
+        move_types: Iterable[str] = (),
+        ranges: dict[str, tuple[float | None, float | None]] | None = None,
+    ) -> np.ndarray:
+        """Row positions of the moves matching every condition
+        character is matched as by the move search, properties and guard must all be present and
+        move_types is any of the given move types. ranges maps columns to (minimum, maximum),
+        either of which can be None"""
+        mask: np.ndarray = np.ones(self.row_count, dtype=bool)
+        if character is not None:
+            mask &= self.character_mask(character)
+        for token in properties:
+            mask &= self.token_mask(const.PROPERTIES, token)
+        for token in guard:
+            mask &= self.token_mask(const.GUARD, token)
+        move_type_masks: list[np.ndarray] = [
+            self.token_mask(const.MOVE_TYPE, move_type) for move_type in move_types
+        ]
+        if move_type_masks:
+            mask &= np.logical_or.reduce(move_type_masks)
+        for column, (minimum, maximum) in (ranges or {}).items():
+            mask &= self.range_mask(column, minimum, maximum)
+        return np.flatnonzero(mask)
+
+    def rows(self, positions: np.ndarray) -> DataFrame:
+        """The frame data rows at the positions returned by select"""
+        frame_data: DataFrame | None = self._frame_data()
+        if frame_data is None:
+            raise ReferenceError(
+                "The frame data of the index has been garbage collected"
+            )
+        return frame_data.iloc[positions]
+
+
+def get_frame_data_index(frame_data: DataFrame) -> FrameDataIndex:
+    """Get the query index for a frame data table, building it on first use"""
+    return parseCombo.get_derived_table(frame_data, "frame_data_index", FrameDataIndex)
+
+
+def query_frame_data(frame_data: DataFrame, **conditions: Any) -> DataFrame:
+    """The frame data rows matching the conditions of FrameDataIndex.select"""
+    frame_index: FrameDataIndex = get_frame_data_index(frame_data)
+    return frame_index.rows(frame_index.select(**conditions))
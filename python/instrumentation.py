@@ -0,0 +1,200 @@
+"""
+Opt-in timing instrumentation for the combo pipeline.
+Stages of the pipeline are wrapped with instrumented, which only checks a flag while the
+instrumentation is disabled. Once enabled, every stage records its calls and time, the move
+resolver records the search strategy and cache use of every move, and a cProfile profile can be
+collected alongside. The results export as summary tables, a pstats file and folded stacks for
+flamegraph tools, e.g.
+
+    instrumentation.enable(profile=True)
+    damageCalc.process_combo_csvs(...)
+    print(instrumentation.stage_summary())
+    instrumentation.write_folded_stacks("combos.folded")
+"""
+
+from __future__ import annotations
+
+import contextlib
+import functools
+import time
+from typing import TYPE_CHECKING, Any, Callable, Iterator, TypeVar
+
+from pandas import DataFrame
+
+from constants import logger
+
+if TYPE_CHECKING:
+    import cProfile
+
+# flake8: noqa: E501
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+# Checked by every instrumented stage, only changed by enable and disable
+enabled: bool = False
+
+# Calls and total seconds of every stage
+stage_calls: dict[str, int] = {}
+stage_seconds: dict[str, float] = {}
+# Seconds spent in each stack of stages, not counting the stages called inside it
+folded_stack_seconds: dict[str, float] = {}
+# Resolved moves by (character, move name, search state) with whether they came from the cache
+resolved_moves: dict[tuple[str, str, str], list[int]] = {}
+cache_hits: int = 0
+cache_misses: int = 0
+
+_stage_stack: list[str] = []
+# Seconds spent in stages called inside each stage on the stack
+_child_seconds: list[float] = []
+_profiler: cProfile.Profile | None = None
+
+
+def enable(profile: bool = False) -> None:
+    """Start recording, with a cProfile profile of everything that runs if profile is True"""
+    global enabled, _profiler
+    enabled = True
+    if profile and _profiler is None:
+        import cProfile
+
+        _profiler = cProfile.Profile()
+        _profiler.enable()
+
+
+def disable() -> None:
+    """Stop recording, what was recorded is kept until reset"""
+    global enabled
+    enabled = False
+    if _profiler is not None:
+        _profiler.disable()
+
+
+def reset() -> None:
+    """Drop everything that was recorded, including the profile"""
+    global cache_hits, cache_misses, _profiler
+    stage_calls.clear()
+    stage_seconds.clear()
+    folded_stack_seconds.clear()
+    resolved_moves.clear()
+    cache_hits = 0
+    cache_misses = 0
+    if _profiler is not None:
+        _profiler.disable()
+    _profiler = None
+
+
+@contextlib.contextmanager
+def stage(stage_name: str) -> Iterator[None]:
+    """Record the time spent in a stage, stages can be nested"""
+    _stage_stack.append(stage_name)
+    _child_seconds.append(0.0)
+    start_time: float = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds: float = time.perf_counter() - start_time
+        stack: str = ";".join(_stage_stack)
+        _stage_stack.pop()
+        child_seconds: float = _child_seconds.pop()
+        if _child_seconds:
+            _child_seconds[-1] += seconds
+        stage_calls[stage_name] = stage_calls.get(stage_name, 0) + 1
+        stage_seconds[stage_name] = stage_seconds.get(stage_name, 0.0) + seconds
+        folded_stack_seconds[stack] = (
+            folded_stack_seconds.get(stack, 0.0) + seconds - child_seconds
+        )
+
+
+def instrumented(stage_name: str) -> Callable[[F], F]:
+    """Decorator recording a function as a stage while the instrumentation is enabled"""
+
+    def decorator(func: F) -> F:
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if not enabled:
+                return func(*args, **kwargs)
+            with stage(stage_name):
+                return func(*args, **kwargs)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
+
+def record_move(
+    character_name: str, move_name: str, search_state: str, cached: bool
+) -> None:
+    """Record the search strategy that resolved a move and whether it came from the cache"""
+    global cache_hits, cache_misses
+    counts: list[int] = resolved_moves.setdefault(
+        (character_name, move_name, search_state), [0, 0]
+    )
+    if cached:
+        counts[1] += 1
+        cache_hits += 1
+    else:
+        counts[0] += 1
+        cache_misses += 1
+
+
+def stage_summary() -> DataFrame:
+    """Calls and time of every stage, slowest first
+    SelfSeconds does not count the time spent in stages called inside the stage"""
+    self_seconds: dict[str, float] = {}
+    for stack, seconds in folded_stack_seconds.items():
+        stage_name: str = stack.rsplit(";", 1)[-1]
+        self_seconds[stage_name] = self_seconds.get(stage_name, 0.0) + seconds
+    summary: DataFrame = DataFrame(
+        {
+            "Stage": list(stage_calls),
+            "Calls": list(stage_calls.values()),
+            "TotalSeconds": [stage_seconds[name] for name in stage_calls],
+            "SelfSeconds": [self_seconds.get(name, 0.0) for name in stage_calls],
+        }
+    )
+    summary["MeanMicroseconds"] = summary["TotalSeconds"] / summary["Calls"] * 1e6
+    return summary.sort_values("TotalSeconds", ascending=False, ignore_index=True)
+
+
+def move_summary() -> DataFrame:
+    """The search strategy that resolved every move, with how often it was searched for and
+    how often it came from the cache"""
+    return DataFrame(
+        [
+            (character_name, move_name, search_state, searched, cached)
+            for (
+                character_name,
+                move_name,
+                search_state,
+            ), (searched, cached) in resolved_moves.items()
+        ],
+        columns=["Character", "MoveName", "SearchState", "Searched", "Cached"],
+    )
+
+
+def cache_info() -> dict[str, float]:
+    """Hits, misses and hit rate of the move resolution cache while recording"""
+    lookups: int = cache_hits + cache_misses
+    return {
+        "hits": cache_hits,
+        "misses": cache_misses,
+        "hit_rate": cache_hits / lookups if lookups else 0.0,
+    }
+
+
+def write_profile(path: str) -> None:
+    """Write the cProfile profile as a pstats file, for pstats, snakeviz or flameprof"""
+    if _profiler is None:
+        raise RuntimeError("No profile was recorded, use enable(profile=True)")
+    import pstats
+
+    pstats.Stats(_profiler).dump_stats(path)
+    logger.info("Wrote profile to %s", path)
+
+
+def write_folded_stacks(path: str) -> None:
+    """Write the time spent in each stack of stages as folded stacks in microseconds,
+    the input format of flamegraph.pl, inferno and speedscope"""
+    with open(path, "w", encoding="utf-8") as folded_file:
+        for stack, seconds in folded_stack_seconds.items():
+            folded_file.write(f"{stack} {round(seconds * 1e6)}\n")
+    logger.info("Wrote folded stacks to %s", path)
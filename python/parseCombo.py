@@ -1,107 +1,1023 @@
 """Functions for parsing the combo data from the csv files"""
+import bisect
+import csv
+import functools
+import itertools
+import logging
 import os
 import typing
-from typing import Any
+import weakref
+from collections import Counter, OrderedDict
+from typing import Any, Callable, NamedTuple, TypeVar
 import re
+import threading
+import numpy as np
 import constants as const
 from constants import logger
+import comboLexer
+import instrumentation
+from comboLexer import ComboToken
 from pandas import DataFrame, Series
 import pandas as pd
 
 
 # flake8: noqa: E501
-def get_csv_list(path: str) -> list[str]:
-    """Returns a list of all csv files in a given path with their relative path"""
-    return [os.path.join(path, f) for f in os.listdir(path) if f.endswith(".csv")]
 
+T = TypeVar("T")
+
+# Tables derived from a DataFrame, keyed by the id of the DataFrame and the name of the table
+# The weak reference is used to check that the id has not been reused by a new DataFrame
+_derived_tables: dict[tuple[int, str], tuple[weakref.ref[DataFrame], Any]] = {}
+# Tables loaded with a DataFrame instead of built from it, they are kept by clear_derived_tables
+# because there is nothing to rebuild them from
+SOURCE_TABLES: frozenset[str] = frozenset({"character_starts"})
 
-def split_columns(df: DataFrame, column_name: str, seperator: str) -> DataFrame:
-    """Split a column into multiple rows based on a given seperator"""
-    splitdf: DataFrame = df.copy()
-    # split the values in a column on a given seperator
-    logger.debug(f'Splitting {column_name} on "{seperator}"')
-    splitdf[column_name] = splitdf[column_name].str.split(seperator)
-    # explode the column so that each value is on a row
-    splitdf = splitdf.explode(column_name)
-    return splitdf
 
+def get_derived_table(df: DataFrame, name: str, builder: Callable[[DataFrame], T]) -> T:
+    """Return a table derived from a DataFrame, building it the first time it is requested"""
+    key: tuple[int, str] = (id(df), name)
+    cached: tuple[weakref.ref[DataFrame], Any] | None = _derived_tables.get(key)
+    if cached and cached[0]() is df:
+        return cached[1]
 
-def handle_annie_divekick(move_name: str, frame_data: DataFrame) -> DataFrame:
-    """Logic for handling Annie's divekick moves"""
-    data_for_move: DataFrame = DataFrame()
-    divekick_move_name: str = re.sub(r"[LMH]", "", move_name)
+    logger.debug("Building derived table [%s]", name)
+    table: T = builder(df)
+    set_derived_table(df, name, table)
+    return table
 
-    divekick_df: DataFrame = frame_data.loc[
-        frame_data[const.MOVE_NAME].str.contains(const.ANNIE_DIVEKICK, na=False)
-    ].reset_index(drop=True)
 
-    divekick_check: Series[bool] = divekick_df[const.MOVE_NAME].str.contains(
-        divekick_move_name, flags=re.IGNORECASE, na=False
+def set_derived_table(df: DataFrame, name: str, table: Any) -> None:
+    """Store a table derived from a DataFrame, e.g. one loaded from the frame data store"""
+    key: tuple[int, str] = (id(df), name)
+    # Drop the table when the DataFrame it was built from is garbage collected
+    _derived_tables[key] = (
+        weakref.ref(df, lambda _: _derived_tables.pop(key, None)),
+        table,
     )
 
-    if not divekick_check.any():
-        divekick_check = divekick_df[const.ALT_NAMES].str.contains(
-            divekick_move_name, flags=re.IGNORECASE, na=False
+
+def clear_derived_tables() -> None:
+    """Drop every derived table, they will be rebuilt on their next use
+    The SOURCE_TABLES, such as the character starts loaded with the frame data, are kept
+    """
+    for key in [key for key in _derived_tables if key[1] not in SOURCE_TABLES]:
+        _derived_tables.pop(key, None)
+
+
+def normalise_character_name(character_name: str) -> str:
+    """Case fold a character name and drop everything but letters and digits,
+    e.g. "Ms. Fortune" -> "msfortune" """
+    return "".join(char for char in character_name.casefold() if char.isalnum())
+
+
+class CharacterResolver:
+    """Resolves the spellings of character names to the characters of a frame data table
+
+    A name resolves to the character it is the name or one of the Character Start abbreviations
+    of, ignoring case and punctuation, e.g. "Ms. Fortune", "MS F" or "CAT" for MS. FORTUNE.
+    Otherwise it resolves to the one character whose name starts with it, found by binary search
+    over the sorted names, or the one character with a word of that name, e.g. "Dahlia" for
+    BLACK DAHLIA. Names matching several characters, such as "Fortune", resolve to none.
+    Characters are upper case"""
+
+    def __init__(
+        self, characters: list[str], character_starts: dict[str, list[str]]
+    ) -> None:
+        self.characters: list[str] = characters
+        # Exact spellings, an abbreviation of several characters is left out
+        self.spellings: dict[str, str] = {}
+        abbreviations: dict[str, set[str]] = {}
+        for character, starts in character_starts.items():
+            if character in characters:
+                for start in starts:
+                    abbreviations.setdefault(
+                        normalise_character_name(start), set()
+                    ).add(character)
+        for abbreviation, abbreviated in abbreviations.items():
+            if len(abbreviated) == 1:
+                self.spellings[abbreviation] = next(iter(abbreviated))
+        for character in characters:
+            self.spellings[normalise_character_name(character)] = character
+        # Names sorted for prefix search, and the characters with each word of their name
+        self.sorted_names: list[tuple[str, str]] = sorted(
+            (normalise_character_name(character), character) for character in characters
+        )
+        self.words: dict[str, set[str]] = {}
+        for character in characters:
+            for word in re.split(r"[^0-9a-z]+", character.casefold()):
+                if word:
+                    self.words.setdefault(word, set()).add(character)
+        # Characters resolved from each name, filled in as names are looked up
+        self._resolved: dict[str, list[str]] = {}
+
+    def resolve(self, character_name: str) -> list[str]:
+        """The character a name resolves to, or no characters if it does not resolve to one"""
+        resolved: list[str] | None = self._resolved.get(character_name)
+        if resolved is not None:
+            return resolved
+
+        name: str = normalise_character_name(character_name)
+        resolved = []
+        if name in self.spellings:
+            resolved = [self.spellings[name]]
+        else:
+            start: int = bisect.bisect_left(self.sorted_names, (name, ""))
+            end: int = bisect.bisect_left(self.sorted_names, (name + "\uffff", ""))
+            matches: set[str] = (
+                {character for _, character in self.sorted_names[start:end]}
+                if name
+                else set()
+            ) or self.words.get(character_name.casefold().strip(), set())
+            if len(matches) == 1:
+                resolved = list(matches)
+            elif matches:
+                logger.warning(
+                    "Character [%s] matches %s, use more of the name",
+                    character_name,
+                    ", ".join(sorted(matches)),
+                )
+            else:
+                logger.warning(
+                    "Character [%s] is not a known character", character_name
+                )
+        self._resolved[character_name] = resolved
+        return resolved
+
+
+def get_character_starts(frame_data: DataFrame) -> dict[str, list[str]]:
+    """The Character Start abbreviations registered for a frame data table by frameData,
+    none for tables loaded some other way"""
+    return get_derived_table(frame_data, "character_starts", lambda _: {})
+
+
+class MoveNameIndex:
+    """Hash index from (character, move name) to the row positions of a frame data table
+
+    Every line of the newline separated MoveName and AltNames cells is a key,
+    names are case folded and characters are upper case. Character names are resolved to one
+    character by a CharacterResolver, so each lookup only sees the names of that character
+    """
+
+    def __init__(
+        self,
+        frame_data: DataFrame,
+        character_starts: dict[str, list[str]] | None = None,
+    ) -> None:
+        self.characters: list[str] = (
+            frame_data[const.CHARACTER_NAME].str.upper().unique().tolist()
+        )
+        self.move_names: dict[tuple[str, str], list[int]] = index_names_by_character(
+            frame_data, const.MOVE_NAME
+        )
+        self.alt_names: dict[tuple[str, str], list[int]] = index_names_by_character(
+            frame_data, const.ALT_NAMES
+        )
+        self.character_resolver: CharacterResolver = CharacterResolver(
+            self.characters,
+            (
+                get_character_starts(frame_data)
+                if character_starts is None
+                else character_starts
+            ),
+        )
+
+    @classmethod
+    def from_names(
+        cls,
+        characters: list[str],
+        move_names: dict[tuple[str, str], list[int]],
+        alt_names: dict[tuple[str, str], list[int]],
+        character_starts: dict[str, list[str]] | None = None,
+    ) -> "MoveNameIndex":
+        """Create an index from names that were already indexed, e.g. by the frame data store"""
+        move_index: MoveNameIndex = cls.__new__(cls)
+        move_index.characters = characters
+        move_index.move_names = move_names
+        move_index.alt_names = alt_names
+        move_index.character_resolver = CharacterResolver(
+            characters, character_starts or {}
+        )
+        return move_index
+
+    def characters_matching(self, character_name: str) -> list[str]:
+        """The character a character name resolves to, see CharacterResolver"""
+        return self.character_resolver.resolve(character_name)
+
+    def find(self, move_name: str, character_name: str) -> list[int]:
+        """Row positions of a move for a character, move names are checked before alt names"""
+        name: str = move_name.casefold().strip()
+        for character in self.characters_matching(character_name):
+            for names in (self.move_names, self.alt_names):
+                positions: list[int] | None = names.get((character, name))
+                if positions:
+                    return positions
+        return []
+
+
+def index_names_by_character(
+    frame_data: DataFrame, column_name: str
+) -> dict[tuple[str, str], list[int]]:
+    """Index every line of a newline separated name column by character and case folded name,
+    without the spaces around it. Empty lines are left out"""
+    index: dict[tuple[str, str], list[int]] = {}
+    position: int
+    character: str
+    names: Any
+    for position, (character, names) in enumerate(
+        zip(frame_data[const.CHARACTER_NAME], frame_data[column_name])
+    ):
+        if not isinstance(names, str):
+            continue
+        for name in dict.fromkeys(
+            name.strip() for name in names.casefold().split("\n")
+        ):
+            if name:
+                index.setdefault((character.upper(), name), []).append(position)
+    return index
+
+
+def get_move_name_index(frame_data: DataFrame) -> MoveNameIndex:
+    """Get the move name index for a frame data table, building it on first use"""
+    return get_derived_table(frame_data, "move_name_index", MoveNameIndex)
+
+
+def normalise_move_name(move_name: str) -> str:
+    """Case fold a move name and drop its spaces and dots, e.g. "S. LP" -> "slp" """
+    return "".join(move_name.casefold().replace(".", "").split())
+
+
+def get_name_bigrams(name: str) -> set[str]:
+    """Bigrams of a normalised name with its start and end marked, e.g. 5lp -> ^5 5l lp p$"""
+    marked: str = f"^{name}$"
+    return {marked[i : i + 2] for i in range(len(marked) - 1)}
+
+
+def edit_distance(first: str, second: str, max_distance: int) -> int:
+    """Levenshtein distance between two names, or max_distance + 1 once it is known to be more
+    Only the band of cells within max_distance of the diagonal is worked out"""
+    if abs(len(first) - len(second)) > max_distance:
+        return max_distance + 1
+    too_far: int = max_distance + 1
+    previous: list[int] = [
+        j if j <= max_distance else too_far for j in range(len(second) + 1)
+    ]
+    for i, first_char in enumerate(first, 1):
+        start: int = max(1, i - max_distance)
+        end: int = min(len(second), i + max_distance)
+        current: list[int] = [too_far] * (len(second) + 1)
+        current[0] = i if i <= max_distance else too_far
+        row_min: int = current[0]
+        for j in range(start, end + 1):
+            distance: int = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (first_char != second[j - 1]),
+            )
+            current[j] = distance
+            if distance < row_min:
+                row_min = distance
+        if row_min > max_distance:
+            return too_far
+        previous = current
+    return min(previous[-1], too_far)
+
+
+class MoveSuggestion(NamedTuple):
+    """A name that is found for a character, with the frame data move name it finds"""
+
+    name: str
+    move_name: str
+    distance: int
+
+
+class CharacterMoveNames(NamedTuple):
+    """The names a move of a character can be found by, with postings from bigrams to names"""
+
+    names: list[str]
+    normalised_names: list[str]
+    move_names: list[str]
+    bigram_counts: list[int]
+    bigram_postings: dict[str, list[int]]
+
+
+class MoveSuggestionIndex:
+    """Fuzzy index of the move names, alt names and aliases of every character
+    Suggests the names closest to a move that is not found. Names sharing bigrams with the move are
+    found through the postings, and only those that can be within the edit distance limit are
+    compared, so no character is scanned in full. Each character is indexed on first use
+    """
+
+    def __init__(self, frame_data: DataFrame, move_name_alias_df: DataFrame) -> None:
+        self.frame_data: DataFrame = frame_data
+        self.move_index: MoveNameIndex = get_move_name_index(frame_data)
+        # Aliases with the key they are an alias of, in the order of the alias table
+        self.aliases: list[tuple[str, str]] = []
+        if not move_name_alias_df.empty:
+            key: Any
+            values: Any
+            for key, values in zip(
+                move_name_alias_df["Key"], move_name_alias_df["Value"]
+            ):
+                if isinstance(key, str) and isinstance(values, str):
+                    self.aliases += [
+                        (alias.strip(), key) for alias in values.split("\n")
+                    ]
+        self._characters: dict[str, CharacterMoveNames] = {}
+
+    def character_names(self, character: str) -> CharacterMoveNames:
+        """The names of a character's moves, move names first then alt names then aliases"""
+        character_names: CharacterMoveNames | None = self._characters.get(character)
+        if character_names is not None:
+            return character_names
+
+        frame_move_names: Series[Any] = self.frame_data[const.MOVE_NAME]
+        # normalised names with the name and the move it finds, the first spelling of a name wins
+        names: dict[str, tuple[str, str]] = {}
+        for column_name in (const.MOVE_NAME, const.ALT_NAMES):
+            position: int
+            row_character: Any
+            cell: Any
+            for position, (row_character, cell) in enumerate(
+                zip(self.frame_data[const.CHARACTER_NAME], self.frame_data[column_name])
+            ):
+                if not isinstance(cell, str) or str(row_character).upper() != character:
+                    continue
+                move_name: str = str(frame_move_names.iat[position]).split("\n")[0]
+                for name in cell.split("\n"):
+                    # macro keys are only there for the aliases to find
+                    if not name.casefold().startswith("macro_"):
+                        names.setdefault(
+                            normalise_move_name(name), (name.strip(), move_name)
+                        )
+        for alias, key in self.aliases:
+            positions: list[int] = self.move_index.find(key, character)
+            if positions:
+                names.setdefault(
+                    normalise_move_name(alias),
+                    (
+                        alias,
+                        str(frame_move_names.iat[positions[0]]).split("\n")[0],
+                    ),
+                )
+        names.pop("", None)
+
+        bigram_counts: list[int] = []
+        bigram_postings: dict[str, list[int]] = {}
+        for name_id, normalised_name in enumerate(names):
+            name_bigrams: set[str] = get_name_bigrams(normalised_name)
+            bigram_counts.append(len(name_bigrams))
+            for bigram in name_bigrams:
+                bigram_postings.setdefault(bigram, []).append(name_id)
+        character_names = CharacterMoveNames(
+            [name for name, _ in names.values()],
+            list(names),
+            [move_name for _, move_name in names.values()],
+            bigram_counts,
+            bigram_postings,
+        )
+        self._characters[character] = character_names
+        return character_names
+
+    def suggest(
+        self,
+        move_name: str,
+        characters: list[str],
+        limit: int = const.MOVE_SUGGESTION_COUNT,
+    ) -> list[MoveSuggestion]:
+        """The names closest to a move for the given characters, closest first
+        Names more than const.MOVE_SUGGESTION_MAX_DISTANCE edits away, or a quarter of the length of
+        the move for short moves, are left out"""
+        normalised: str = normalise_move_name(move_name)
+        if not normalised:
+            return []
+        max_distance: int = max(
+            1, min(const.MOVE_SUGGESTION_MAX_DISTANCE, len(normalised) // 4)
         )
+        bigrams: set[str] = get_name_bigrams(normalised)
+        # the move itself is never suggested, whatever the case and spaces around it
+        query: str = move_name.casefold().strip()
+
+        # names that can be within max_distance, by the fewest edits they can be away
+        # every edit changes at most 2 bigrams of either name
+        min_shared: int = len(bigrams) - 2 * max_distance
+        candidates: list[tuple[int, int, int, CharacterMoveNames]] = []
+        for character in characters:
+            character_names: CharacterMoveNames = self.character_names(character)
+            shared: Counter[int] = Counter(
+                itertools.chain.from_iterable(
+                    character_names.bigram_postings.get(bigram, ())
+                    for bigram in bigrams
+                )
+            )
+            for name_id, shared_count in shared.items():
+                if shared_count < min_shared:
+                    continue
+                min_edits: int = -(
+                    -(
+                        max(len(bigrams), character_names.bigram_counts[name_id])
+                        - shared_count
+                    )
+                    // 2
+                )
+                if min_edits <= max_distance:
+                    candidates.append(
+                        (min_edits, -shared_count, name_id, character_names)
+                    )
+        candidates.sort(key=lambda candidate: candidate[:3])
+
+        # closest name of each move, names are compared until no other name can be as close as
+        # the last of the suggestions
+        closest: dict[str, MoveSuggestion] = {}
+        for min_edits, _, name_id, character_names in candidates:
+            if len(closest) >= limit:
+                max_distance = sorted(
+                    suggestion.distance for suggestion in closest.values()
+                )[limit - 1]
+                if min_edits >= max_distance:
+                    break
+            if character_names.names[name_id].casefold().strip() == query:
+                continue
+            distance: int = edit_distance(
+                normalised, character_names.normalised_names[name_id], max_distance
+            )
+            found_move: str = character_names.move_names[name_id]
+            if distance <= max_distance and (
+                found_move not in closest or distance < closest[found_move].distance
+            ):
+                closest[found_move] = MoveSuggestion(
+                    character_names.names[name_id], found_move, distance
+                )
+        # sorted is stable, so names found first stay first
+        return sorted(closest.values(), key=lambda suggestion: suggestion.distance)[
+            :limit
+        ]
 
-    if divekick_check.any():
-        divekick_count_check: re.Match[str] | None = re.search(
-            r"x\s?(\d)|[~\s,]", divekick_move_name, flags=re.IGNORECASE
+
+def format_suggestions(suggestions: list[MoveSuggestion]) -> str:
+    """Suggestions as a comma separated list of names, with the move each one finds when it is
+    different, e.g. "5LP, JAB (5LP)" """
+    return ", ".join(
+        (
+            suggestion.name
+            if normalise_move_name(suggestion.name)
+            == normalise_move_name(suggestion.move_name)
+            else f"{suggestion.name} ({suggestion.move_name})"
         )
+        for suggestion in suggestions
+    )
 
+
+def format_unresolved_moves(
+    unresolved_moves: list[tuple[str, list[MoveSuggestion]]],
+) -> str:
+    """Moves that were not found with the suggestions for them, for the batch reports
+    e.g. "5LPP: did you mean 5LP, 5LK; 623Q" """
+    return "; ".join(
+        (
+            f"{move_name}: did you mean {format_suggestions(suggestions)}"
+            if suggestions
+            else move_name
+        )
+        for move_name, suggestions in unresolved_moves
+    )
+
+
+class MoveResolutionCache:
+    """Bounded LRU cache of resolved moves, keyed by (character, move name)
+
+    Stores the frame data row positions for the move and the search state that found it
+    """
+
+    def __init__(self, maxsize: int = const.MOVE_RESOLUTION_CACHE_SIZE) -> None:
+        self.maxsize: int = maxsize
+        self.hits: int = 0
+        self.misses: int = 0
+        self.invalidations: int = 0
+        self._entries: OrderedDict[tuple[str, str], tuple[list[int], str]] = (
+            OrderedDict()
+        )
+        # get reorders the entries too, so every access holds the lock
+        self._lock: threading.Lock = threading.Lock()
+
+    def get(self, character_name: str, move_name: str) -> tuple[list[int], str] | None:
+        """Get the row positions and search state for a move, or None if it is not cached"""
+        with self._lock:
+            entry: tuple[list[int], str] | None = self._entries.get(
+                (character_name, move_name)
+            )
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end((character_name, move_name))
+            return entry
+
+    def put(
+        self,
+        character_name: str,
+        move_name: str,
+        row_positions: list[int],
+        search_state: str,
+    ) -> None:
+        """Store the row positions and search state for a move, evicting the least recently used move"""
+        with self._lock:
+            self._entries[(character_name, move_name)] = (row_positions, search_state)
+            self._entries.move_to_end((character_name, move_name))
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def keys(self) -> list[tuple[str, str]]:
+        """The cached (character, move name) keys, least recently used first"""
+        with self._lock:
+            return list(self._entries)
+
+    def items(self) -> list[tuple[tuple[str, str], tuple[list[int], str]]]:
+        """The cached keys with their row positions and search state, least recently used first"""
+        with self._lock:
+            return list(self._entries.items())
+
+    def invalidate(self) -> None:
+        """Drop every cached move, used when the frame data or alias tables are reloaded"""
+        with self._lock:
+            self._entries.clear()
+            self.invalidations += 1
+
+    def cache_info(self) -> dict[str, int]:
+        """Hit, miss and size counters for the cache"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+            }
+
+
+# Patterns used by the move search strategies
+ANNIE_DIVEKICK_REGEX: re.Pattern[str] = re.compile(r"j?236[LMH]?K", re.IGNORECASE)
+DIVEKICK_COUNT_REGEX: re.Pattern[str] = re.compile(r"x\s?(\d)|[~\s,]", re.IGNORECASE)
+MOVE_STRENGTH_REGEX: re.Pattern[str] = re.compile(r"[LMH]")
+# e.g. 5MKx2
+REPEAT_MOVE_REGEX: re.Pattern[str] = re.compile(r"\s?[Xx]\s?(\d+)$", re.IGNORECASE)
+# L, M or H, followed by P or K followed by "~", ",", "+" or " " followed by P or K
+# e.g. 214HP~P or QCBLP P or 214 MP,P
+FOLLOW_UP_MOVE_REGEX: re.Pattern[str] = re.compile(
+    r"(.+[lmh]?[pk])([~\+,\s]){1,3}([pk])", re.IGNORECASE
+)
+# The generic search only applies to lower case strengths, e.g. 5hp
+GENERIC_MOVE_NAME_CHECK_REGEX: re.Pattern[str] = re.compile(r"(.*?)([lmh])([pk])")
+GENERIC_MOVE_NAME_REGEX: re.Pattern[str] = re.compile(
+    r"(.*?)([lmh])([pk])", re.IGNORECASE
+)
+# e.g. 214Kx2 -> 214MKx2
+NO_STRENGTH_REGEX: re.Pattern[str] = re.compile(
+    r"(.*)([lmh])?([pk])[\s,~+Xx].*", re.IGNORECASE
+)
+# Damage repeated for a number of hits, e.g. 60x5
+# Move types
+# Normals, e.g. 5HP, J[MK], 2LP X2, HEADLESS 5MP or 5LP STARVING, the strength gives the move type
+NORMAL_MOVE_REGEX: re.Pattern[str] = re.compile(
+    r"(?:HEADLESS\s+)?J?\.?\d?\[?([LMH])[PK]\]?(?:\s?X\s?[\d-]+)?(?:\s+[A-Z]+)?",
+    re.IGNORECASE,
+)
+THROW_GUARD_REGEX: re.Pattern[str] = re.compile(r"throw|grab", re.IGNORECASE)
+# Supers spend meter, e.g. -100%
+SUPER_METER_REGEX: re.Pattern[str] = re.compile(r"^\s*-\d")
+# Meter spent by a move in percent of a bar, e.g. 100 for -100%
+METER_COST_REGEX: re.Pattern[str] = re.compile(r"^\s*-(\d+)%")
+NORMAL_MOVE_TYPES: dict[str, str] = {"L": "Light", "M": "Medium", "H": "Heavy"}
+
+# Numbers of the frame columns and meter, e.g. "+4 [+10]", "+11 to +12", "(2.5%) 7.5%"
+BRACKETED_VALUE_REGEX: re.Pattern[str] = re.compile(r"\[[^\]]*\]|\([^)]*\)")
+INTEGER_PATTERN: str = r"[+-]?\d+"
+DECIMAL_PATTERN: str = r"[+-]?\d+(?:\.\d+)?"
+RANGE_SEPARATOR_PATTERN: str = r"%?\s*(?:to|/|→)\s*"
+
+NUM_HITS_REGEX: re.Pattern[str] = re.compile(r"(\d+)x(\d+)$")
+BRACKET_CHARACTERS_REGEX: re.Pattern[str] = re.compile(r"[\[\]()]")
+
+
+def is_stateful_move(move_name: str, character: str) -> bool:
+    """Check if resolving a move depends on the combo state, such as Annie's divekick count
+    The character is the canonical character, see MoveResolver.combo_character"""
+    return character == const.ANNIE and bool(ANNIE_DIVEKICK_REGEX.search(move_name))
+
+
+class ComboContext:
+    """State carried between the moves of one combo while they are resolved
+
+    Every combo has its own context, so combos resolved at the same time with the same
+    MoveResolver do not change each other's state"""
+
+    def __init__(self) -> None:
+        self.annie_divekick_count: int = 0
+        # Moves of the combo that were not found, with the suggestions for them
+        self.unresolved_moves: list[tuple[str, list[MoveSuggestion]]] = []
+        # Character name of the combo and the canonical character it resolves to, set by the
+        # first move resolved, see MoveResolver.combo_character
+        self.character_name: str | None = None
+        self.character: str = ""
+
+
+class MoveResolver:
+    """Resolves move names to the rows of a frame data table
+
+    The search strategies in const.SEARCH_STATES are run in order and the first one
+    that finds the move wins, the name of that strategy is recorded with the result.
+    Resolved moves that do not depend on the combo state are cached. The resolver is shared by
+    every combo using its tables, the state of a combo is kept in the ComboContext passed to
+    resolve"""
+
+    def __init__(
+        self,
+        frame_data: DataFrame,
+        move_name_alias_df: DataFrame,
+        cache_size: int = const.MOVE_RESOLUTION_CACHE_SIZE,
+    ) -> None:
+        self.frame_data: DataFrame = frame_data
+        self.move_name_alias_df: DataFrame = move_name_alias_df
+        self.move_index: MoveNameIndex = get_move_name_index(frame_data)
+        self.alias_map: dict[str, str] = (
+            get_move_alias_map(move_name_alias_df)
+            if not move_name_alias_df.empty
+            else {}
+        )
+        self.cache: MoveResolutionCache = MoveResolutionCache(cache_size)
+        # Number of moves resolved by each strategy
+        self.strategy_counts: dict[str, int] = dict.fromkeys(
+            [*const.SEARCH_STATES, const.NOT_FOUND], 0
+        )
+        # Guards the strategy counts and the suggestions of the moves that were not found
+        self._counts_lock: threading.Lock = threading.Lock()
+        self.strategies: list[
+            tuple[str, Callable[[str, str, ComboContext], list[int]]]
+        ] = [
+            (search_state, getattr(self, f"_search_{search_state}"))
+            for search_state in const.SEARCH_STATES
+        ]
+        # The strategies recorded as stages, used while the instrumentation is enabled
+        self.instrumented_strategies: list[
+            tuple[str, Callable[[str, str, ComboContext], list[int]]]
+        ] = [
+            (
+                strategy_name,
+                instrumentation.instrumented(f"strategy_{strategy_name}")(strategy),
+            )
+            for strategy_name, strategy in self.strategies
+        ]
+
+        # Fuzzy index of the move names, built the first time a move is not found
+        self._suggestion_index: MoveSuggestionIndex | None = None
+        self._suggestion_index_lock: threading.Lock = threading.Lock()
+        # Suggestions of the moves that were not found, by (character, move name), so a move is
+        # only looked up and warned about the first time it is not found
+        self.unresolved_suggestions: dict[tuple[str, str], list[MoveSuggestion]] = {}
+
+        # Annie's divekick rows, in sequence order
+        self.divekick_positions: list[int] = [
+            position
+            for position, move_name in enumerate(frame_data[const.MOVE_NAME])
+            if isinstance(move_name, str) and const.ANNIE_DIVEKICK in move_name
+        ]
+
+    def suggest(
+        self,
+        move_name: str,
+        character_name: str,
+        limit: int = const.MOVE_SUGGESTION_COUNT,
+    ) -> list[MoveSuggestion]:
+        """The move names and aliases closest to a move name, see MoveSuggestionIndex"""
+        with self._suggestion_index_lock:
+            if self._suggestion_index is None:
+                self._suggestion_index = MoveSuggestionIndex(
+                    self.frame_data, self.move_name_alias_df
+                )
+        return self._suggestion_index.suggest(
+            move_name, self.move_index.characters_matching(character_name), limit
+        )
+
+    def _not_found(
+        self, move_name: str, character_name: str, context: ComboContext
+    ) -> None:
+        """Record a move that was not found for the combo, warning with the closest names the
+        first time the move is not found"""
+        key: tuple[str, str] = (context.character or character_name, move_name)
+        with self._counts_lock:
+            suggestions: list[MoveSuggestion] | None = self.unresolved_suggestions.get(
+                key
+            )
+        if suggestions is not None:
+            context.unresolved_moves.append((move_name, suggestions))
+            return
+
+        suggestions = self.suggest(move_name, character_name)
+        context.unresolved_moves.append((move_name, suggestions))
+        with self._counts_lock:
+            self.unresolved_suggestions[key] = suggestions
+            # bounded like the move cache, the oldest moves are dropped first
+            while len(self.unresolved_suggestions) > self.cache.maxsize:
+                del self.unresolved_suggestions[next(iter(self.unresolved_suggestions))]
+        if suggestions:
+            logger.warning(
+                "Move [%s] not found for character [%s], did you mean %s",
+                move_name,
+                character_name,
+                format_suggestions(suggestions),
+            )
+        else:
+            logger.warning(
+                "Move [%s] not found for character [%s]", move_name, character_name
+            )
+
+    def combo_character(self, character_name: str, context: ComboContext) -> str:
+        """The canonical character of a combo, e.g. ANNIE for "Annie", "annie" or "AN"
+        It is resolved once per combo and kept in its context. Empty when the name does not
+        resolve to exactly one character"""
+        if context.character_name != character_name:
+            characters: list[str] = self.move_index.characters_matching(character_name)
+            context.character = characters[0] if len(characters) == 1 else ""
+            context.character_name = character_name
+        return context.character
+
+    def _count(self, search_state: str) -> None:
+        """Count a move resolved by a search strategy"""
+        with self._counts_lock:
+            self.strategy_counts[search_state] += 1
+
+    def resolve(
+        self,
+        move_name: str,
+        character_name: str,
+        context: ComboContext | None = None,
+    ) -> tuple[list[int], str]:
+        """Get the frame data row positions for a move and the search state that found it
+        The move is resolved as part of the combo of the context, or on its own without one
+        """
+        if context is None:
+            context = ComboContext()
+        # moves are cached by the canonical character, so every spelling of a character shares
+        # them, names that are not a character are kept apart by their spelling
+        character: str = self.combo_character(character_name, context)
+        cache_character: str = character or character_name
+        stateful: bool = is_stateful_move(move_name, character)
+        if not stateful:
+            cached_move: tuple[list[int], str] | None = self.cache.get(
+                cache_character, move_name
+            )
+            if cached_move is not None:
+                self._count(cached_move[1])
+                if instrumentation.enabled:
+                    instrumentation.record_move(
+                        character_name, move_name, cached_move[1], cached=True
+                    )
+                if not cached_move[0]:
+                    self._not_found(move_name, character_name, context)
+                return cached_move
+
+        row_positions: list[int] = []
+        search_state: str = const.NOT_FOUND
+        for strategy_name, strategy in (
+            self.instrumented_strategies if instrumentation.enabled else self.strategies
+        ):
+            row_positions = strategy(move_name, character_name, context)
+            if row_positions:
+                search_state = strategy_name
+                logger.debug("Found move in search state [%s]", search_state)
+                break
+        else:
+            self._not_found(move_name, character_name, context)
+
+        self._count(search_state)
+        if instrumentation.enabled:
+            instrumentation.record_move(
+                character_name, move_name, search_state, cached=False
+            )
+        if not stateful:
+            self.cache.put(cache_character, move_name, row_positions, search_state)
+        return row_positions, search_state
+
+    def frame_data_for_move(self, move_name: str, character_name: str) -> DataFrame:
+        """Get the frame data for a single move"""
+        row_positions: list[int] = self.resolve(move_name, character_name)[0]
+        if not row_positions:
+            return DataFrame()
+        return self.frame_data.iloc[row_positions]
+
+    def find(
+        self, move_name: str, character_name: str, check_aliases: bool = False
+    ) -> list[int]:
+        """Row positions of a move for a character, optionally replacing the name with its alias"""
+        if check_aliases:
+            move_name = self.alias_map.get(move_name.casefold(), "")
+            if not move_name:
+                return []
+        return self.move_index.find(move_name, character_name)
+
+    def _search_character_specific(
+        self, move_name: str, character_name: str, context: ComboContext
+    ) -> list[int]:
+        """Check for and handle character specific move data"""
+        # Most common variations of the move are j236HK or j236MK~HK
+        if is_stateful_move(move_name, self.combo_character(character_name, context)):
+            alias_move: str = self.alias_map.get(move_name.casefold(), "")
+            if alias_move:
+                logger.debug("Found alias for move [%s]: [%s]", move_name, alias_move)
+            return self._annie_divekick(alias_move or move_name, context)
+        return []
+
+    def _annie_divekick(self, move_name: str, context: ComboContext) -> list[int]:
+        """Logic for handling Annie's divekick moves, each divekick continues the sequence"""
+        # remove any LMH from the move name
+        divekick_move_name: str = MOVE_STRENGTH_REGEX.sub("", move_name)
+        # the move name is user input, so it is looked for as text rather than as a pattern
+        folded_move_name: str = divekick_move_name.casefold()
+
+        divekick_found: bool = False
+        for column_name in (const.MOVE_NAME, const.ALT_NAMES):
+            names: Series[Any] = self.frame_data[column_name]
+            divekick_found = any(
+                isinstance(names.iat[position], str)
+                and folded_move_name in names.iat[position].casefold()
+                for position in self.divekick_positions
+            )
+            if divekick_found:
+                break
+
+        if not divekick_found:
+            return []
+
+        divekick_count_check: re.Match[str] | None = DIVEKICK_COUNT_REGEX.search(
+            divekick_move_name
+        )
+        divekick_count: int = 1
         if divekick_count_check:
-            divekick_count: int = (
+            divekick_count = (
                 int(divekick_count_check.group(1))
                 if divekick_count_check.group(1)
                 else (divekick_count_check.end() - divekick_count_check.start() + 1)
             )
-        else:
-            divekick_count: int = 1
-
-        global annie_divekick_count
-        previous_divekick_count: int = annie_divekick_count
-        annie_divekick_count += divekick_count
-
-        data_for_move = divekick_df[
-            divekick_df.index.isin(range(previous_divekick_count, annie_divekick_count))
-        ].reset_index(drop=True)
-    return data_for_move
 
+        previous_divekick_count: int = context.annie_divekick_count
+        context.annie_divekick_count += divekick_count
+        return self.divekick_positions[
+            previous_divekick_count : context.annie_divekick_count
+        ]
 
-def character_specific_move_data(
-    move_name: str,
-    character_name: str,
-    frame_data: DataFrame,
-    move_name_alias_df: DataFrame,
-) -> DataFrame:
-    """Check for and handle character specific move data"""
-    data_for_move: DataFrame = DataFrame()
-
-    # check if the move name has a character specific version
-    # Most common variations of the move are j236HK or j236MK~HK
-    match character_name:
-        case "Annie":
-            divekick_first_check_regex: re.Pattern[str] = re.compile(
-                r"j?236[LMH]?K", re.IGNORECASE
+    def _search_repeat(
+        self, move_name: str, character_name: str, context: ComboContext
+    ) -> list[int]:
+        """Attempt to find the frame data for a repeat move, e.g. 5MKx2"""
+        repeat_search: re.Match[str] | None = REPEAT_MOVE_REGEX.search(move_name)
+        if not repeat_search:
+            return []
+
+        logger.debug("Move [%s] is a repeat move", move_name)
+        move_name_without_repeat_count: str = REPEAT_MOVE_REGEX.sub("", move_name)
+        base_positions: list[int] = self.find(
+            move_name_without_repeat_count, character_name
+        )
+        if not base_positions:
+            logger.warning("Could not find repeat data for move [%s]", move_name)
+            return []
+
+        # get next x normals in the sequence where x is the repeat count -1
+        # eg if the move is 5HPx3, get the frame data for 5HP, then 5HPx2 and 5HPx3
+        base_move_index: int = base_positions[0]
+        last_index: int = min(
+            base_move_index + int(repeat_search.group(1)), len(self.frame_data)
+        )
+        return base_positions + list(range(base_move_index + 1, last_index))
+
+    def _search_start(
+        self, move_name: str, character_name: str, context: ComboContext
+    ) -> list[int]:
+        """Find the move by name, follow-up moves are left to the follow-up search"""
+        if FOLLOW_UP_MOVE_REGEX.search(move_name):
+            return []
+        return self.find(move_name, character_name)
+
+    def _search_follow_up(
+        self, move_name: str, character_name: str, context: ComboContext
+    ) -> list[int]:
+        """Attempt to find the frame data for a follow-up move, e.g. 214HP~P
+        The base move is added in front of the follow-up"""
+        follow_up_move_search: re.Match[str] | None = FOLLOW_UP_MOVE_REGEX.search(
+            move_name
+        )
+        if not follow_up_move_search:
+            return []
+
+        logger.debug("Move [%s] is a follow-up move", move_name)
+        base_move_name: str = follow_up_move_search.group(1)
+        base_positions: list[int] = self.find(base_move_name, character_name, True)
+        if not base_positions:
+            logger.warning(
+                "Could not find base move data for follow-up move [%s]", base_move_name
             )
+        return base_positions + self.find(move_name, character_name)
+
+    def _search_alias(
+        self, move_name: str, character_name: str, context: ComboContext
+    ) -> list[int]:
+        """Find the move by its alias"""
+        logger.debug("Move name not found, checking aliases")
+        return self.find(move_name, character_name, True)
+
+    def _search_generic(
+        self, move_name: str, character_name: str, context: ComboContext
+    ) -> list[int]:
+        """Attempt to find a generic form of the move name, e.g. 5hp -> 5p"""
+        if not GENERIC_MOVE_NAME_CHECK_REGEX.search(move_name):
+            return []
+        match: re.Match[str] | None = GENERIC_MOVE_NAME_REGEX.search(move_name)
+        if not match:
+            return []
+        generic_move_name: str = match.group(1) + match.group(3)
+        logger.debug("Searching for move [%s] as [%s]", move_name, generic_move_name)
+        return self.find(generic_move_name, character_name)
+
+    def _search_no_strength(
+        self, move_name: str, character_name: str, context: ComboContext
+    ) -> list[int]:
+        """Check for omission of move strength (e.g. 214K -> 214MK)
+        The move strength is assumed to be the highest strength available for the move
+        """
+        strength_search: re.Match[str] | None = NO_STRENGTH_REGEX.search(move_name)
+        # if group 1 is empty but group 2 is not, then the move strength was omitted
+        if not (
+            strength_search
+            and not strength_search.group(2)
+            and strength_search.group(3)
+        ):
+            return []
 
-            divekick_first_check: re.Match[str] | None = re.search(
-                divekick_first_check_regex, move_name
+        possible_move_positions: list[int] = []
+        for strength in ["L", "M", "H"]:
+            possible_base_move_name: str = (
+                f"{strength_search.group(1)}{strength}{strength_search.group(3)}"
             )
+            possible_move_positions += self.find(
+                possible_base_move_name, character_name
+            ) or self.find(possible_base_move_name, character_name, True)
+
+        if not possible_move_positions:
+            return []
+        logger.debug("Found %s possible base moves", len(possible_move_positions))
+        # add the highest strength version of the move to the data
+        return possible_move_positions[-1:]
+
+
+# Move resolvers of the most recently used frame data and alias tables, so snapshots of the tables
+# can be used side by side without replacing each other's resolver
+_move_resolvers: OrderedDict[tuple[int, int], MoveResolver] = OrderedDict()
+_move_resolvers_lock: threading.Lock = threading.Lock()
+
+
+def get_move_resolver(
+    frame_data: DataFrame, move_name_alias_df: DataFrame
+) -> MoveResolver:
+    """Get the move resolver for a frame data and alias table, building it on first use"""
+    key: tuple[int, int] = (id(frame_data), id(move_name_alias_df))
+    with _move_resolvers_lock:
+        resolver: MoveResolver | None = _move_resolvers.get(key)
+        if (
+            resolver is None
+            or resolver.frame_data is not frame_data
+            or resolver.move_name_alias_df is not move_name_alias_df
+        ):
+            resolver = MoveResolver(frame_data, move_name_alias_df)
+            _move_resolvers[key] = resolver
+        _move_resolvers.move_to_end(key)
+        while len(_move_resolvers) > const.MOVE_RESOLVER_CACHE_SIZE:
+            _move_resolvers.popitem(last=False)
+    return resolver
 
-            alias_move: str = find_move_alias(move_name_alias_df, move_name)
 
-            if divekick_first_check:
-                if alias_move:
-                    move_name = alias_move
-                    # remove any LMH from the move name
-                data_for_move = handle_annie_divekick(move_name, frame_data)
-                return data_for_move
+def clear_caches() -> None:
+    """Clear the derived tables and resolved moves, call this after reloading the frame data or aliases"""
+    clear_derived_tables()
+    with _move_resolvers_lock:
+        # resolvers still held by callers drop their moves too
+        for resolver in _move_resolvers.values():
+            resolver.cache.invalidate()
+        _move_resolvers.clear()
 
-        case _:
-            return data_for_move
 
-    return data_for_move
+def get_csv_list(path: str) -> list[str]:
+    """Returns a list of all csv files in a given path with their relative path"""
+    return [os.path.join(path, f) for f in os.listdir(path) if f.endswith(".csv")]
+
+
+def split_columns(df: DataFrame, column_name: str, seperator: str) -> DataFrame:
+    """Split a column into multiple rows based on a given seperator"""
+    splitdf: DataFrame = df.copy()
+    # split the values in a column on a given seperator
+    logger.debug('Splitting %s on "%s"', column_name, seperator)
+    splitdf[column_name] = splitdf[column_name].str.split(seperator)
+    # explode the column so that each value is on a row
+    splitdf = splitdf.explode(column_name)
+    return splitdf
 
 
 def find_move_from_name_and_character(
@@ -112,44 +1028,42 @@ def find_move_from_name_and_character(
     move_name_alias_df: DataFrame = DataFrame(),
 ) -> DataFrame:
     """Find a move from the move name and character name"""
-    # replace regex characters with escaped versions
-    move_name_escaped: str = re.sub(r"([\\^$*+?.()|{}[\]])", r"\\\1", move_name)
     if check_aliases and not move_name_alias_df.empty:
-        move_name_escaped = find_move_alias(move_name_alias_df, move_name_escaped)
+        move_name = find_move_alias(move_name_alias_df, move_name)
 
-    name_regex: str = rf"^{move_name_escaped}$|^{move_name_escaped}\n|\n{move_name_escaped}$|\n{move_name_escaped}\n"
-    character_check: Series[bool] = frame_data[const.CHARACTER_NAME].str.contains(
-        character_name, flags=re.IGNORECASE
+    move_positions: list[int] = get_move_name_index(frame_data).find(
+        move_name, character_name
     )
-    character_df: DataFrame = frame_data[character_check][
-        [const.MOVE_NAME, const.ALT_NAMES]
-    ]
+    move_data: DataFrame = frame_data.iloc[move_positions]
+    return move_data
 
-    move_df: DataFrame = character_df[
-        character_df[const.MOVE_NAME].str.contains(name_regex, flags=re.IGNORECASE)
-    ]
-    if move_df.empty:
-        move_df = character_df[
-            character_df[const.ALT_NAMES].str.contains(name_regex, flags=re.IGNORECASE)
-        ]
 
-    move_data: DataFrame = frame_data.loc[move_df.index]
-    return move_data
+def build_move_alias_map(move_name_alias_df: DataFrame) -> dict[str, str]:
+    """Build a reverse map from every case folded alias in the newline separated Value column to its Key
+    When an alias is listed under several keys the first key in the table wins"""
+    alias_map: dict[str, str] = {}
+    key: Any
+    values: Any
+    for key, values in zip(move_name_alias_df["Key"], move_name_alias_df["Value"]):
+        if not isinstance(values, str):
+            continue
+        for alias in values.casefold().split("\n"):
+            alias_map.setdefault(alias, key)
+    return alias_map
 
 
-def find_move_alias(move_name_alias_df: DataFrame, move_name_escaped: str) -> str:
+def get_move_alias_map(move_name_alias_df: DataFrame) -> dict[str, str]:
+    """Get the reverse alias map for an alias table, building it on first use"""
+    return get_derived_table(move_name_alias_df, "move_alias_map", build_move_alias_map)
+
+
+def find_move_alias(move_name_alias_df: DataFrame, move_name: str) -> str:
     """Attempt to find an alias for a move"""
-    alias_move: str
-    alias_regex: str = rf"^{move_name_escaped}$|^{move_name_escaped}\n|\n{move_name_escaped}$|\n{move_name_escaped}\n"
-    alias_search: Series[bool] = move_name_alias_df["Value"].str.contains(
-        alias_regex, regex=True, flags=re.IGNORECASE, na=False
+    alias_move: str = get_move_alias_map(move_name_alias_df).get(
+        move_name.casefold(), ""
     )
-    if alias_search.any():
-        # Get the key for the alias
-        alias_move = move_name_alias_df["Key"][alias_search].iloc[0]
-        logger.debug(f"Found alias for move [{move_name_escaped}]: [{alias_move}]")
-    else:
-        alias_move = ""
+    if alias_move:
+        logger.debug("Found alias for move [%s]: [%s]", move_name, alias_move)
     return alias_move
 
 
@@ -160,430 +1074,494 @@ def get_frame_data_for_move(
     move_name_alias_df: DataFrame,
 ) -> DataFrame:
     """Get the frame data for a single move, given a move name and a dataframe"""
+    logger.debug("===========Getting frame data for move [%s]===========", move_name)
+    return get_move_resolver(full_framedata_df, move_name_alias_df).frame_data_for_move(
+        move_name, character_name
+    )
 
-    logger.debug(f"===========Getting frame data for move [{move_name}]===========")
-    # check for follow-up moves such as 214HP~P or QCBLP P or 214 MP,P etc
-    # regex that matches L, M or H, followed by P or K followed by "~", ",", "+" or " " followed by P or K
 
-    search_state: str | None = list(const.SEARCH_STATES.keys())[0]
-    data_for_move: DataFrame = DataFrame()
-    searches_performed: dict[str, bool] = const.SEARCH_STATES.copy()
+class ComboInput(NamedTuple):
+    """A combo to evaluate, the moves are the tokens or move names of the combo"""
 
-    while search_state:
-        match search_state:
-            case "character_specific":
-                data_for_move: DataFrame = character_specific_move_data(
-                    move_name, character_name, full_framedata_df, move_name_alias_df
-                )
-            case "repeat":
-                repeat_moves_regex: str = r"\s?[Xx]\s?(\d+)$"
-                repeat_search: re.Match[str] | None = re.search(
-                    repeat_moves_regex, move_name, re.IGNORECASE
-                )
-                if repeat_search:
-                    logger.debug(f"Move [{move_name}] is a repeat move")
-                    data_for_move = find_repeat_move_data(
-                        move_name,
-                        full_framedata_df,
-                        repeat_moves_regex,
-                        repeat_search,
-                        character_name,
-                    )
-            case "start":
-                data_for_move: DataFrame = find_move_from_name_and_character(
-                    move_name, character_name, full_framedata_df
-                )
+    name: str
+    character: str
+    moves: list[ComboToken | str]
+    expected_damage: float = float("nan")
 
-            case "follow_up":
-                follow_up_move_regex: str = r"(.+[lmh]?[pk])([~\+,\s]){1,3}([pk])"
-                follow_up_move_search: re.Match[str] | None = re.search(
-                    follow_up_move_regex, move_name, re.IGNORECASE
-                )
 
-                if follow_up_move_search:
-                    logger.debug(f"Move [{move_name}] is a follow-up move")
+def read_combo_csv(path: str) -> ComboInput:
+    """Read a combo from a combo csv file"""
+    combo_input_df: DataFrame = pd.read_csv(path)
+    combo_moves: list[ComboToken | str] = []
+    for moves in combo_input_df[const.MOVE_NAME]:
+        if isinstance(moves, str):
+            combo_moves += comboLexer.tokenize(moves)
+    return ComboInput(
+        name=os.path.splitext(os.path.basename(path))[0],
+        character=combo_input_df.at[0, const.CHARACTER_NAME],
+        moves=combo_moves,
+        expected_damage=combo_input_df.at[0, const.EXPECTED_DAMAGE],
+    )
 
-                    data_to_add: DataFrame = find_base_move_data_for_followup_move(
-                        full_framedata_df,
-                        follow_up_move_search,
-                        character_name,
-                        move_name_alias_df,
-                    )
 
-                    data_for_move: DataFrame = pd.concat([data_to_add, data_for_move])
-            case "alias":
-                logger.debug("Move name not found, checking aliases")
-                data_for_move = find_move_from_name_and_character(
-                    move_name,
-                    character_name,
-                    full_framedata_df,
-                    True,
-                    move_name_alias_df,
+def parse_expected_damage(expected_damage: str | None, combo_name: str) -> float:
+    """Get the expected damage of a combo, NaN if it is blank or not a number"""
+    expected_damage = (expected_damage or "").strip()
+    if not expected_damage:
+        return np.nan
+    try:
+        return float(expected_damage)
+    except ValueError:
+        logger.warning(
+            "Expected damage [%s] of %s is not a number, it is not checked",
+            expected_damage,
+            combo_name,
+        )
+        return np.nan
+
+
+def iter_combo_csv(path: str) -> typing.Iterator[ComboInput]:
+    """Read the combos in a combo csv file one at a time
+    A row with a character starts a new combo and the rows after it with a blank character
+    continue its moves. Only the combo being read is kept in memory, so files with any number of
+    combos can be read. The first combo in a file is named after the file, later ones get a number
+    """
+    file_name: str = os.path.splitext(os.path.basename(path))[0]
+    combo: ComboInput | None = None
+    combo_count: int = 0
+
+    with open(path, newline="", encoding="utf-8") as combo_file:
+        for row in csv.DictReader(combo_file):
+            character_name: str = (row.get(const.CHARACTER_NAME) or "").strip()
+            moves: str = row.get(const.MOVE_NAME) or ""
+
+            if character_name:
+                if combo is not None:
+                    yield combo
+                combo_count += 1
+                combo_name: str = (
+                    file_name if combo_count == 1 else f"{file_name}_{combo_count}"
                 )
-            case "generic":
-                generic_move_name_regex: str = r"(.*?)([lmh])([pk])"
-                generic_search: re.Match[str] | None = re.search(
-                    generic_move_name_regex, move_name
+                combo = ComboInput(
+                    name=combo_name,
+                    character=character_name,
+                    moves=[],
+                    expected_damage=parse_expected_damage(
+                        row.get(const.EXPECTED_DAMAGE), combo_name
+                    ),
                 )
-                if generic_search:
-                    data_for_move = find_generic_move_data(
-                        move_name,
-                        full_framedata_df,
-                        generic_move_name_regex,
-                        character_name,
+            elif combo is None:
+                if moves:
+                    logger.warning(
+                        "Skipping moves [%s] in %s, they are not part of a combo",
+                        moves,
+                        path,
                     )
-            case "no_strength":
-                # Check for omission of move strength (e.g. 214MKx2 -> 214Kx2)
-                data_for_move = find_move_no_strength_specified(
-                    move_name, full_framedata_df, character_name, move_name_alias_df
-                )
+                continue
 
-            case "found":
-                logger.debug("Found move")
-                search_state = None
-                return data_for_move
-            case "not_found":
-                logger.warning(
-                    f"Move [{move_name}] not found for character [{character_name}]"
-                )
-                search_state = None
-                return DataFrame()
-            case _:
-                search_state = "not_found"
+            if moves:
+                combo.moves.extend(comboLexer.tokenize(moves))
 
-        search_state, searches_performed = update_search_state(
-            search_state, data_for_move, searches_performed
-        )
-    return data_for_move
-
-
-def update_search_state(
-    search_state: str, data_for_move: DataFrame, searches_performed: dict[str, bool]
-) -> tuple[str, dict[str, bool]]:
-    """Update the search state, setting it to the next state that has not been performed
-    Update the searches performed dictionary to reflect the current search state"""
-    new_searches_performed: dict[str, bool] = searches_performed.copy()
-    new_searches_performed[search_state] = True
-    new_search_state = search_state
-    if not data_for_move.empty and search_state != "start":
-        new_search_state = "found"
-        return new_search_state, new_searches_performed
-    # Set the search state to the next state that has not been performed
-
-    elif search_state == "no_strength":
-        # Reset search state to start
-        new_search_state: str = "start"
-        new_searches_performed: dict[str, bool] = const.SEARCH_STATES.copy()
-        new_searches_performed["no_strength"] = True
-        return new_search_state, new_searches_performed
-    else:
-        for state in const.SEARCH_STATES:
-            if not new_searches_performed[state]:
-                new_search_state: str = state
-                break
-    return new_search_state, new_searches_performed
+    if combo is not None:
+        yield combo
 
 
-def find_move_no_strength_specified(
-    move_name: str,
-    full_framedata_df: DataFrame,
-    character_name: str,
-    move_name_alias_df: DataFrame,
-) -> DataFrame:
-    """Check for omission of move strength (e.g. 214K -> 214MK)
-    returns a dataframe of the frame data for the move if it exists, otherwise an empty dataframe
-    by default, the move strength is assumed to be the highest strength available for the move
-    """
-    possible_move_data: DataFrame = DataFrame()
-    strength_regex: str = r"(.*)([lmh])?([pk])[\s,~+Xx].*"
-    strength_search: re.Match[str] | None = re.search(
-        strength_regex, move_name, re.IGNORECASE
-    )
-    # if group 1 is empty but group 2 is not, then the move strength was omitted
-    if strength_search and not strength_search.group(2) and strength_search.group(3):
-        # Find possible matches for each strength
-        for strength in ["L", "M", "H"]:
-            possible_base_move_name: str = (
-                f"{strength_search.group(1)}{strength}{strength_search.group(3)}"
-            )
-            # append the frame data for the possible base move to the list if it exists
+def iter_combo_csvs(paths: typing.Iterable[str]) -> typing.Iterator[ComboInput]:
+    """Read the combos in a sequence of combo csv files one at a time
+    A file that can not be read is logged and skipped, the combos read from it before the error
+    are kept"""
+    for path in paths:
+        try:
+            yield from iter_combo_csv(path)
+        except (OSError, UnicodeDecodeError, csv.Error):
+            logger.exception("Could not read the combos in %s", path)
 
-            possible_move: DataFrame = find_move_from_name_and_character(
-                possible_base_move_name, character_name, full_framedata_df
-            )
-            if possible_move.empty:
-                possible_move = find_move_from_name_and_character(
-                    possible_base_move_name,
-                    character_name,
-                    full_framedata_df,
-                    True,
-                    move_name_alias_df,
-                )
-            if not possible_move.empty:
-                possible_move_data = pd.concat([possible_move_data, possible_move])
 
-        if not possible_move_data.empty:
-            logger.debug(f"Found {len(possible_move_data)} possible base moves")
-            # add the highest strength version of the move to the data
-            data_for_base_move: DataFrame = possible_move_data.tail(1)
+def iter_combo_tokens(
+    combo_moves: typing.Iterable[Any],
+) -> typing.Iterator[ComboToken]:
+    """Get the tokens of a combo from its tokens or move names, anything else is skipped"""
+    for move in combo_moves:
+        if isinstance(move, ComboToken):
+            yield move
+        elif isinstance(move, str):
+            yield from comboLexer.tokenize(move)
+        else:
             logger.debug(
-                f"Adding highest strength version {data_for_base_move[const.MOVE_NAME].iloc[0]}"
+                "Move [%s] is not a string, skipping it as it is not a move", move
             )
-            return data_for_base_move
 
-    return DataFrame()
 
-
-def find_generic_move_data(
-    move_name: str,
-    full_framedata_df: DataFrame,
-    generic_move_name_regex: str,
+@instrumentation.instrumented("resolve_combo")
+def resolve_combo(
+    resolver: MoveResolver,
     character_name: str,
-) -> DataFrame:
-    """Attempt to find a generic form of the move name in the frame data dataframe"""
-
-    match: re.Match[str] | None = re.search(
-        generic_move_name_regex, move_name, flags=re.IGNORECASE
+    combo_moves: typing.Iterable[Any],
+    context: ComboContext | None = None,
+) -> tuple[list[int], list[str]]:
+    """Get the frame data row positions and search states for every move in a combo
+    The moves can be tokens from comboLexer or move names, which are tokenized"""
+    combo_positions, combo_search_states, _ = resolve_combo_moves(
+        resolver, character_name, combo_moves, context
     )
+    return combo_positions, combo_search_states
 
-    # if the generic move name is found
-    if match:
-        # get the generic move name
-        generic_move_name: str = match.group(1) + match.group(3)
 
-        # search for the generic move name in the frame data dataframe
-        logger.debug(f"Data for move [{move_name}] found as [{generic_move_name}]")
-        data_for_move: DataFrame = find_move_from_name_and_character(
-            generic_move_name, character_name, full_framedata_df
-        )
-    else:
-        data_for_move = DataFrame()
-
-    return data_for_move
-
-
-def find_repeat_move_data(
-    move_name: str,
-    full_framedata_df: DataFrame,
-    repeat_moves_regex: str,
-    repeat_search: re.Match[str] | None,
+def resolve_combo_moves(
+    resolver: MoveResolver,
     character_name: str,
-) -> DataFrame:
-    """Attempt to find the frame data for a repeat move, e.g. 5MKx2"""
-
-    move_name_without_repeat_count: str = re.sub(repeat_moves_regex, "", move_name)
-    logger.debug(f"Move name without repeat count [{move_name_without_repeat_count}]")
+    combo_moves: typing.Iterable[Any],
+    context: ComboContext | None = None,
+) -> tuple[list[int], list[str], list[int]]:
+    """Get the frame data row positions and search states for every move in a combo, with the
+    number of the move each row belongs to, counting every move including ignored ones
+    Pass a new ComboContext to read the unresolved moves of the combo afterwards
+    """
+    if context is None:
+        context = ComboContext()
 
-    # get the frame data for the move without the repeat count
-    data_for_move_without_repeat_count: DataFrame = find_move_from_name_and_character(
-        move_name_without_repeat_count, character_name, full_framedata_df
-    )
+    # frame data row positions, search states and move numbers for every move in the combo
+    combo_positions: list[int] = []
+    combo_search_states: list[str] = []
+    combo_move_numbers: list[int] = []
 
-    if not data_for_move_without_repeat_count.empty:
-        data_for_move: DataFrame = data_for_move_without_repeat_count
-        # if the move without the repeat count is found, get next x normals in the sequence where x is the repeat count -1
-        # eg if the move is 5HPx3, get the frame data for 5HP, then get the frame data for 5HPx2 and 5HPx3
-        # first index is column 0 of data_for_move
-
-        logger.debug(f"Found data for move [{move_name_without_repeat_count}]")
-
-        for i in range(int(repeat_search.group(1)) - 1) if repeat_search else range(0):
-            base_move_index: int = full_framedata_df.index[
-                full_framedata_df[const.MOVE_NAME] == move_name_without_repeat_count
-            ].tolist()[0]
-
-            next_move_in_sequence: Series[Any] = full_framedata_df.iloc[
-                1 + i + base_move_index
-            ]
-            logger.debug(f"Next move: {next_move_in_sequence[const.MOVE_NAME]}")
-            data_for_move = pd.concat(
-                [data_for_move, next_move_in_sequence.to_frame().T]
+    # get the frame data for all moves in the combo by looping through the moves
+    for move_number, token in enumerate(iter_combo_tokens(combo_moves)):
+        # Check against automatically ignored moves
+        # Case insensitive
+        if token.kind == const.TOKEN_IGNORED:
+            logger.debug(
+                "Ignoring move [%s], it is in the ignored moves list", token.text
             )
-    else:
-        logger.warning(f"Could not find repeat data for move [{move_name}]")
-        data_for_move = DataFrame()
-
-    return data_for_move
-
+            continue
 
-def find_base_move_data_for_followup_move(
-    full_framedata_df: DataFrame,
-    follow_up_move_search: re.Match[str],
-    character_name: str,
-    move_name_alias_df: DataFrame,
-) -> DataFrame:
-    """Attempt to find the frame data for a follow-up move, e.g. 214MKx2"""
-    # if the move is a follow-up move, get the frame data for the follow-up move and return the name of the base move and the frame data for the follow-up move
-    base_move_name: str = follow_up_move_search.group(1)
-    data_for_base_move: DataFrame = find_move_from_name_and_character(
-        base_move_name, character_name, full_framedata_df, True, move_name_alias_df
-    )
+        if token.kind == const.TOKEN_KARA:
+            logger.debug(
+                "Move name is kara, assuming previous move was kara cancelled so removing it from the combo"
+            )
+            # If the move is kara, assume the previous move was kara cancelled and remove it from the combo
+            if combo_positions:
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(
+                        "Move removed: %s",
+                        resolver.frame_data[const.MOVE_NAME].iat[combo_positions[-1]],
+                    )
+                combo_positions.pop()
+                combo_search_states.pop()
+                combo_move_numbers.pop()
+            continue
 
-    if data_for_base_move.empty:
-        logger.warning(
-            f"Could not find base move data for follow-up move [{base_move_name}]"
+        logger.debug(
+            "===========Getting frame data for move [%s]===========", token.text
         )
+        move_positions, search_state = resolver.resolve(
+            token.text, character_name, context
+        )
+        combo_positions += move_positions
+        combo_search_states += [search_state] * len(move_positions)
+        combo_move_numbers += [move_number] * len(move_positions)
 
-    return data_for_base_move
+    return combo_positions, combo_search_states, combo_move_numbers
 
 
+@instrumentation.instrumented("get_frame_data_for_combo")
 def get_frame_data_for_combo(
     combo_df: DataFrame,
     full_framedata_df: DataFrame,
     move_name_alias_df: DataFrame,
+    context: ComboContext | None = None,
 ) -> DataFrame:
-    """Get the frame data for a combo"""
+    """Get the frame data for a combo
+    The search state that found each move is kept in the SearchState column"""
+
+    resolver: MoveResolver = get_move_resolver(full_framedata_df, move_name_alias_df)
 
     # get the character name from the combo DataFrame
+    character_name: str = combo_df[const.CHARACTER_NAME].iloc[0]
 
-    # Combo globals
-    global annie_divekick_count
-    annie_divekick_count = 0
+    combo_positions, combo_search_states = resolve_combo(
+        resolver, character_name, combo_df[const.MOVE_NAME], context
+    )
+    return get_frame_data_for_positions(
+        full_framedata_df, combo_positions, combo_search_states
+    )
 
-    character_name: str = combo_df[const.CHARACTER_NAME].iloc[0]
 
-    # initialize an empty frame data DataFrame
-    combo_framedata_df: DataFrame = DataFrame(columns=full_framedata_df.columns)
+def get_frame_data_for_positions(
+    full_framedata_df: DataFrame,
+    combo_positions: list[int],
+    combo_search_states: list[str],
+) -> DataFrame:
+    """Get the frame data rows of a resolved combo, with the search state that found each move"""
+    combo_framedata_df: DataFrame = full_framedata_df.iloc[combo_positions].reset_index(
+        drop=True
+    )
+    combo_framedata_df[const.SEARCH_STATE] = combo_search_states
+    return combo_framedata_df
 
-    # get the combo moves from the given combo DataFrame
-    combo_moves: Series[typing.Any] = combo_df[const.MOVE_NAME]
 
-    # get the frame data for all moves in the combo by looping through the moves
-    for move in combo_moves:
-        if isinstance(move, float):
-            logger.debug(
-                f"Move [{move}] is not a string, skipping it as it is not a move"
-            )
-            continue
+@functools.lru_cache(maxsize=None)
+def parse_damage_string(damage: Any) -> tuple[int, ...]:
+    """Parse the damage of each hit from a frame data damage string, e.g. "200 x2, [300x2 (35x2)], 300"
+    Chip damage in parentheses and special values in square brackets are not hits.
+    Each damage string is only parsed once, later calls return the cached hits"""
+    # If the move does not have any damage it has no hits, "-" is used for moves with no damage
+    if not isinstance(damage, str) or damage in ("0", "", "-"):
+        return ()
+    # Remove the chip and special values from the damage string
+    _, damage = extract_values_from_parentheses([], damage)
+    _, damage = extract_values_from_brackets([], damage)
 
-        # Check against automatically ignored moves
-        # Case insensitive
-        if move.lower() in const.IGNORED_MOVES:
-            logger.debug(f"Ignoring move [{move}], it is in the ignored moves list")
-            continue
+    return tuple(clean_and_extract_damage(damage.split(",")))
 
-        if move.lower() == "kara":
-            logger.debug(
-                "Move name is kara, assuming previous move was kara cancelled so removing it from the combo"
-            )
-            logger.debug(
-                f"Move removed: {combo_framedata_df.iloc[-1][const.MOVE_NAME]}"
-            )
-            # If the move is kara, assume the previous move was kara cancelled and remove it from the combo
-            combo_framedata_df = combo_framedata_df.iloc[:-1]
 
-            continue
+class DamageValues(NamedTuple):
+    """Damage of each hit of a move, with the chip damage in parentheses
+    and the special damage in square brackets of its damage string"""
 
-        move_framedata: DataFrame = get_frame_data_for_move(
-            move, full_framedata_df, character_name, move_name_alias_df
-        )
+    hits: tuple[int, ...]
+    chip: tuple[int, ...]
+    special: tuple[int, ...]
 
-        # append the move frame data to the temporary frame data DataFrame
-        combo_framedata_df = pd.concat(
-            [combo_framedata_df, move_framedata], ignore_index=True
+
+def parse_bracketed_damage(values: list[str]) -> tuple[int, ...]:
+    """Parse the damage of each hit from bracketed damage values, e.g. ["(45 x3)"]"""
+    damage: list[int] = []
+    for value in values:
+        damage += clean_and_extract_damage(
+            BRACKET_CHARACTERS_REGEX.sub("", value).split(",")
         )
+    return tuple(damage)
+
+
+def parse_damage_values(damage: Any) -> DamageValues:
+    """Parse a frame data damage string into its hit, chip and special damage
+    Values that can not be parsed, such as "400 OR 500**", are left empty"""
+    if not isinstance(damage, str):
+        return DamageValues((), (), ())
+
+    chip: list[str]
+    special: list[str]
+    chip, remaining_damage = extract_values_from_parentheses([], damage)
+    special, remaining_damage = extract_values_from_brackets([], remaining_damage)
+
+    damage_values: list[tuple[int, ...]] = []
+    parse: Callable[[], tuple[int, ...]]
+    for parse in (
+        lambda: parse_damage_string(damage),
+        lambda: parse_bracketed_damage(chip),
+        lambda: parse_bracketed_damage(special),
+    ):
+        try:
+            damage_values.append(parse())
+        except ValueError:
+            logger.debug("Could not parse damage [%s]", damage)
+            damage_values.append(())
+    return DamageValues(*damage_values)
+
+
+class HitDamageTable(NamedTuple):
+    """Damage of every hit of every frame data row, the hits of row i are
+    values[starts[i] : starts[i] + counts[i]]"""
+
+    starts: np.ndarray
+    counts: np.ndarray
+    values: np.ndarray
+
+
+def get_row_hit_damage(frame_data: DataFrame) -> list[tuple[int, ...]]:
+    """Get the damage of each hit of every frame data row
+    Uses the HitDamage column added when the frame data is loaded, or parses the Damage column
+    Rows with damage that can not be parsed, such as "400 OR 500**", have no hits"""
+    if const.HIT_DAMAGE in frame_data.columns:
+        return frame_data[const.HIT_DAMAGE].tolist()
+    return [parse_damage_values(damage).hits for damage in frame_data[const.DAMAGE]]
+
+
+def get_row_hits(frame_data: DataFrame) -> list[tuple[int, ...]]:
+    """Get the damage of each hit of every frame data row, building it on first use"""
+    return get_derived_table(frame_data, "row_hits", get_row_hit_damage)
+
+
+def build_hit_damage_table(frame_data: DataFrame) -> HitDamageTable:
+    """Build the hit damage table of a frame data table"""
+    row_hits: list[tuple[int, ...]] = get_row_hit_damage(frame_data)
+    counts: np.ndarray = np.array([len(hits) for hits in row_hits], dtype=np.int64)
+    starts: np.ndarray = np.concatenate(([0], np.cumsum(counts)[:-1])).astype(np.int64)
+    values: np.ndarray = np.array(
+        [hit for hits in row_hits for hit in hits], dtype=np.int64
+    )
+    return HitDamageTable(starts, counts, values)
 
-    return combo_framedata_df
 
+def get_hit_damage_table(frame_data: DataFrame) -> HitDamageTable:
+    """Get the hit damage table for a frame data table, building it on first use"""
+    return get_derived_table(frame_data, "hit_damage_table", build_hit_damage_table)
 
-def parse_hits(combo_frame_data_df: DataFrame) -> DataFrame:
-    """Parse the hits from the combo frame data dataframe."""
-    # Set up the regex to find the number of hits in a move
 
-    # Set up the dataframe for the hits
-    hits_df: DataFrame = DataFrame(
-        columns=[const.MOVE_NAME, "Damage", "Chip", "Special"]
+def gather_hits(
+    hit_damage_table: HitDamageTable, row_positions: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """Gather the hit damage for a sequence of frame data rows
+    Returns the damage of every hit and the number of hits of each row"""
+    counts: np.ndarray = hit_damage_table.counts[row_positions]
+    # offset of each hit from the first hit of its row
+    hit_offsets: np.ndarray = np.arange(counts.sum()) - np.repeat(
+        np.cumsum(counts) - counts, counts
     )
-    movestr: str
-    for movestr in combo_frame_data_df[const.MOVE_NAME]:
-        # find a way to keep track of the cell that is being parsed
+    hit_index: np.ndarray = (
+        np.repeat(hit_damage_table.starts[row_positions], counts) + hit_offsets
+    )
+    return hit_damage_table.values[hit_index], counts
+
+
+def classify_move_type(move_name: Any, guard: Any, meter: Any) -> str:
+    """Get the move type of a move for its undizzy, one of the keys of const.UNDIZZY_DICT
+    Throws and supers are found from the guard and meter columns, normals from their strength
+    and everything else is a special"""
+    if isinstance(guard, str) and THROW_GUARD_REGEX.search(guard):
+        return "Throws+Supers"
+    if isinstance(meter, str) and SUPER_METER_REGEX.search(meter):
+        return "Throws+Supers"
+    if isinstance(move_name, str):
+        if "THROW" in move_name.upper():
+            return "Throws+Supers"
+        normal_match: re.Match[str] | None = NORMAL_MOVE_REGEX.fullmatch(move_name)
+        if normal_match:
+            return NORMAL_MOVE_TYPES[normal_match.group(1).upper()]
+    return "Special"
+
+
+def parse_meter_cost(meter: Any) -> int:
+    """Get the meter a move spends in percent of a bar, 0 for moves that do not spend meter"""
+    if not isinstance(meter, str):
+        return 0
+    meter_match: re.Match[str] | None = METER_COST_REGEX.search(meter)
+    return int(meter_match.group(1)) if meter_match else 0
+
+
+def parse_frame_values(values: Series, dtype: str = "Int64") -> DataFrame:
+    """Parse a frame data column into numbers, in the Value, Alt and Max columns
+    Value is the first number outside brackets, Alt the first number in [..] or (..) and Max the
+    end of a range written with "to", "/" or "→". ± is read as +, e.g. "+4 [+10]" is 4 and 10,
+    "+11 to +12" is 11 and 12 and "-" is missing. Whole numbers are read for integer dtypes
+    """
+    number_pattern: str = (
+        INTEGER_PATTERN if pd.api.types.is_integer_dtype(dtype) else DECIMAL_PATTERN
+    )
+    text: Series = values.astype("string").str.replace("±", "+", regex=False)
+    unbracketed_text: Series = text.str.replace(BRACKETED_VALUE_REGEX, " ", regex=True)
+    parsed_values: DataFrame = DataFrame(
+        {
+            const.VALUE_SUFFIX: unbracketed_text.str.extract(
+                f"({number_pattern})", expand=False
+            ),
+            const.ALT_SUFFIX: text.str.extract(
+                rf"[\[(]\s*({number_pattern})", expand=False
+            ),
+            const.MAX_SUFFIX: unbracketed_text.str.extract(
+                f"{number_pattern}{RANGE_SEPARATOR_PATTERN}({number_pattern})",
+                expand=False,
+            ),
+        }
+    )
+    return parsed_values.apply(pd.to_numeric).astype(dtype)
 
-        # Get the series for the current move
-        move_series: Series[typing.Any] = combo_frame_data_df.loc[
-            combo_frame_data_df[const.MOVE_NAME] == movestr
-        ].iloc[0]
 
-        # If the move does not have any damage, continue to the next move
-        if (
-            move_series["Damage"] == "0"
-            or move_series["Damage"] == ""
-            or move_series["Damage"] == None
-        ):
-            logger.debug(f"Move [{movestr}] does not have any damage")
-            continue
-        # Initialize the lists for the damage, chip, and special properties of the move
-        move_chip: list[str] = []
-        move_special: list[str] = []
+def get_row_move_types(frame_data: DataFrame) -> list[str]:
+    """Get the move type of every frame data row
+    Uses the MoveType column added when the frame data is loaded, or classifies the moves
+    """
+    if const.MOVE_TYPE in frame_data.columns:
+        return frame_data[const.MOVE_TYPE].tolist()
+    return [
+        classify_move_type(move_name, guard, meter)
+        for move_name, guard, meter in zip(
+            frame_data[const.MOVE_NAME],
+            frame_data.get(const.GUARD, Series(index=frame_data.index, dtype=object)),
+            frame_data.get(const.METER, Series(index=frame_data.index, dtype=object)),
+        )
+    ]
 
-        # Get the damage list for the current move
-        currentmove_damagestr: str = move_series["Damage"]
 
-        # Extract the chip properties from the damage list and remove them from the list
-        move_chip, currentmove_damagestr = extract_values_from_parentheses(
-            move_chip, currentmove_damagestr
-        )
-        # Extract the special properties from the damage list and remove them from the list
-        move_special, currentmove_damagestr = extract_values_from_brackets(
-            move_special, currentmove_damagestr
-        )
+def build_row_undizzy(frame_data: DataFrame) -> np.ndarray:
+    """Get the undizzy added by each hit of every frame data row"""
+    return np.array(
+        [
+            const.UNDIZZY_DICT.get(move_type, 0)
+            for move_type in get_row_move_types(frame_data)
+        ],
+        dtype=np.int64,
+    )
 
-        # Initialize the list of the damage done by the move
-        currentmove_damagelist: list[str] = currentmove_damagestr.split(",")
 
-        # clean the damage list and extract the damage, adding a row to the hits dataframe for each hit
-        hits_df = clean_and_extract_damage(hits_df, movestr, currentmove_damagelist)
+def get_row_undizzy(frame_data: DataFrame) -> np.ndarray:
+    """Get the undizzy of each hit of every frame data row, building it on first use"""
+    return get_derived_table(frame_data, "row_undizzy", build_row_undizzy)
 
-    return hits_df
 
+@instrumentation.instrumented("parse_hits")
+def parse_hits(combo_frame_data_df: DataFrame) -> DataFrame:
+    """Parse the hits from the combo frame data dataframe."""
+    # Move name, damage and undizzy of every hit, the hits table is built from them at the end
+    hit_move_names: list[str] = []
+    hit_damage: list[int] = []
+    hit_undizzy: list[int] = []
+
+    # Use the hit damage parsed when the frame data was loaded if it is there
+    row_hit_damage: typing.Iterable[Any] = (
+        combo_frame_data_df[const.HIT_DAMAGE]
+        if const.HIT_DAMAGE in combo_frame_data_df.columns
+        else map(parse_damage_string, combo_frame_data_df[const.DAMAGE])
+    )
 
-def clean_and_extract_damage(
-    hits_df: DataFrame,
-    move: str,
-    dmg_list: list[str],
-) -> DataFrame:
-    """Cleans the damage list and extracts the damage, adding a row to the hits dataframe for each hit"""
+    movestr: str
+    move_hits: tuple[int, ...]
+    move_undizzy: int
+    for movestr, move_hits, move_undizzy in zip(
+        combo_frame_data_df[const.MOVE_NAME],
+        row_hit_damage,
+        build_row_undizzy(combo_frame_data_df).tolist(),
+    ):
+        # If the move does not have any damage, continue to the next move
+        if not move_hits:
+            logger.debug("Move [%s] does not have any damage", movestr)
+            continue
 
-    output_df: DataFrame = hits_df
-    # Set up the regex to find the number of hits in a move
-    num_hits_regex: str = r"(\d+)x(\d+)$"
+        hit_move_names += [movestr] * len(move_hits)
+        hit_damage += move_hits
+        hit_undizzy += [move_undizzy] * len(move_hits)
+
+    return DataFrame(
+        {
+            const.MOVE_NAME: hit_move_names,
+            const.DAMAGE: pd.Series(hit_damage, dtype=np.int64),
+            const.UNDIZZY: pd.Series(hit_undizzy, dtype=np.int64),
+            "Chip": None,
+            "Special": None,
+        }
+    )
+
+
+def clean_and_extract_damage(dmg_list: list[str]) -> list[int]:
+    """Cleans the damage list and extracts the damage of each hit"""
     move_dmg: list[int] = []
     # for every element in the list of the move's damage values
-    for _, string in enumerate(dmg_list):
+    for string in dmg_list:
+        # remove whitespace
+        string = re.sub(r"\s", "", string)
         # if the string is empty, skip it
         if string == "":
             continue
-            # remove whitespace
-        string: str = re.sub(r"\s", "", string)
-        if string == "":
-            continue
-            # search for a match to the regex pattern for the number of hits and damage
-        numhits_result: re.Match[str] | None = re.search(num_hits_regex, string)
-        # if the regex pattern is found, extract the damage and number of hits
+        # search for a match to the regex pattern for the number of hits and damage
+        numhits_result: re.Match[str] | None = NUM_HITS_REGEX.search(string)
+        # if the regex pattern is found, add the damage for each hit to the move's damage list
         if numhits_result:
-            numhits: int = int(numhits_result.group(2))
-            hitdmg: int = int(numhits_result.group(1))
-            # add the damage for each hit to the move's damage list
-            for _ in range(numhits):
-                move_dmg.append(hitdmg)
-                # add the damage to a temporary DataFrame
-                temp_df: DataFrame = DataFrame(
-                    [[move, hitdmg, None, None]],
-                    columns=output_df.columns,
-                )
-                # append the temporary DataFrame to the hits DataFrame
-                output_df = pd.concat([output_df, temp_df], ignore_index=True)
-
-            # if the regex pattern is not found and the string is not empty, add it directly to the move's damage list
-        if string != "" and not re.search(num_hits_regex, string):
+            move_dmg += [int(numhits_result.group(1))] * int(numhits_result.group(2))
+        # otherwise add it directly to the move's damage list
+        else:
             move_dmg.append(int(string))
-            # add the damage to a temporary DataFrame
-            temp_df = DataFrame(
-                [[move, string, None, None]],
-                columns=output_df.columns,
-            )
-            # append the temporary DataFrame to the hits DataFrame
-            output_df = pd.concat([output_df, temp_df], ignore_index=True)
-    return output_df
+    return move_dmg
 
 
 def extract_values_from_brackets(lst: list[str], string: str) -> tuple[list[str], str]:
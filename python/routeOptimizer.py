@@ -0,0 +1,301 @@
+"""
+Search for the highest damage routes for a combo.
+Routes are built one move at a time after a starter, with each hit scaled by its hit number the
+same way as comboEngine, so the damage of a route matches the damage of the combo it describes.
+"""
+
+from __future__ import annotations
+
+import heapq
+import math
+import time
+from operator import itemgetter
+from typing import Any, Iterable, NamedTuple
+
+import numpy as np
+from pandas import DataFrame
+
+import comboEngine
+import constants as const
+import parseCombo
+from constants import logger
+
+# flake8: noqa: E501
+
+# Hit number from which every hit is scaled by the scaling floor, higher hit numbers scale the same
+SCALING_FLOOR_HIT_NUMBER: int = 3 + math.ceil(
+    math.log(min(const.DAMAGE_SCALING_MIN, const.DAMAGE_SCALING_MIN_ABOVE_1K))
+    / math.log(const.DAMAGE_SCALING_FACTOR)
+)
+
+
+class RouteMove(NamedTuple):
+    """A move that can be added to a route, with the damage of each of its hits
+    meter is the meter the move spends in percent of a bar"""
+
+    name: str
+    hits: tuple[int, ...]
+    meter: int
+
+
+class Route(NamedTuple):
+    """A route found by the search, the moves are after the starter
+    The damage, hits and meter include the starter"""
+
+    moves: tuple[str, ...]
+    damage: int
+    hits: int
+    meter: int
+
+
+class RouteSearch(NamedTuple):
+    """The best routes found by a search and how much of the search space was explored"""
+
+    routes: list[Route]
+    explored_routes: int
+    seconds: float
+
+
+def get_row_route_move(
+    frame_data: DataFrame, move_name: str, row_positions: list[int]
+) -> RouteMove:
+    """Get the route move made of frame data rows"""
+    rows: DataFrame = frame_data.iloc[row_positions]
+    hits: tuple[int, ...] = tuple(
+        hit for row_hits in parseCombo.get_row_hit_damage(rows) for hit in row_hits
+    )
+    meter: int = sum(
+        parseCombo.parse_meter_cost(meter) for meter in rows.get(const.METER, [])
+    )
+    return RouteMove(move_name, hits, meter)
+
+
+def get_route_move(
+    resolver: parseCombo.MoveResolver, character_name: str, move_name: str
+) -> RouteMove | None:
+    """Resolve a move that can be added to a route, None if the move can not be found"""
+    row_positions, _ = parseCombo.resolve_combo(resolver, character_name, [move_name])
+    if not row_positions:
+        return None
+    return get_row_route_move(resolver.frame_data, move_name, row_positions)
+
+
+def get_character_moves(
+    full_framedata_df: DataFrame, character_name: str
+) -> list[RouteMove]:
+    """Get every move of a character, named by the first line of its move name
+    Moves are built straight from the frame data rows, so move names that are not combo notation,
+    such as "SAGAN BEAM", are not split into several moves"""
+    characters: list[str] = parseCombo.get_move_name_index(
+        full_framedata_df
+    ).characters_matching(character_name)
+    move_rows: dict[str, list[int]] = {}
+    position: int
+    character: str
+    names: Any
+    for position, (character, names) in enumerate(
+        zip(full_framedata_df[const.CHARACTER_NAME], full_framedata_df[const.MOVE_NAME])
+    ):
+        if isinstance(names, str) and character.upper() in characters:
+            move_name: str = names.split("\n")[0].strip()
+            if move_name:
+                move_rows.setdefault(move_name, [position])
+    return [
+        get_row_route_move(full_framedata_df, move_name, row_positions)
+        for move_name, row_positions in move_rows.items()
+    ]
+
+
+def add_hits(hits: Iterable[int], hit_number: int) -> tuple[int, int]:
+    """Get the scaled damage of a sequence of hits following a hit number, and the hit number after
+    them capped at SCALING_FLOOR_HIT_NUMBER"""
+    damage, hit_number = comboEngine.add_scaled_hits(hits, hit_number)
+    return damage, min(hit_number, SCALING_FLOOR_HIT_NUMBER)
+
+
+def find_best_routes(
+    character_name: str,
+    starter: str | list[Any],
+    allowed_moves: Iterable[str] | None = None,
+    max_moves: int = 8,
+    meter_budget: float | None = None,
+    top_k: int = 10,
+    beam_width: int | None = None,
+    full_framedata_df: DataFrame | None = None,
+    move_name_alias_df: DataFrame | None = None,
+) -> RouteSearch:
+    """Find the top_k highest damage routes of up to max_moves moves after a starter
+    The starter is a combo string or a list of moves, the allowed moves default to every move
+    of the character. meter_budget is the number of bars the route can spend, meter built during
+    the route is not counted.
+
+    The damage a move adds only depends on the hit number before it, and every hit number from
+    SCALING_FLOOR_HIT_NUMBER on scales the same, so partial routes are merged by
+    (hit number, meter spent, last move) keeping the top_k of each. Partial routes are pruned when
+    even unscaled or floor scaled moves can not bring them into the top_k, and beam_width
+    optionally limits the number of merged states kept after each move."""
+    start_time: float = time.perf_counter()
+    if full_framedata_df is None or move_name_alias_df is None:
+        full_framedata_df, move_name_alias_df = comboEngine.get_tables()
+    resolver: parseCombo.MoveResolver = parseCombo.get_move_resolver(
+        full_framedata_df, move_name_alias_df
+    )
+
+    # Moves that can be added to the route
+    moves: list[RouteMove] = []
+    if allowed_moves is None:
+        moves = get_character_moves(full_framedata_df, character_name)
+    else:
+        for move_name in allowed_moves:
+            route_move: RouteMove | None = get_route_move(
+                resolver, character_name, move_name
+            )
+            if route_move is None:
+                logger.warning(
+                    "Move [%s] not found for character [%s], it is not used in routes",
+                    move_name,
+                    character_name,
+                )
+            else:
+                moves.append(route_move)
+    moves = [move for move in moves if any(move.hits)]
+
+    # Damage and hit number after each move from each hit number
+    transitions: list[list[tuple[int, int]]] = [
+        [add_hits(move.hits, hit_number) for move in moves]
+        for hit_number in range(SCALING_FLOOR_HIT_NUMBER + 1)
+    ]
+    move_meter: list[int] = [move.meter for move in moves]
+
+    # Most damage one move can add after each hit number, hit numbers only go up unless a move
+    # has a hit with no damage, which restarts the hit number
+    best_gain: np.ndarray = np.array(
+        [max((gain for gain, _ in row), default=0) for row in transitions]
+    )
+    if any(0 in move.hits for move in moves):
+        upper_gain: list[int] = [int(best_gain.max())] * len(best_gain)
+    else:
+        upper_gain = np.maximum.accumulate(best_gain[::-1])[::-1].tolist()
+    # Least damage the best free move adds, every hit is scaled by at least the scaling floor
+    lower_gain: int = max(
+        (
+            transitions[SCALING_FLOOR_HIT_NUMBER][index][0]
+            for index, meter in enumerate(move_meter)
+            if meter == 0
+        ),
+        default=0,
+    )
+
+    track_meter: bool = meter_budget is not None
+    meter_limit: float = (
+        round(meter_budget * 100) if meter_budget is not None else math.inf
+    )
+
+    # The starter
+    starter_positions, _ = parseCombo.resolve_combo(
+        resolver,
+        character_name,
+        [starter] if isinstance(starter, str) else starter,
+    )
+    starter_rows: DataFrame = full_framedata_df.iloc[starter_positions]
+    starter_hits: list[int] = [
+        hit
+        for row_hits in parseCombo.get_row_hit_damage(starter_rows)
+        for hit in row_hits
+    ]
+    starter_damage, starter_hit_number = add_hits(starter_hits, 0)
+    starter_meter: int = sum(
+        parseCombo.parse_meter_cost(meter)
+        for meter in starter_rows.get(const.METER, [])
+    )
+
+    # Partial routes are (damage, (move index, previous node)) by (hit number, meter, last move)
+    frontier: dict[tuple[int, int, int], list[tuple[int, Any]]] = {
+        (starter_hit_number, starter_meter if track_meter else 0, -1): [
+            (starter_damage, None)
+        ]
+    }
+    finished: list[tuple[int, Any]] = []
+    explored_routes: int = 0
+
+    for move_count in range(max_moves):
+        moves_left: int = max_moves - move_count - 1
+        # a route is only kept if it can beat the top_k routes the frontier is sure to reach
+        lower_bounds: list[int] = heapq.nlargest(
+            top_k,
+            (
+                damage + (moves_left + 1) * lower_gain
+                for partial_routes in frontier.values()
+                for damage, _ in partial_routes
+            ),
+        )
+        threshold: float = lower_bounds[-1] if len(lower_bounds) >= top_k else -math.inf
+
+        candidates: dict[tuple[int, int, int], list[tuple[int, Any]]] = {}
+        for (hit_number, meter, _), partial_routes in frontier.items():
+            can_extend: bool = False
+            for move_index, (gain, next_hit_number) in enumerate(
+                transitions[hit_number]
+            ):
+                next_meter: int = meter + move_meter[move_index]
+                if next_meter > meter_limit:
+                    continue
+                can_extend = True
+                best_case: int = gain + moves_left * upper_gain[next_hit_number]
+                if partial_routes[0][0] + best_case < threshold:
+                    continue
+
+                bucket: list[tuple[int, Any]] = candidates.setdefault(
+                    (next_hit_number, next_meter if track_meter else 0, move_index),
+                    [],
+                )
+                # partial routes are sorted by damage, the rest can only be worse
+                for damage, node in partial_routes:
+                    explored_routes += 1
+                    if damage + best_case < threshold:
+                        break
+                    bucket.append((damage + gain, (move_index, node)))
+            if not can_extend:
+                finished += partial_routes
+
+        frontier = {
+            state: heapq.nlargest(top_k, bucket, key=itemgetter(0))
+            for state, bucket in candidates.items()
+            if bucket
+        }
+        if beam_width is not None and len(frontier) > beam_width:
+            frontier = dict(
+                heapq.nlargest(
+                    beam_width, frontier.items(), key=lambda item: item[1][0][0]
+                )
+            )
+        if not frontier:
+            break
+
+    for partial_routes in frontier.values():
+        finished += partial_routes
+
+    routes: list[Route] = []
+    for damage, node in heapq.nlargest(top_k, finished, key=itemgetter(0)):
+        route_moves: list[RouteMove] = []
+        while node is not None:
+            route_moves.append(moves[node[0]])
+            node = node[1]
+        route_moves.reverse()
+        routes.append(
+            Route(
+                moves=tuple(move.name for move in route_moves),
+                damage=damage,
+                hits=len(starter_hits) + sum(len(move.hits) for move in route_moves),
+                meter=starter_meter + sum(move.meter for move in route_moves),
+            )
+        )
+
+    seconds: float = time.perf_counter() - start_time
+    logger.info(
+        "Explored %s partial routes in %.3fs (%.0f routes/s)",
+        explored_routes,
+        seconds,
+        explored_routes / seconds if seconds else 0,
+    )
+    return RouteSearch(routes, explored_routes, seconds)
@@ -0,0 +1,54 @@
+"""
+Fixtures shared by the tests.
+The modules of the engine are flat modules in the python directory, so it is put on the path.
+"""
+
+import os
+import shutil
+import sys
+from pathlib import Path
+
+import pytest
+from pandas import DataFrame
+
+PYTHON_DIR: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PYTHON_DIR)
+
+import comboEngine  # noqa: E402
+import frameData  # noqa: E402
+import parseCombo  # noqa: E402
+
+COMBO_CSV_DIR: str = os.path.join(frameData.DATA_DIR, "combo_csvs")
+
+
+@pytest.fixture(scope="session")
+def tables() -> tuple[DataFrame, DataFrame]:
+    """The frame data and move name alias tables, loaded once by the engine"""
+    return comboEngine.get_tables()
+
+
+@pytest.fixture(scope="session")
+def bundled_combos() -> list[parseCombo.ComboInput]:
+    """The combos of the bundled combo csv files"""
+    return list(
+        parseCombo.iter_combo_csvs(sorted(parseCombo.get_csv_list(COMBO_CSV_DIR)))
+    )
+
+
+@pytest.fixture(scope="session")
+def bundled_moves(bundled_combos: list[parseCombo.ComboInput]) -> list[str]:
+    """Every move of the bundled combos, in the order they are written"""
+    return [
+        token.text
+        for combo in bundled_combos
+        for token in parseCombo.iter_combo_tokens(combo.moves)
+    ]
+
+
+@pytest.fixture()
+def data_dir(tmp_path: Path) -> str:
+    """A copy of the csv files of the data directory"""
+    for file_name in os.listdir(frameData.DATA_DIR):
+        if file_name.endswith(".csv"):
+            shutil.copy(os.path.join(frameData.DATA_DIR, file_name), tmp_path)
+    return str(tmp_path)
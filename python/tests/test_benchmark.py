@@ -0,0 +1,46 @@
+"""
+Tests of the benchmark helpers, the benchmarks themselves are run with benchmark.py.
+"""
+
+from pandas import DataFrame
+
+import benchmark
+import parseCombo
+
+
+def test_synthetic_combos_are_scored_in_full(
+    tables: tuple[DataFrame, DataFrame],
+) -> None:
+    """Every move of a synthetic combo resolves, and the same seed gives the same combos"""
+    character_moves: list[tuple[str, list[str]]] = benchmark.get_synthetic_moves(
+        *tables
+    )
+    combos: list[parseCombo.ComboInput] = list(
+        benchmark.generate_combos(character_moves, 200, seed=3)
+    )
+    assert combos == list(benchmark.generate_combos(character_moves, 200, seed=3))
+    resolver: parseCombo.MoveResolver = parseCombo.get_move_resolver(*tables)
+    for combo in combos:
+        combo_positions, _ = parseCombo.resolve_combo(
+            resolver, combo.character, combo.moves
+        )
+        assert len(combo_positions) >= len(combo.moves)
+
+
+def test_regressions_are_found_against_the_baseline() -> None:
+    """Only benchmarks more than the tolerance slower than the baseline are regressions"""
+    results: list[benchmark.BenchmarkResult] = [
+        benchmark.BenchmarkResult("same", 1.0, 1.0, 5, 10),
+        benchmark.BenchmarkResult("slower", 1.5, 1.5, 5, 10),
+        benchmark.BenchmarkResult("new", 9.0, 9.0, 5, 10),
+    ]
+    baseline: dict = benchmark.results_to_json(
+        [
+            benchmark.BenchmarkResult("same", 0.95, 1.0, 5, 10),
+            benchmark.BenchmarkResult("slower", 1.0, 1.0, 5, 10),
+        ]
+    )
+    assert [
+        regression.name
+        for regression in benchmark.compare_results(results, baseline, tolerance=0.2)
+    ] == ["slower"]
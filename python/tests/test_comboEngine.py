@@ -0,0 +1,200 @@
+"""
+Tests of the array damage calculation against the hit by hit calculation.
+"""
+
+import random
+
+import numpy as np
+import pytest
+from pandas import DataFrame
+
+import comboEngine
+import constants as const
+import parseCombo
+
+
+def running_sums(values: list[int], segment_start: list[bool]) -> list[int]:
+    """Cumulative sum restarting at every segment start, one value at a time"""
+    sums: list[int] = []
+    total: int = 0
+    for value, start in zip(values, segment_start):
+        total = value if start or not sums else total + value
+        sums.append(total)
+    return sums
+
+
+def scan_hit_numbers(damage: list[int]) -> list[int]:
+    """Hit numbers counted one hit at a time, hits with no damage restart the count"""
+    hit_numbers: list[int] = []
+    hit_number: int = 0
+    for hit in damage:
+        hit_number = hit_number + 1 if hit != 0 else 0
+        hit_numbers.append(hit_number)
+    return hit_numbers
+
+
+def random_damage(length: int) -> np.ndarray:
+    """Hit damage with hits of no damage, -1 damage and more than 1000 damage"""
+    rng: np.random.Generator = np.random.default_rng(length)
+    return rng.choice(
+        np.array([0, -1, 10, 75, 150, 400, 999, 1000, 1500]), length
+    ).astype(np.int64)
+
+
+@pytest.mark.parametrize("length", [0, 1, 2, 17, 500])
+def test_scaling_matches_hit_by_hit(length: int) -> None:
+    """Hit numbers and scaling match get_damage_scaling_for_hit applied to every hit"""
+    damage: np.ndarray = random_damage(length)
+    hit_numbers: np.ndarray = comboEngine.get_hit_numbers(damage)
+    assert hit_numbers.tolist() == scan_hit_numbers(damage.tolist())
+    assert comboEngine.get_damage_scaling(hit_numbers, damage).tolist() == [
+        float(comboEngine.get_damage_scaling_for_hit(hit_number, hit))
+        for hit_number, hit in zip(hit_numbers.tolist(), damage.tolist())
+    ]
+
+
+@pytest.mark.parametrize("length", [0, 1, 2, 17, 500])
+def test_move_damage_totals(length: int) -> None:
+    """The damage total of each move restarts when the move changes"""
+    rng: np.random.Generator = np.random.default_rng(length)
+    scaled_damage: np.ndarray = rng.integers(0, 1000, length)
+    move_names: np.ndarray = rng.choice(np.array(["5LP", "5MP", "2HK"]), length)
+    move_start: list[bool] = [
+        index == 0 or move_names[index] != move_names[index - 1]
+        for index in range(length)
+    ]
+    assert comboEngine.get_move_damage_totals(
+        scaled_damage, move_names
+    ).tolist() == running_sums(scaled_damage.tolist(), move_start)
+
+
+@pytest.mark.parametrize("length", [0, 1, 2, 17, 500])
+def test_segmented_cumsum(length: int) -> None:
+    """segmented_cumsum matches a running sum, whether or not the first value starts a segment"""
+    rng: np.random.Generator = np.random.default_rng(length)
+    values: np.ndarray = rng.integers(-1000, 1000, length)
+    for segment_start in (
+        rng.random(length) < 0.2,
+        np.zeros(length, dtype=bool),
+        np.ones(length, dtype=bool),
+    ):
+        assert comboEngine.segmented_cumsum(
+            values, segment_start
+        ).tolist() == running_sums(values.tolist(), segment_start.tolist())
+
+
+def random_combos(
+    bundled_moves: list[str], count: int, seed: int
+) -> list[parseCombo.ComboInput]:
+    """Combos of random bundled moves, with empty combos, kara, ignored moves and moves that are not found"""
+    rng: random.Random = random.Random(seed)
+    vocabulary: list[str] = bundled_moves + ["kara", "jabb", "j236HK", "ADC"]
+    return [
+        parseCombo.ComboInput(
+            f"random{combo_number}",
+            "Annie",
+            rng.choices(vocabulary, k=rng.randint(0, 12)),
+            float(rng.randint(0, 5000)),
+        )
+        for combo_number in range(count)
+    ]
+
+
+def test_evaluate_combos_matches_combo_damage(
+    tables: tuple[DataFrame, DataFrame],
+    bundled_combos: list[parseCombo.ComboInput],
+    bundled_moves: list[str],
+) -> None:
+    """Combos evaluated in one batch have the damage and undizzy of each combo on its own"""
+    combos: list[parseCombo.ComboInput] = bundled_combos + random_combos(
+        bundled_moves, 60, 0
+    )
+    summary_df: DataFrame = comboEngine.evaluate_combos(combos, *tables)
+    assert len(summary_df) == len(combos)
+    for combo, (_, summary) in zip(combos, summary_df.iterrows()):
+        damage_table: DataFrame = comboEngine.get_combo_damage_table(combo, *tables)
+        assert summary["CalculatedDamage"] == damage_table[const.SCALED_DAMAGE].sum()
+        assert summary["Undizzy"] == damage_table[const.UNDIZZY].sum()
+        assert summary["UndizzyCapped"] == (summary["Undizzy"] >= const.UNDIZZY_MAX)
+
+
+def test_parsed_damage_matches_damage_strings(
+    tables: tuple[DataFrame, DataFrame],
+    bundled_combos: list[parseCombo.ComboInput],
+    bundled_moves: list[str],
+) -> None:
+    """Combos score the same with the damage parsed at load time and parsed from the strings"""
+    frame_data, move_name_alias_df = tables
+    combos: list[parseCombo.ComboInput] = bundled_combos + random_combos(
+        bundled_moves, 20, 1
+    )
+    unparsed_frame_data: DataFrame = frame_data.drop(
+        columns=[const.HIT_DAMAGE, const.CHIP_DAMAGE, const.SPECIAL_DAMAGE]
+    )
+    assert (
+        comboEngine.evaluate_combos(combos, frame_data, move_name_alias_df)[
+            "CalculatedDamage"
+        ].tolist()
+        == comboEngine.evaluate_combos(combos, unparsed_frame_data, move_name_alias_df)[
+            "CalculatedDamage"
+        ].tolist()
+    )
+
+
+def test_stream_matches_evaluate_combos(
+    tables: tuple[DataFrame, DataFrame],
+    bundled_combos: list[parseCombo.ComboInput],
+    bundled_moves: list[str],
+) -> None:
+    """Streamed combos score the same as one batch, whatever the batch size"""
+    combos: list[parseCombo.ComboInput] = bundled_combos + random_combos(
+        bundled_moves, 30, 2
+    )
+    expected: list[dict] = comboEngine.evaluate_combos(combos, *tables).to_dict(
+        "records"
+    )
+    for batch_size in (1, 7, 1000):
+        results: list[comboEngine.ComboResult] = list(
+            comboEngine.score_combo_stream(
+                iter(combos), *tables, batch_size=batch_size, max_damage_tables=3
+            )
+        )
+        assert [result.summary for result in results] == expected
+        assert [result.damage_table is not None for result in results] == [
+            combo_number < 3 for combo_number in range(len(combos))
+        ]
+
+
+def test_combo_damage_matches_add_scaled_hits(
+    tables: tuple[DataFrame, DataFrame], bundled_combos: list[parseCombo.ComboInput]
+) -> None:
+    """The damage table of a combo scales its hits like add_scaled_hits"""
+    for combo in bundled_combos:
+        damage_table: DataFrame = comboEngine.get_combo_damage_table(combo, *tables)
+        damage, _ = comboEngine.add_scaled_hits(damage_table[const.DAMAGE].tolist())
+        assert damage == damage_table[const.SCALED_DAMAGE].sum()
+        assert (
+            damage_table[const.TOTAL_DAMAGE_FOR_COMBO].iloc[-1]
+            == damage_table[const.SCALED_DAMAGE].sum()
+        )
+
+
+def test_stream_skips_combos_that_can_not_be_scored(
+    tables: tuple[DataFrame, DataFrame],
+    bundled_combos: list[parseCombo.ComboInput],
+) -> None:
+    """A combo that can not be scored is left out of the stream, the combos around it are
+    scored"""
+    broken_combo: parseCombo.ComboInput = parseCombo.ComboInput(
+        "broken", "Annie", None  # type: ignore[arg-type]
+    )
+    combos: list[parseCombo.ComboInput] = bundled_combos[:2]
+    expected: list[dict] = comboEngine.evaluate_combos(combos, *tables).to_dict(
+        "records"
+    )
+    results: list[comboEngine.ComboResult] = list(
+        comboEngine.score_combo_stream(
+            iter([combos[0], broken_combo, combos[1]]), *tables, max_damage_tables=3
+        )
+    )
+    assert [result.summary for result in results] == expected
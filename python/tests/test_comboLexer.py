@@ -0,0 +1,43 @@
+"""
+Tests of the combo notation tokenizer.
+"""
+
+import pytest
+
+import comboLexer
+import constants as const
+
+
+@pytest.mark.parametrize(
+    "notation, texts",
+    [
+        ("2LK 2MK 5HPx2", ["2LK", "2MK", "5HPx2"]),
+        ("5MK x2 214HP ~P", ["5MK x2", "214HP~P"]),
+        ("jHP air dash cancel jHK", ["jHP", "air dash cancel", "jHK"]),
+        ("kara ADC  air dash", ["kara", "ADC", "air dash"]),
+        ("", []),
+    ],
+)
+def test_tokenize(notation: str, texts: list[str]) -> None:
+    """Moves are split on whitespace, and repeats, follow-ups and ignored phrases are joined"""
+    assert [token.text for token in comboLexer.tokenize(notation)] == texts
+
+
+def test_move_parts() -> None:
+    """A move token has its name, jump prefix, follow-up and repeat count"""
+    token: comboLexer.ComboToken = comboLexer.classify("j.236HK~LK x2")
+    assert token.kind == const.TOKEN_MOVE
+    assert (token.move, token.airborne, token.follow_up, token.repeat) == (
+        "236HK",
+        True,
+        "LK",
+        2,
+    )
+    assert comboLexer.classify("kara").kind == const.TOKEN_KARA
+    assert comboLexer.classify("ADC").kind == const.TOKEN_IGNORED
+
+
+def test_tokens_are_shared() -> None:
+    """Every occurrence of a move is the same token"""
+    first, second = comboLexer.tokenize("5LP 5LP")
+    assert first is second
@@ -0,0 +1,103 @@
+"""
+Tests of the incremental combo model against recalculating the whole combo.
+"""
+
+import random
+
+import pytest
+from pandas import DataFrame
+
+import comboEngine
+import comboModel
+import constants as const
+import parseCombo
+
+
+def assert_matches_full_combo(
+    combo: comboModel.IncrementalCombo,
+    moves: list[str],
+    tables: tuple[DataFrame, DataFrame],
+) -> None:
+    """The combo has the damage, undizzy and hits of its moves calculated from scratch"""
+    damage_table: DataFrame = comboEngine.get_combo_damage_table(
+        parseCombo.ComboInput("combo", "Annie", list(moves)), *tables
+    )
+    assert combo.damage == damage_table[const.SCALED_DAMAGE].sum(), moves
+    assert combo.undizzy == damage_table[const.UNDIZZY].sum(), moves
+    assert combo.hit_count == len(damage_table), moves
+
+
+def test_bundled_combos(
+    tables: tuple[DataFrame, DataFrame], bundled_combos: list[parseCombo.ComboInput]
+) -> None:
+    """Combos built in one go match the full calculation"""
+    for combo in bundled_combos:
+        moves: list[str] = [
+            token.text for token in parseCombo.iter_combo_tokens(combo.moves)
+        ]
+        assert_matches_full_combo(
+            comboModel.IncrementalCombo("Annie", combo.moves, *tables), moves, tables
+        )
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_random_edits(
+    tables: tuple[DataFrame, DataFrame], bundled_moves: list[str], seed: int
+) -> None:
+    """Inserting, removing and replacing moves matches recalculating the edited combo"""
+    rng: random.Random = random.Random(seed)
+    vocabulary: list[str] = bundled_moves + [
+        "kara",
+        "j236HK",
+        "j236MK~HK",
+        "5HPx2",
+        "ADC",
+        "jabb",
+    ]
+    combo: comboModel.IncrementalCombo = comboModel.IncrementalCombo(
+        "Annie", (), *tables
+    )
+    moves: list[str] = []
+    for step in range(300):
+        edit: float = rng.random()
+        if edit < 0.5 or not moves:
+            move_index: int = rng.randint(0, len(moves))
+            move: str = rng.choice(vocabulary)
+            moves.insert(move_index, move)
+            combo.insert(move_index, move)
+        elif edit < 0.75:
+            move_index = rng.randrange(len(moves))
+            del moves[move_index]
+            combo.remove(move_index)
+        else:
+            move_index = rng.randrange(len(moves))
+            moves[move_index] = rng.choice(vocabulary)
+            combo.replace(move_index, moves[move_index])
+        if step % 10 == 0:
+            assert_matches_full_combo(combo, moves, tables)
+            if moves:
+                move_index = rng.randrange(len(moves))
+                prefix_table: DataFrame = comboEngine.get_combo_damage_table(
+                    parseCombo.ComboInput("prefix", "Annie", moves[: move_index + 1]),
+                    *tables,
+                )
+                assert (
+                    combo.state_after(move_index).damage
+                    == prefix_table[const.SCALED_DAMAGE].sum()
+                )
+
+
+def test_combos_share_a_resolver(tables: tuple[DataFrame, DataFrame]) -> None:
+    """Editing one combo does not change the divekicks of another combo using the same tables"""
+    first: comboModel.IncrementalCombo = comboModel.IncrementalCombo(
+        "Annie", ["j236HK", "j236HK"], *tables
+    )
+    second: comboModel.IncrementalCombo = comboModel.IncrementalCombo(
+        "Annie", ["j236HK"], *tables
+    )
+    assert first.resolver is second.resolver
+    first.append("j236HK")
+    second.append("j236HK")
+    assert first.divekick_count == 3
+    assert second.divekick_count == 2
+    assert_matches_full_combo(second, ["j236HK", "j236HK"], tables)
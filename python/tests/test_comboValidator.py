@@ -0,0 +1,81 @@
+"""
+Tests of the link checks of the combo validator.
+"""
+
+import numpy as np
+from pandas import DataFrame
+
+import comboValidator
+import parseCombo
+
+
+def validate(
+    tables: tuple[DataFrame, DataFrame], *combos: str, character: str = "Annie"
+) -> DataFrame:
+    """Validate combo strings of a character"""
+    return comboValidator.validate_combos(
+        [parseCombo.ComboInput(combo, character, [combo]) for combo in combos],
+        *tables,
+    )
+
+
+def test_bundled_combos_are_valid(
+    tables: tuple[DataFrame, DataFrame], bundled_combos: list[parseCombo.ComboInput]
+) -> None:
+    """The bundled combos all combo"""
+    summary_df: DataFrame = comboValidator.validate_combos(bundled_combos, *tables)
+    assert summary_df["Valid"].all()
+    assert (summary_df["FailingMove"] == -1).all()
+    assert (summary_df["FailingLink"] == "").all()
+
+
+def test_links(tables: tuple[DataFrame, DataFrame]) -> None:
+    """Chains into higher strengths combo, links that are too tight do not"""
+    summary_df: DataFrame = validate(tables, "5LP 5MP 5HP", "5HP 5LP", "5MP 5LP")
+    assert summary_df["Valid"].tolist() == [True, False, False]
+    assert summary_df["FailingMove"].tolist() == [-1, 1, 1]
+    assert summary_df["FailingLink"].tolist() == ["", "5HP > 5LP", "5MP > 5LP"]
+    assert (summary_df["GapFrames"].iloc[1:] > 0).all()
+
+
+def test_failing_link_skips_ignored_moves(tables: tuple[DataFrame, DataFrame]) -> None:
+    """The failing link names the move before it, not the ignored or kara moves between them"""
+    summary_df: DataFrame = validate(
+        tables, "5HP delay 5LP", "5HP 2LK kara 5LP", "5LK delay delay 5LK"
+    )
+    assert summary_df["Valid"].tolist() == [False, False, False]
+    assert summary_df["FailingMove"].tolist() == [2, 3, 3]
+    assert summary_df["FailingLink"].tolist() == [
+        "5HP > 5LP",
+        "5HP > 5LP",
+        "5LK > 5LK",
+    ]
+
+
+def test_batches_match_single_combos(
+    tables: tuple[DataFrame, DataFrame], bundled_combos: list[parseCombo.ComboInput]
+) -> None:
+    """A combo gets the same result in a batch as on its own"""
+    combos: list[parseCombo.ComboInput] = bundled_combos + [
+        parseCombo.ComboInput(combo, "Annie", [combo])
+        for combo in ("5HP 5LP", "", "kara", "5LK delay 5LK", "5LP 5MP 5HP", "jabb")
+    ]
+    batch_df: DataFrame = comboValidator.validate_combos(combos, *tables)
+    for combo, (_, batch_row) in zip(combos, batch_df.iterrows()):
+        single_row = comboValidator.validate_combos([combo], *tables).iloc[0]
+        for column in ("Valid", "FailingMove", "FailingLink", "GapFrames"):
+            assert batch_row[column] == single_row[column], (combo.name, column)
+
+
+def test_validate_rows_without_links(tables: tuple[DataFrame, DataFrame]) -> None:
+    """Batches with fewer than two rows are valid"""
+    link_table: comboValidator.LinkTable = comboValidator.get_link_table(tables[0])
+    validation: comboValidator.LinkValidation = comboValidator.validate_rows(
+        link_table,
+        np.array([0], dtype=np.int64),
+        np.array([0], dtype=np.int64),
+        np.array([0, 0, 1], dtype=np.int64),
+    )
+    assert validation.valid.tolist() == [True, True]
+    assert validation.failing_move.tolist() == [-1, -1]
+    assert validation.previous_move.tolist() == [-1, -1]
@@ -0,0 +1,61 @@
+"""
+Tests of the logging set up in constants.
+"""
+
+import logging
+import os
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+
+import constants as const
+
+
+@pytest.fixture()
+def restore_logger() -> Iterator[logging.Logger]:
+    """Put back the handlers and level of the logger after a test adds log files"""
+    handlers: list[logging.Handler] = const.logger.handlers[:]
+    level: int = const.logger.level
+    yield const.logger
+    const.stop_log_listener()
+    for handler in const.logger.handlers[:]:
+        if handler not in handlers:
+            const.logger.removeHandler(handler)
+            handler.close()
+    const.logger.setLevel(level)
+
+
+def read_log_file(log_dir: Path, file_name: str) -> str:
+    """The contents of a log file"""
+    with open(os.path.join(log_dir, file_name), encoding="utf-8") as log_file:
+        return log_file.read()
+
+
+def test_debug_is_dropped_without_log_files(
+    restore_logger: logging.Logger, tmp_path: Path
+) -> None:
+    """Only the console handler is added on import, so debug messages are not even created"""
+    assert not restore_logger.isEnabledFor(logging.DEBUG)
+    const.add_log_file_handlers(str(tmp_path), logging.INFO, queued=True)
+    assert not restore_logger.isEnabledFor(logging.DEBUG)
+    assert restore_logger.isEnabledFor(logging.INFO)
+
+
+@pytest.mark.parametrize("queued", [False, True])
+def test_log_files(
+    restore_logger: logging.Logger, tmp_path: Path, queued: bool
+) -> None:
+    """The verbose log file gets debug messages and the info log file only info and up"""
+    const.add_log_file_handlers(str(tmp_path), logging.DEBUG, queued=queued)
+    assert restore_logger.isEnabledFor(logging.DEBUG)
+    restore_logger.debug("debug %s", "message")
+    restore_logger.info("info %s", "message")
+    const.stop_log_listener()
+    for handler in restore_logger.handlers:
+        handler.flush()
+
+    verbose_log: str = read_log_file(tmp_path, const.LOG_FILE_VERBOSE)
+    info_log: str = read_log_file(tmp_path, const.LOG_FILE_INFO)
+    assert "debug message" in verbose_log and "info message" in verbose_log
+    assert "debug message" not in info_log and "info message" in info_log
@@ -0,0 +1,53 @@
+"""
+Tests of the batch run over the combo csv files.
+"""
+
+import os
+
+import pytest
+from pandas import DataFrame
+
+import damageCalc
+import frameData
+import parseCombo
+from conftest import COMBO_CSV_DIR
+
+
+def test_parallel_run_matches_serial_run(tables: tuple[DataFrame, DataFrame]) -> None:
+    """The process pool gives the same summary and damage tables, in the same order"""
+    serial_df, serial_combos = damageCalc.process_combo_csvs(COMBO_CSV_DIR, *tables)
+    parallel_df, parallel_combos = damageCalc.process_combo_csvs_parallel(
+        COMBO_CSV_DIR, max_workers=2
+    )
+    assert parallel_df.equals(serial_df)
+    assert len(parallel_combos) == len(serial_combos)
+    for parallel_combo, serial_combo in zip(parallel_combos, serial_combos):
+        assert parallel_combo.equals(serial_combo)
+
+
+def test_combos_are_named_by_file_name(
+    tables: tuple[DataFrame, DataFrame], bundled_combos: list[parseCombo.ComboInput]
+) -> None:
+    """The summary names each combo by its csv file name, as the combo reader does"""
+    summary_df, _ = damageCalc.process_combo_csvs(COMBO_CSV_DIR, *tables)
+    assert sorted(summary_df["Combo"]) == sorted(combo.name for combo in bundled_combos)
+
+
+def test_parallel_run_compiles_the_store_first(
+    tables: tuple[DataFrame, DataFrame], data_dir: str
+) -> None:
+    """The frame data store is compiled before the workers start, so they only load it"""
+    summary_df, _ = damageCalc.process_combo_csvs_parallel(
+        COMBO_CSV_DIR, data_dir=data_dir, max_workers=6
+    )
+    assert frameData.is_store_current(
+        os.path.join(data_dir, frameData.FRAME_DATA_STORE_DIR), data_dir
+    )
+    assert "Error" not in summary_df.columns
+    assert summary_df.equals(damageCalc.process_combo_csvs(COMBO_CSV_DIR, *tables)[0])
+
+
+def test_stream_is_only_run_in_this_process() -> None:
+    """Streaming scores the combos in this process, so asking for workers is an error"""
+    with pytest.raises(SystemExit):
+        damageCalc.main(["--stream", "--workers", "2", "--no-log-files"])
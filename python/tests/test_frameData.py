@@ -0,0 +1,190 @@
+"""
+Tests of the compiled frame data store and the frame data snapshots.
+"""
+
+import concurrent.futures
+import logging
+import os
+
+import pandas as pd
+import pytest
+from pandas import DataFrame
+
+import comboEngine
+import constants as const
+import frameData
+import parseCombo
+
+
+def test_store_matches_csv_files(
+    bundled_combos: list[parseCombo.ComboInput],
+    data_dir: str,
+) -> None:
+    """Combos resolve to the same rows with the compiled store and the csv files"""
+    csv_resolver: parseCombo.MoveResolver = parseCombo.MoveResolver(
+        frameData.load_frame_data(data_dir), frameData.load_move_name_aliases(data_dir)
+    )
+    store_tables: tuple[DataFrame, DataFrame] = frameData.load_tables(data_dir)
+    store_resolver: parseCombo.MoveResolver = parseCombo.MoveResolver(*store_tables)
+    for combo in bundled_combos:
+        assert parseCombo.resolve_combo(
+            csv_resolver, combo.character, combo.moves
+        ) == parseCombo.resolve_combo(store_resolver, combo.character, combo.moves)
+
+
+def test_store_is_compiled_when_the_csv_files_change(data_dir: str) -> None:
+    """The store is only compiled again when a csv file changes"""
+    manifest_path: str = os.path.join(
+        data_dir, frameData.FRAME_DATA_STORE_DIR, frameData.FRAME_DATA_STORE_MANIFEST
+    )
+    frameData.load_tables(data_dir)
+    compiled_at: int = os.stat(manifest_path).st_mtime_ns
+    frameData.load_tables(data_dir)
+    assert os.stat(manifest_path).st_mtime_ns == compiled_at
+
+    with open(
+        os.path.join(data_dir, frameData.MOVE_NAME_ALIASES_CSV), "a", encoding="utf-8"
+    ) as alias_file:
+        alias_file.write('\nZZQQ,"zzqq"')
+    move_name_alias_df: DataFrame = frameData.load_tables(data_dir)[1]
+    assert os.stat(manifest_path).st_mtime_ns != compiled_at
+    assert "ZZQQ" in move_name_alias_df["Key"].tolist()
+
+
+def count_store_rows(data_dir: str) -> int:
+    """Load the tables in another process, compiling the store if needed"""
+    return len(frameData.load_tables(data_dir)[0])
+
+
+def test_concurrent_loads_compile_the_store_once(data_dir: str) -> None:
+    """Processes loading a missing store at the same time all load it, and leave no temporary files"""
+    with concurrent.futures.ProcessPoolExecutor(max_workers=6) as executor:
+        row_counts: list[int] = list(executor.map(count_store_rows, [data_dir] * 6))
+    assert row_counts == [len(frameData.load_frame_data(data_dir))] * 6
+    assert sorted(os.listdir(data_dir)) == sorted(
+        [frameData.FRAME_DATA_STORE_DIR, *frameData.SOURCE_FILES]
+    )
+
+
+def test_compile_replaces_the_store(data_dir: str) -> None:
+    """Compiling again swaps in a new store, without leaving the previous one behind"""
+    store_dir: str = frameData.compile_frame_data(data_dir)
+    assert frameData.compile_frame_data(data_dir, force=False) == store_dir
+    frameData.compile_frame_data(data_dir)
+    assert frameData.is_store_current(store_dir, data_dir)
+    assert sorted(os.listdir(data_dir)) == sorted(
+        [frameData.FRAME_DATA_STORE_DIR, *frameData.SOURCE_FILES]
+    )
+
+
+def set_move_damage(
+    data_dir: str, character_name: str, move_name: str, damage: str
+) -> None:
+    """Change the damage of a move in the frame data csv file"""
+    csv_path: str = os.path.join(data_dir, frameData.FRAME_DATA_CSV)
+    frame_data: DataFrame = pd.read_csv(csv_path)
+    frame_data.loc[
+        (frame_data["Character"] == character_name)
+        & (frame_data["Move Name"] == move_name),
+        "Damage",
+    ] = damage
+    frame_data.to_csv(csv_path, index=False)
+
+
+def test_store_swaps_snapshots_when_the_csv_files_change(data_dir: str) -> None:
+    """A new snapshot replaces the current one only when the csv contents change"""
+    store: frameData.FrameDataStore = frameData.FrameDataStore(data_dir)
+    first: frameData.FrameDataSnapshot = store.snapshot
+    combos: list[parseCombo.ComboInput] = [
+        parseCombo.ComboInput("filia", "Filia", ["2LK", "2MK", "5HP"])
+    ]
+    first_damage: int = comboEngine.evaluate_combos(combos, *store.tables())[
+        "CalculatedDamage"
+    ].iloc[0]
+
+    assert not store.reload_if_changed()
+    os.utime(os.path.join(data_dir, frameData.FRAME_DATA_CSV))
+    assert not store.reload_if_changed()
+    assert store.snapshot is first
+
+    set_move_damage(data_dir, "FILIA", "5HP", "2000")
+    assert store.reload_if_changed()
+    assert store.snapshot is not first
+    assert (
+        comboEngine.evaluate_combos(combos, *store.tables())["CalculatedDamage"].iloc[0]
+        > first_damage
+    )
+    assert (
+        comboEngine.evaluate_combos(
+            combos, first.full_framedata_df, first.move_name_alias_df
+        )["CalculatedDamage"].iloc[0]
+        == first_damage
+    )
+
+
+def test_updated_frame_data_matches_loaded_frame_data(data_dir: str) -> None:
+    """Reusing the unchanged characters gives the same frame data and index as loading it all"""
+    previous_frame_data: DataFrame = frameData.load_frame_data(data_dir)
+    csv_path: str = os.path.join(data_dir, frameData.FRAME_DATA_CSV)
+    frame_data: DataFrame = pd.read_csv(csv_path)
+    # change a move, remove a character and move another to the start
+    frame_data.loc[
+        (frame_data["Character"] == "FILIA") & (frame_data["Move Name"] == "5HP"),
+        "Damage",
+    ] = "2000"
+    frame_data = frame_data[frame_data["Character"] != "BIG BAND"]
+    frame_data = pd.concat(
+        [
+            frame_data[frame_data["Character"] == "VALENTINE"],
+            frame_data[frame_data["Character"] != "VALENTINE"],
+        ]
+    )
+    frame_data.to_csv(csv_path, index=False)
+
+    updated_frame_data, changed_characters = frameData.update_frame_data(
+        previous_frame_data, data_dir
+    )
+    loaded_frame_data: DataFrame = frameData.load_frame_data(data_dir)
+    assert "FILIA" in changed_characters
+    assert "PAINWHEEL" not in changed_characters
+    assert updated_frame_data.columns.tolist() == loaded_frame_data.columns.tolist()
+    for column_name in loaded_frame_data.columns:
+        assert updated_frame_data[column_name].astype(str).tolist() == (
+            loaded_frame_data[column_name].astype(str).tolist()
+        ), column_name
+    updated_index: parseCombo.MoveNameIndex = parseCombo.get_move_name_index(
+        updated_frame_data
+    )
+    loaded_index: parseCombo.MoveNameIndex = parseCombo.MoveNameIndex(loaded_frame_data)
+    assert updated_index.move_names == loaded_index.move_names
+    assert updated_index.alt_names == loaded_index.alt_names
+
+
+def test_frame_values_are_stored(tables: tuple[DataFrame, DataFrame]) -> None:
+    """The compiled store keeps the parsed frame columns with their types and missing values"""
+    frame_data: DataFrame = tables[0]
+    loaded_frame_data: DataFrame = frameData.load_frame_data()
+    for column_name in frameData.get_frame_value_columns(loaded_frame_data):
+        assert frame_data[column_name].dtype == loaded_frame_data[column_name].dtype
+        assert frame_data[column_name].equals(loaded_frame_data[column_name])
+
+
+def test_reload_warms_the_found_moves(
+    data_dir: str, caplog: pytest.LogCaptureFixture
+) -> None:
+    """The moves found with the previous snapshot are resolved for the next one, the moves
+    that were not found are not searched for again"""
+    store: frameData.FrameDataStore = frameData.FrameDataStore(data_dir)
+    parseCombo.resolve_combo(
+        parseCombo.get_move_resolver(*store.tables()), "Annie", ["5LP", "jabb"]
+    )
+    set_move_damage(data_dir, "FILIA", "5HP", "2000")
+    caplog.clear()
+    with caplog.at_level(logging.WARNING, logger=const.logger.name):
+        assert store.reload_if_changed()
+    cached_moves: list[tuple[str, str]] = parseCombo.get_move_resolver(
+        *store.tables()
+    ).cache.keys()
+    assert ("ANNIE", "5LP") in cached_moves
+    assert ("ANNIE", "jabb") not in cached_moves
+    assert not [record for record in caplog.records if "jabb" in record.message]
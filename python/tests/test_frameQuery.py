@@ -0,0 +1,101 @@
+"""
+Tests of the frame data query index against a scan of the frame data.
+"""
+
+import gc
+import random
+import weakref
+
+import numpy as np
+import pandas as pd
+import pytest
+from pandas import DataFrame
+
+import constants as const
+import frameQuery
+
+
+def scan_frame_data(
+    rows: list[dict],
+    character: str,
+    properties: list[str],
+    ranges: dict[str, tuple[float | None, float | None]],
+) -> list[int]:
+    """Row positions matching a query, found by checking every frame data row"""
+    positions: list[int] = []
+    for position, row in enumerate(rows):
+        if character.upper() not in row[const.CHARACTER_NAME].upper():
+            continue
+        row_tokens: set[str] = frameQuery.get_tokens(row[const.PROPERTIES])
+        if not all(
+            frameQuery.normalise_token(token) in row_tokens for token in properties
+        ):
+            continue
+        values: list = [row[f"{column}{const.VALUE_SUFFIX}"] for column in ranges]
+        if any(
+            pd.isna(value)
+            or (minimum is not None and value < minimum)
+            or (maximum is not None and value > maximum)
+            for value, (minimum, maximum) in zip(values, ranges.values())
+        ):
+            continue
+        positions.append(position)
+    return positions
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_select_matches_scan(tables: tuple[DataFrame, DataFrame], seed: int) -> None:
+    """Queries combining a character, properties and ranges find the rows a scan finds"""
+    frame_data: DataFrame = tables[0]
+    frame_index: frameQuery.FrameDataIndex = frameQuery.get_frame_data_index(frame_data)
+    rng: random.Random = random.Random(seed)
+    characters: list[str] = sorted(frame_data[const.CHARACTER_NAME].unique())
+    properties: list[str] = frame_index.tokens(const.PROPERTIES)
+    rows: list[dict] = frame_data.to_dict("records")
+    for _ in range(20):
+        character: str = rng.choice(characters).title()
+        query_properties: list[str] = rng.sample(properties, rng.randint(0, 1))
+        ranges: dict[str, tuple[float | None, float | None]] = {
+            const.STARTUP: (rng.choice([None, 5]), rng.choice([None, 12, 30])),
+            const.ON_BLOCK: (rng.choice([None, -10]), rng.choice([None, 0])),
+        }
+        assert frame_index.select(
+            character=character, properties=query_properties, ranges=ranges
+        ).tolist() == scan_frame_data(rows, character, query_properties, ranges)
+
+
+def test_tokens_are_found_without_qualifiers() -> None:
+    """A token is found with or without its bracketed qualifier, ignoring case"""
+    frame_data: DataFrame = DataFrame(
+        {
+            const.CHARACTER_NAME: ["ANNIE", "ANNIE", "FILIA"],
+            const.MOVE_NAME: ["5LP", "5MP", "5LP"],
+            const.ALT_NAMES: [np.nan, np.nan, np.nan],
+            const.PROPERTIES: ["Armor (1 hit), Launcher", "armor", np.nan],
+        }
+    )
+    frame_index: frameQuery.FrameDataIndex = frameQuery.FrameDataIndex(frame_data)
+    assert frame_index.select(properties=["ARMOR"]).tolist() == [0, 1]
+    assert frame_index.select(properties=["Armor (1 hit)"]).tolist() == [0]
+    assert frame_index.select(character="Filia").tolist() == [2]
+    assert frame_index.select(properties=["Launcher", "Armor"]).tolist() == [0]
+
+
+def test_index_does_not_keep_the_frame_data_alive(
+    tables: tuple[DataFrame, DataFrame],
+) -> None:
+    """The index is dropped with its frame data, and every spelling of a character shares a
+    mask"""
+    frame_data: DataFrame = tables[0].copy()
+    frame_index: frameQuery.FrameDataIndex = frameQuery.get_frame_data_index(frame_data)
+    for character_name in ("Annie", "ANNIE", "annie", "An", "Filia", "Nobody"):
+        frame_index.character_mask(character_name)
+    assert len(frame_index._character_masks) == 3
+    assert len(frame_index.rows(frame_index.select(character="Annie"))) > 0
+
+    frame_data_ref: weakref.ref[DataFrame] = weakref.ref(frame_data)
+    del frame_data
+    gc.collect()
+    assert frame_data_ref() is None
+    with pytest.raises(ReferenceError):
+        frame_index.rows(np.array([0]))
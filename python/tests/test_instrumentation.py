@@ -0,0 +1,60 @@
+"""
+Tests of the per-stage timing instrumentation.
+"""
+
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+from pandas import DataFrame
+
+import comboEngine
+import instrumentation
+import parseCombo
+
+
+@pytest.fixture()
+def recording() -> Iterator[None]:
+    """Record the stages run by a test, and stop recording after it"""
+    instrumentation.reset()
+    instrumentation.enable()
+    yield
+    instrumentation.disable()
+    instrumentation.reset()
+
+
+def test_stages_are_recorded(
+    recording: None,
+    tables: tuple[DataFrame, DataFrame],
+    bundled_combos: list[parseCombo.ComboInput],
+) -> None:
+    """Every stage run by evaluate_combos is recorded, with the strategy of every move"""
+    comboEngine.evaluate_combos(bundled_combos, *tables)
+    summary: DataFrame = instrumentation.stage_summary()
+    assert summary.loc[summary["Stage"] == "evaluate_combos", "Calls"].tolist() == [1]
+    assert (summary["SelfSeconds"] <= summary["TotalSeconds"] + 1e-9).all()
+    assert len(instrumentation.move_summary()) > 0
+    cache_info: dict[str, float] = instrumentation.cache_info()
+    assert cache_info["hits"] + cache_info["misses"] > 0
+
+
+def test_nested_stages_are_folded(recording: None, tmp_path: Path) -> None:
+    """A stage inside another is a stack of its own and does not count as the outer stage's self time"""
+    with instrumentation.stage("outer"):
+        with instrumentation.stage("inner"):
+            pass
+    assert set(instrumentation.folded_stack_seconds) == {"outer", "outer;inner"}
+    folded_path: str = str(tmp_path / "stages.folded")
+    instrumentation.write_folded_stacks(folded_path)
+    with open(folded_path, encoding="utf-8") as folded_file:
+        assert [line.split(" ")[0] for line in folded_file] == ["outer;inner", "outer"]
+
+
+def test_nothing_is_recorded_while_disabled(
+    tables: tuple[DataFrame, DataFrame],
+    bundled_combos: list[parseCombo.ComboInput],
+) -> None:
+    """Instrumented stages only record while the instrumentation is enabled"""
+    instrumentation.reset()
+    comboEngine.evaluate_combos(bundled_combos, *tables)
+    assert instrumentation.stage_summary().empty
@@ -0,0 +1,394 @@
+"""
+Tests of the move search against a scan of the frame data.
+"""
+
+import logging
+import pathlib
+import random
+
+import pandas as pd
+import pytest
+from pandas import DataFrame, Series
+
+import comboEngine
+import constants as const
+import parseCombo
+
+
+def scan_for_move(frame_data: DataFrame, move_name: str, character: str) -> list[int]:
+    """Row positions of a move found by checking every row, move names before alt names"""
+    name: str = move_name.casefold().strip()
+    if not name:
+        return []
+    for column_name in (const.MOVE_NAME, const.ALT_NAMES):
+        positions: list[int] = [
+            position
+            for position, (row_character, names) in enumerate(
+                zip(frame_data[const.CHARACTER_NAME], frame_data[column_name])
+            )
+            if row_character.upper() == character
+            and isinstance(names, str)
+            and name in (line.strip() for line in names.casefold().split("\n"))
+        ]
+        if positions:
+            return positions
+    return []
+
+
+def test_name_index_matches_scan(tables: tuple[DataFrame, DataFrame]) -> None:
+    """The name index finds the same rows as a scan of the frame data"""
+    frame_data: DataFrame = tables[0]
+    names: list[tuple[str, str]] = sorted(
+        {
+            (character.upper(), line)
+            for column_name in (const.MOVE_NAME, const.ALT_NAMES)
+            for character, names in zip(
+                frame_data[const.CHARACTER_NAME], frame_data[column_name]
+            )
+            if isinstance(names, str)
+            for line in names.split("\n")
+        }
+    )
+    samples: list[tuple[str, str]] = random.Random(0).sample(names, 300)
+    # names with other spellings, and names of other characters
+    samples += [(character, name.lower()) for character, name in samples[:50]]
+    samples += [(character, f" {name} ") for character, name in samples[:50]]
+    samples += [("ANNIE", name) for _, name in samples[:50]]
+
+    move_index: parseCombo.MoveNameIndex = parseCombo.get_move_name_index(frame_data)
+    for character, name in samples:
+        assert move_index.find(name, character) == scan_for_move(
+            frame_data, name, character
+        ), (character, name)
+
+
+@pytest.mark.parametrize(
+    "character_name, characters",
+    [
+        ("Annie", ["ANNIE"]),
+        ("AN", ["ANNIE"]),
+        ("Ms. Fortune", ["MS. FORTUNE"]),
+        ("MS F", ["MS. FORTUNE"]),
+        ("CAT", ["MS. FORTUNE"]),
+        ("robo", ["ROBO-FORTUNE"]),
+        ("Big band", ["BIG BAND"]),
+        ("Dahlia", ["BLACK DAHLIA"]),
+        ("Fortune", []),
+        ("xyz", []),
+    ],
+)
+def test_character_names(
+    tables: tuple[DataFrame, DataFrame], character_name: str, characters: list[str]
+) -> None:
+    """Spellings and abbreviations resolve to one character, ambiguous names to none"""
+    move_index: parseCombo.MoveNameIndex = parseCombo.get_move_name_index(tables[0])
+    assert move_index.characters_matching(character_name) == characters
+
+
+@pytest.mark.parametrize("character_name", ["ANNIE", "annie", "AN"])
+def test_character_spellings_share_moves(
+    tables: tuple[DataFrame, DataFrame], character_name: str
+) -> None:
+    """Every spelling of a character resolves divekicks in sequence and shares cached moves"""
+    resolver: parseCombo.MoveResolver = parseCombo.MoveResolver(*tables)
+    combo: list[str] = ["j236HK", "5LP", "j236HK", "j236HK", "2MK"]
+    expected: tuple[list[int], list[str]] = parseCombo.resolve_combo(
+        resolver, "Annie", combo
+    )
+    hits: int = resolver.cache.hits
+    assert parseCombo.resolve_combo(resolver, character_name, combo) == expected
+    assert resolver.cache.hits == hits + 2
+    context: parseCombo.ComboContext = parseCombo.ComboContext()
+    assert resolver.combo_character(character_name, context) == "ANNIE"
+    assert context.character == "ANNIE"
+
+
+def scan_for_alias(move_name_alias_df: DataFrame, move_name: str) -> str:
+    """The first key listing a move name as an alias, by checking every row"""
+    for key, values in zip(move_name_alias_df["Key"], move_name_alias_df["Value"]):
+        if isinstance(values, str) and move_name.casefold() in values.casefold().split(
+            "\n"
+        ):
+            return key
+    return ""
+
+
+def test_alias_map_matches_scan(tables: tuple[DataFrame, DataFrame]) -> None:
+    """Every alias finds the key a scan of the alias table finds"""
+    move_name_alias_df: DataFrame = tables[1]
+    aliases: list[str] = [
+        alias
+        for values in move_name_alias_df["Value"]
+        if isinstance(values, str)
+        for alias in values.split("\n")
+    ]
+    for move_name in aliases + [alias.upper() for alias in aliases] + ["zzqq", ""]:
+        assert parseCombo.find_move_alias(
+            move_name_alias_df, move_name
+        ) == scan_for_alias(move_name_alias_df, move_name), move_name
+
+
+# A move found by each search strategy
+STRATEGY_EXAMPLES: dict[str, tuple[str, str]] = {
+    "character_specific": ("j236HK", "Annie"),
+    "repeat": ("5HPx2", "Annie"),
+    "start": ("2LK", "Annie"),
+    "follow_up": ("214HP~P", "Annie"),
+    "alias": ("623HP", "Annie"),
+    "generic": ("2hpchairless", "Beowulf"),
+    "no_strength": ("5P x2", "Annie"),
+}
+
+
+def test_names_with_trailing_spaces_are_found(
+    tables: tuple[DataFrame, DataFrame],
+) -> None:
+    """Frame data names are found without the spaces around them, and are not suggested for themselves"""
+    resolver: parseCombo.MoveResolver = parseCombo.get_move_resolver(*tables)
+    row_positions, search_state = resolver.resolve("M", "Annie")
+    assert row_positions and search_state != const.NOT_FOUND
+    assert "M" not in [suggestion.name for suggestion in resolver.suggest("M", "Annie")]
+
+
+@pytest.mark.parametrize("character_name", ["Robo-Fortune", "Umbrella", "Annie"])
+def test_unknown_moves_are_not_found_by_alias(
+    tables: tuple[DataFrame, DataFrame], character_name: str
+) -> None:
+    """A move that is not an alias is not looked up as an empty name, which blank alt name lines
+    would find"""
+    resolver: parseCombo.MoveResolver = parseCombo.MoveResolver(*tables, cache_size=0)
+    assert resolver.find("qqqzz", character_name, True) == []
+    assert resolver.move_index.find("", character_name) == []
+    assert resolver.resolve("qqqzz", character_name, parseCombo.ComboContext()) == (
+        [],
+        const.NOT_FOUND,
+    )
+
+
+@pytest.mark.parametrize("search_state", const.SEARCH_STATES)
+def test_strategies(tables: tuple[DataFrame, DataFrame], search_state: str) -> None:
+    """Every search strategy resolves its example, to the rows the strategy finds on its own"""
+    move_name, character_name = STRATEGY_EXAMPLES[search_state]
+    resolver: parseCombo.MoveResolver = parseCombo.MoveResolver(*tables, cache_size=0)
+    row_positions, found_by = resolver.resolve(move_name, character_name)
+    assert found_by == search_state
+    assert row_positions
+    assert row_positions == getattr(resolver, f"_search_{search_state}")(
+        move_name, character_name, parseCombo.ComboContext()
+    )
+
+
+@pytest.mark.parametrize("move_name", ["j236K(", "j.236+", "j236[HK]"])
+def test_divekick_names_are_text(
+    tables: tuple[DataFrame, DataFrame], move_name: str
+) -> None:
+    """Move names with regex characters are looked for as text among Annie's divekicks"""
+    resolver: parseCombo.MoveResolver = parseCombo.MoveResolver(*tables, cache_size=0)
+    assert resolver.resolve(move_name, "Annie", parseCombo.ComboContext()) == (
+        [],
+        const.NOT_FOUND,
+    )
+
+
+def test_cached_moves_match_uncached(tables: tuple[DataFrame, DataFrame]) -> None:
+    """Moves resolved from the cache are the moves the strategies find"""
+    uncached: parseCombo.MoveResolver = parseCombo.MoveResolver(*tables, cache_size=0)
+    cached: parseCombo.MoveResolver = parseCombo.MoveResolver(*tables)
+    moves: list[tuple[str, str]] = [*STRATEGY_EXAMPLES.values(), ("jabb", "Annie")]
+    for _ in range(2):
+        for move_name, character_name in moves:
+            assert cached.resolve(move_name, character_name) == uncached.resolve(
+                move_name, character_name
+            ), move_name
+    assert cached.cache.cache_info()["hits"] > 0
+
+
+def test_resolver_is_replaced_for_other_tables(
+    tables: tuple[DataFrame, DataFrame],
+) -> None:
+    """Resolved moves are not reused with a different frame data table"""
+    frame_data, move_name_alias_df = tables
+    resolver: parseCombo.MoveResolver = parseCombo.get_move_resolver(*tables)
+    assert parseCombo.get_move_resolver(*tables) is resolver
+    assert (
+        parseCombo.get_move_resolver(frame_data.copy(), move_name_alias_df)
+        is not resolver
+    )
+
+
+def test_clearing_caches_keeps_the_character_starts(
+    tables: tuple[DataFrame, DataFrame],
+) -> None:
+    """Character starts are loaded with the frame data, so clearing the caches keeps them, and
+    resolvers still in use drop their resolved moves"""
+    frame_data: DataFrame = tables[0]
+    character_starts: dict[str, list[str]] = parseCombo.get_character_starts(frame_data)
+    resolver: parseCombo.MoveResolver = parseCombo.get_move_resolver(*tables)
+    resolver.resolve("5LP", "AN")
+    assert resolver.cache.cache_info()["size"] > 0
+
+    parseCombo.clear_caches()
+    assert character_starts
+    assert parseCombo.get_character_starts(frame_data) is character_starts
+    assert parseCombo.get_move_name_index(frame_data).characters_matching("AN") == [
+        const.ANNIE
+    ]
+    assert resolver.cache.cache_info()["size"] == 0
+    assert parseCombo.get_move_resolver(*tables) is not resolver
+
+
+def test_combo_contexts_are_separate(tables: tuple[DataFrame, DataFrame]) -> None:
+    """Combos resolved side by side with one resolver keep their own divekick count"""
+    resolver: parseCombo.MoveResolver = parseCombo.get_move_resolver(*tables)
+    combo: list[str] = ["j236HK", "5LP", "j236HK", "j236HK"]
+    expected: tuple[list[int], list[str]] = parseCombo.resolve_combo(
+        resolver, "Annie", combo
+    )
+
+    contexts: list[parseCombo.ComboContext] = [
+        parseCombo.ComboContext(),
+        parseCombo.ComboContext(),
+    ]
+    resolved: list[list[int]] = [[], []]
+    for move_name in combo:
+        for context, row_positions in zip(contexts, resolved):
+            row_positions += resolver.resolve(move_name, "Annie", context)[0]
+    assert resolved == [expected[0], expected[0]]
+    assert [context.annie_divekick_count for context in contexts] == [3, 3]
+
+
+def test_not_found_moves_warn_once(
+    tables: tuple[DataFrame, DataFrame], caplog: pytest.LogCaptureFixture
+) -> None:
+    """A move that is not found is warned about once, and every combo using it records it"""
+    resolver: parseCombo.MoveResolver = parseCombo.MoveResolver(*tables)
+    contexts: list[parseCombo.ComboContext] = []
+    with caplog.at_level(logging.WARNING, logger=const.logger.name):
+        for _ in range(3):
+            context: parseCombo.ComboContext = parseCombo.ComboContext()
+            parseCombo.resolve_combo(resolver, "Annie", ["jabb", "5LP"], context)
+            contexts.append(context)
+    assert len([record for record in caplog.records if "jabb" in record.message]) == 1
+    for context in contexts:
+        assert [move_name for move_name, _ in context.unresolved_moves] == ["jabb"]
+        assert context.unresolved_moves[0][1][0].move_name == "5LP"
+
+
+@pytest.mark.parametrize(
+    "text, value, alt, maximum",
+    [
+        ("+4 [+10]", 4, 10, None),
+        ("+11 to +12", 11, None, 12),
+        ("±0", 0, None, None),
+        ("-", None, None, None),
+        ("KD", None, None, None),
+        ("12 (16)", 12, 16, None),
+    ],
+)
+def test_parse_frame_values(
+    text: str, value: int | None, alt: int | None, maximum: int | None
+) -> None:
+    """Frame data text is read as the first number, the bracketed number and the end of a range"""
+    parsed: DataFrame = parseCombo.parse_frame_values(Series([text]))
+    assert [
+        None if pd.isna(number) else number
+        for number in parsed.loc[
+            0, [const.VALUE_SUFFIX, const.ALT_SUFFIX, const.MAX_SUFFIX]
+        ]
+    ] == [value, alt, maximum]
+
+
+def levenshtein(first: str, second: str) -> int:
+    """Edit distance between two names, working out every cell"""
+    previous: list[int] = list(range(len(second) + 1))
+    for i, first_char in enumerate(first, 1):
+        current: list[int] = [i]
+        for j, second_char in enumerate(second, 1):
+            current.append(
+                min(
+                    previous[j] + 1,
+                    current[j - 1] + 1,
+                    previous[j - 1] + (first_char != second_char),
+                )
+            )
+        previous = current
+    return previous[-1]
+
+
+def test_suggestions_match_scan(
+    tables: tuple[DataFrame, DataFrame], bundled_moves: list[str]
+) -> None:
+    """Suggestions are the closest names of a scan of every name of the character"""
+    resolver: parseCombo.MoveResolver = parseCombo.get_move_resolver(*tables)
+    suggestion_index: parseCombo.MoveSuggestionIndex = parseCombo.MoveSuggestionIndex(
+        *tables
+    )
+    rng: random.Random = random.Random(0)
+    letters: str = "12345678jLMHPKx~"
+    checked: int = 0
+    for move in sorted(set(bundled_moves)):
+        # misspell the move by one or two edits
+        misspelt: list[str] = list(move)
+        for _ in range(rng.randint(1, 2)):
+            misspelt.insert(rng.randint(0, len(misspelt)), rng.choice(letters))
+        move_name: str = "".join(misspelt)
+        suggestions: list[parseCombo.MoveSuggestion] = resolver.suggest(
+            move_name, "Annie"
+        )
+
+        normalised: str = parseCombo.normalise_move_name(move_name)
+        max_distance: int = max(
+            1, min(const.MOVE_SUGGESTION_MAX_DISTANCE, len(normalised) // 4)
+        )
+        character_names: parseCombo.CharacterMoveNames = (
+            suggestion_index.character_names("ANNIE")
+        )
+        closest: dict[str, int] = {}
+        for name, found_move in zip(
+            character_names.normalised_names, character_names.move_names
+        ):
+            distance: int = levenshtein(normalised, name)
+            if distance <= max_distance:
+                closest[found_move] = min(distance, closest.get(found_move, distance))
+        checked += bool(suggestions)
+        assert [suggestion.distance for suggestion in suggestions] == sorted(
+            closest.values()
+        )[: const.MOVE_SUGGESTION_COUNT], move_name
+        for suggestion in suggestions:
+            assert closest[suggestion.move_name] == suggestion.distance, move_name
+    assert checked > 10
+
+
+def test_unresolved_moves_are_reported(tables: tuple[DataFrame, DataFrame]) -> None:
+    """Moves that are not found are reported with the closest names"""
+    summary_df: DataFrame = comboEngine.evaluate_combos(
+        [
+            parseCombo.ComboInput("found", "Annie", ["5LP 5MP"]),
+            parseCombo.ComboInput("misspelt", "Annie", ["5LP jabb 2MK"]),
+        ],
+        *tables,
+    )
+    assert summary_df["UnresolvedMoves"].tolist() == [
+        "",
+        "jabb: did you mean JAB (5LP)",
+    ]
+
+
+def test_bad_combo_csv_rows_are_skipped(tmp_path: pathlib.Path) -> None:
+    """An expected damage that is not a number and a file that can not be read do not stop the
+    combos after them from being read"""
+    good_path: pathlib.Path = tmp_path / "good.csv"
+    good_path.write_text(
+        "Character,MoveName,ExpectedDamage\n" "Annie,5LP,lots\n" "Annie,5MP,1000\n",
+        encoding="utf-8",
+    )
+    unreadable_path: pathlib.Path = tmp_path / "unreadable.csv"
+    unreadable_path.write_bytes(b"Character,MoveName\nAnnie,5LP \xff\n")
+    combos: list[parseCombo.ComboInput] = list(
+        parseCombo.iter_combo_csvs(
+            [str(unreadable_path), str(tmp_path / "missing.csv"), str(good_path)]
+        )
+    )
+    assert [combo.name for combo in combos] == ["good", "good_2"]
+    assert pd.isna(combos[0].expected_damage)
+    assert combos[1].expected_damage == 1000
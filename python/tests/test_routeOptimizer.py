@@ -0,0 +1,65 @@
+"""
+Tests of the route search against the damage calculation.
+"""
+
+from pandas import DataFrame
+
+import comboEngine
+import constants as const
+import parseCombo
+import routeOptimizer
+
+
+def test_route_damage_matches_combo_damage(
+    tables: tuple[DataFrame, DataFrame],
+) -> None:
+    """The damage of every route found is the damage of the combo it describes"""
+    starter: str = "2LK 2MK"
+    search: routeOptimizer.RouteSearch = routeOptimizer.find_best_routes(
+        "Annie",
+        starter,
+        allowed_moves=["5LP", "5MP", "5HP", "2HK", "236LP", "623HP", "j236HK"],
+        max_moves=4,
+        top_k=5,
+        full_framedata_df=tables[0],
+        move_name_alias_df=tables[1],
+    )
+    assert len(search.routes) == 5
+    assert [route.damage for route in search.routes] == sorted(
+        (route.damage for route in search.routes), reverse=True
+    )
+    combos: list[parseCombo.ComboInput] = [
+        parseCombo.ComboInput(f"route{number}", "Annie", [starter, *route.moves])
+        for number, route in enumerate(search.routes)
+    ]
+    assert comboEngine.evaluate_combos(combos, *tables)[
+        "CalculatedDamage"
+    ].tolist() == [route.damage for route in search.routes]
+
+
+def test_every_move_is_a_route_candidate(
+    tables: tuple[DataFrame, DataFrame],
+) -> None:
+    """Every move of a character with damage can start a route, including moves with names that
+    are not combo notation"""
+    frame_data: DataFrame = tables[0]
+    annie_rows: DataFrame = frame_data[
+        frame_data[const.CHARACTER_NAME].str.upper() == const.ANNIE
+    ]
+    move_names: set[str] = {
+        names.split("\n")[0].strip()
+        for names, hits in zip(
+            annie_rows[const.MOVE_NAME], parseCombo.get_row_hit_damage(annie_rows)
+        )
+        if any(hits)
+    }
+    search: routeOptimizer.RouteSearch = routeOptimizer.find_best_routes(
+        "Annie",
+        "2LK",
+        max_moves=1,
+        top_k=len(move_names) + 1,
+        full_framedata_df=frame_data,
+        move_name_alias_df=tables[1],
+    )
+    assert "SAGAN BEAM" in move_names
+    assert {move for route in search.routes for move in route.moves} == move_names